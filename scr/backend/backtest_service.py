@@ -1,13 +1,30 @@
 
 import os
 import importlib
+import inspect
 import numpy as np
 import pandas as pd
-from backend.data_handlers.binance_data import BinanceDataHandler
-from backend.trade_audit import audit_trades
+from backend.data_handlers.binance_data import BinanceDataHandler, as_float64, memory_report
+from backend.data_handlers.catalog import available_symbols, covers, find_dataset
+from backend.trade_audit import audit_trades, detect_lookahead
+from backend.indicators import IndicatorCache
+from backend.metrics import compute_equity_metrics, compute_trade_metrics
+from backend.timeframes import TimeframeView, get_alignment_map, interval_to_timedelta
+from backend.execution import get_execution_model, get_stop_rules
+from backend.strategies._base import as_array_strategy, signals_to_targets
+from backend.breakdown import compute_breakdown
 
 STRATEGY_DIR = os.path.join(os.path.dirname(__file__), "strategies")
 
+# Pontos de corte testados pelo detector de lookahead em cada run_backtest
+LOOKAHEAD_CHECKS = 4
+
+# Colunas sempre necessárias ao motor de execução (preço de entrada/saída)
+ENGINE_COLUMNS = ["open"]
+
+# Motor de exposição-alvo: modo -> limites (mín, máx) da exposição
+TARGET_MODES = {"long_short": (-1.0, 1.0), "long_only": (0.0, 1.0)}
+
 def get_available_strategies():
     strategies = []
     for fname in os.listdir(STRATEGY_DIR):
@@ -15,50 +32,34 @@ def get_available_strategies():
             module_name = fname[:-3]
             module = importlib.import_module(f"backend.strategies.{module_name}")
             for attr in dir(module):
-                if attr.endswith("Strategy"):
+                # Só classes definidas no próprio módulo (não as bases importadas, ex: ArrayStrategy)
+                obj = getattr(module, attr)
+                if attr.endswith("Strategy") and getattr(obj, "__module__", None) == module.__name__:
                     strategies.append(attr)
     return strategies
 
 def get_available_intervals():
     return ["1m", "5m", "15m", "1h", "4h", "1d"]
 
-def _compute_max_drawdown(equity_curve):
-    """Retorna drawdown máximo e onde ocorreu."""
-    roll_max = np.maximum.accumulate(equity_curve)
-    drawdown = (equity_curve - roll_max) / roll_max
-    max_dd = drawdown.min()
-    end = np.argmin(drawdown)
-    start = np.argmax(equity_curve[:end+1])
-    return max_dd, start, end, drawdown
-
-def _compute_recovery_time(equity_curve, start, end):
-    """Calcula número de períodos para voltar ao topo após maior drawdown."""
-    if end == len(equity_curve) - 1:
-        return None  # Nunca recuperou
-    peak_value = equity_curve[start]
-    for i in range(end, len(equity_curve)):
-        if equity_curve[i] >= peak_value:
-            return i - end
-    return None  # Nunca recuperou
-
-def _compute_cagr(initial_balance, final_balance, n_days):
-    """Taxa de crescimento anual composta (CAGR)"""
-    if n_days == 0: return 0
-    years = n_days / 365
-    if years <= 0 or initial_balance <= 0:
-        return 0
-    cagr = (final_balance / initial_balance) ** (1/years) - 1
-    return cagr * 100  # percent
-
-def _get_benchmark_hold_returns(processed_data, initial_balance):
+def get_available_data():
+    """Dados locais, pelo catálogo (sem abrir os CSVs): {símbolo: [intervalos]}."""
+    return available_symbols()
+
+def get_data_range(symbol, interval):
+    """(primeira, última barra) dos dados locais de um símbolo/intervalo, ou None."""
+    entry = find_dataset(symbol, interval)
+    if entry is None or not entry["rows"]:
+        return None
+    return pd.Timestamp(entry["first"]), pd.Timestamp(entry["last"])
+
+def _get_benchmark_hold_returns(state, initial_balance):
     """Simula buy & hold: compra tudo na primeira barra, vende tudo na última."""
-    open0 = processed_data["open"].iloc[0]
-    openN = processed_data["open"].iloc[-1]
-    shares = initial_balance / open0
-    final_balance = shares * openN
+    shares = state["benchmark_shares"]
+    opens = np.asarray(state["benchmark_opens"])
+    final_balance = shares * opens[-1]
     total_return = final_balance - initial_balance
     pct_return = (final_balance / initial_balance - 1) * 100
-    equity_curve = processed_data["open"] * shares
+    equity_curve = opens * shares
     return {
         "final_balance": final_balance,
         "total_return": total_return,
@@ -66,6 +67,109 @@ def _get_benchmark_hold_returns(processed_data, initial_balance):
         "equity_curve": list(equity_curve)
     }
 
+def load_strategy_class(strategy_name):
+    """Procura a classe da estratégia nos módulos de backend/strategies. Retorna None se não existir."""
+    for fname in os.listdir(STRATEGY_DIR):
+        if fname.endswith(".py") and not fname.startswith("_"):
+            module_name = fname[:-3]
+            module = importlib.import_module(f"backend.strategies.{module_name}")
+            if hasattr(module, strategy_name):
+                return getattr(module, strategy_name)
+    return None
+
+def load_market_data(symbol, interval, start_date="1 Jan 2020", end_date=None, warmup_bars=None, columns=None,
+                     downcast=False):
+    """
+    Carrega (baixando se o catálogo não tiver o período) e pré-processa os dados de um símbolo/intervalo.
+
+    Só são lidas as barras entre start_date e end_date, mais `warmup_bars` barras
+    anteriores para aquecer os indicadores (None = todo o histórico anterior).
+    `columns` restringe as colunas OHLCV lidas do CSV e `downcast` converte para
+    float32 as que cabem sem perda (ver BinanceDataHandler.load_from_csv).
+    A memória ocupada pelo dataset carregado fica em df.attrs['memory'] (ver memory_report).
+    """
+    data_handler = BinanceDataHandler()
+    # +1 barra porque o pré-processamento descarta a primeira (retorno NaN)
+    warmup = None if warmup_bars is None else warmup_bars + 1
+    options = {"warmup_bars": warmup, "columns": columns, "downcast": downcast}
+    # O catálogo diz se há dados cobrindo o período sem abrir o CSV; se não, baixa (ou completa) antes.
+    # Um dataset existente é sempre estendido a partir da última barra gravada (start_date
+    # só vale para um arquivo novo), senão o CSV publicado ficaria com um buraco
+    entry = find_dataset(symbol, interval, data_handler.DATA_DIR)
+    if not covers(entry, start_date, end_date):
+        download = {"start_date": start_date} if entry is None or not entry["rows"] else {}
+        data_handler.download_all_intervals(symbol=symbol, intervals=[interval], **download)
+    df = data_handler.load_from_csv(symbol, interval, start=start_date, end=end_date, **options)
+    df = data_handler.preprocess_data(df)
+    if df is not None:
+        df.attrs['memory'] = memory_report(df)
+    return df
+
+def select_window(processed_data, start_date=None, end_date=None, warmup_bars=None):
+    """
+    Recorta dados já carregados (histórico completo) para a janela [start_date, end_date]
+    mais `warmup_bars` barras anteriores, como load_market_data faria a partir do disco.
+    """
+    index = processed_data.index.values
+    begin, stop = 0, len(processed_data)
+    if end_date is not None:
+        stop = int(np.searchsorted(index, np.datetime64(pd.Timestamp(end_date)), side="right"))
+    if start_date is not None and warmup_bars is not None:
+        first = int(np.searchsorted(index, np.datetime64(pd.Timestamp(start_date)), side="left"))
+        begin = max(0, first - warmup_bars) if first < stop else stop
+    return processed_data.iloc[begin:stop]
+
+def get_strategy_warmup(StrategyClass, strategy_params=None):
+    """
+    Número de barras de aquecimento declarado pela estratégia (atributo `warmup_bars`).
+    Retorna None se a estratégia não declarar, indicando que todo o histórico deve ser usado.
+    """
+    return getattr(StrategyClass(**(strategy_params or {})), "warmup_bars", None)
+
+def get_strategy_columns(StrategyClass, strategy_params=None):
+    """
+    Colunas que precisam ser carregadas para a estratégia: as declaradas em
+    `required_columns` mais as do motor de execução. Retorna None (todas as colunas)
+    se a estratégia não declarar.
+    """
+    required = getattr(StrategyClass(**(strategy_params or {})), "required_columns", None)
+    if required is None:
+        return None
+    return ENGINE_COLUMNS + [c for c in required if c not in ENGINE_COLUMNS]
+
+def load_higher_timeframes(symbol, interval, processed_data, timeframes):
+    """
+    Carrega os timeframes superiores pedidos pela estratégia e os mapeia para as
+    barras de `processed_data` via mapa de alinhamento pré-calculado (em cache).
+
+    Args:
+        timeframes (dict|list): {intervalo: barras de aquecimento} ou lista de intervalos.
+    Returns:
+        dict intervalo -> TimeframeView, ou None se faltar dados de algum intervalo.
+    """
+    if not isinstance(timeframes, dict):
+        timeframes = {tf: None for tf in timeframes}
+    views = {}
+    for htf_interval, warmup in timeframes.items():
+        htf_data = load_market_data(
+            symbol, htf_interval, processed_data.index[0], processed_data.index[-1], warmup_bars=warmup
+        )
+        if htf_data is None or htf_data.empty:
+            return None
+        index_map = get_alignment_map(symbol, processed_data.index, interval, htf_data.index, htf_interval)
+        views[htf_interval] = TimeframeView(htf_interval, htf_data, index_map, processed_data.index)
+    return views
+
+def _generate_signals(strategy, data, **context):
+    """
+    Chama strategy.generate_signals passando apenas os argumentos extras
+    (ex: indicators) que a estratégia aceita, mantendo compatibilidade com
+    estratégias que só recebem os dados.
+    """
+    accepted = inspect.signature(strategy.generate_signals).parameters
+    kwargs = {k: v for k, v in context.items() if k in accepted and v is not None}
+    return strategy.generate_signals(data, **kwargs)
+
 def run_backtest(
     strategy_name, 
     interval, 
@@ -73,65 +177,349 @@ def run_backtest(
     start_date="1 Jan 2020", 
     initial_balance=10000, 
     strategy_params=None, 
-    fee_pct=0.001
+    fee_pct=0.001,
+    end_date=None,
+    lookahead_checks=LOOKAHEAD_CHECKS,
+    source_data=None,
+    lean=False,
+    execution=None,
+    stops=None,
+    targets=None
 ):
     """
     Executa o backtest para a estratégia e intervalo selecionados.
+    O backtest cobre apenas o período entre start_date e end_date (None = até o fim dos dados);
+    só essa janela e as barras de aquecimento da estratégia são lidas do disco.
     Retorna um dicionário só com estatísticas quantitativas relevantes e séries para gráficos.
-    Inclui auditoria automática dos trades.
+    Inclui auditoria automática dos trades e um teste de lookahead da estratégia
+    (`lookahead_checks` pontos de corte; 0 desativa).
+    Se `source_data` (histórico completo já pré-processado, ex: da memória compartilhada)
+    for informado, a janela é recortada dele em vez de lida do disco.
+    Com `lean=True`, só as colunas que a estratégia declara (`required_columns`) são
+    lidas e as que cabem em float32 sem perda são convertidas (só no armazenamento: o motor
+    calcula em float64); a memória ocupada pelos dados fica em result['data_memory'].
+    `execution` seleciona o modelo de execução (ver backend.execution.get_execution_model);
+    None mantém o padrão: ordem inteira no open da barra seguinte, só com a taxa.
+    `stops` adiciona saídas por stop loss/trailing (ver backend.execution.StopRules); com
+    resolution='sub', as sub-barras (ex: 1m) do mesmo período são carregadas para resolver
+    a ordem dos preços dentro das barras em que um stop pode disparar.
+    `targets` ('long_short' ou 'long_only', ver TARGET_MODES) usa o motor vetorizado de
+    exposição-alvo (_simulate_targets): a estratégia define a fração do capital comprada
+    ou vendida em cada barra, em vez de só alternar entre comprado e caixa.
     """
-    # 1. Carregar dados
-    data_handler = BinanceDataHandler()
-    df = data_handler.load_from_csv(symbol, interval)
-    if df is None:
-        data_handler.download_all_intervals(symbol=symbol, intervals=[interval], start_date=start_date)
-        df = data_handler.load_from_csv(symbol, interval)
-    processed_data = data_handler.preprocess_data(df)
+    # 1. Carregar estratégia de forma dinâmica
+    StrategyClass = load_strategy_class(strategy_name)
+    if StrategyClass is None:
+        return {"error": f"Estratégia '{strategy_name}' não encontrada."}
+
+    execution = get_execution_model(execution)
+    stops = get_stop_rules(stops)
+
+    # 2. Carregar dados (só a janela pedida + aquecimento)
+    warmup = get_strategy_warmup(StrategyClass, strategy_params)
+    if source_data is not None:
+        processed_data = select_window(source_data, start_date, end_date, warmup_bars=warmup)
+    else:
+        columns = get_strategy_columns(StrategyClass, strategy_params) if lean else None
+        for extra in (execution, stops):
+            if columns is not None and extra is not None:
+                columns += [c for c in extra.required_columns if c not in columns]
+        processed_data = load_market_data(
+            symbol, interval, start_date, end_date, warmup_bars=warmup, columns=columns, downcast=lean
+        )
     if processed_data is None or processed_data.empty:
         return {"error": "Dados insuficientes para backtest."}
 
-    # 2. Carregar estratégia de forma dinâmica
-    found = False
-    for fname in os.listdir(STRATEGY_DIR):
-        if fname.endswith(".py") and not fname.startswith("_"):
-            module_name = fname[:-3]
-            module = importlib.import_module(f"backend.strategies.{module_name}")
-            if hasattr(module, strategy_name):
-                StrategyClass = getattr(module, strategy_name)
-                found = True
-                break
-    if not found:
-        return {"error": f"Estratégia '{strategy_name}' não encontrada."}
+    sub_bars = None
+    if stops is not None and stops.resolution == "sub":
+        if interval_to_timedelta(stops.sub_interval) >= interval_to_timedelta(interval):
+            return {"error": f"Sub-intervalo '{stops.sub_interval}' precisa ser menor que '{interval}'."}
+        sub_bars = load_market_data(
+            symbol, stops.sub_interval, start_date, processed_data.index[-1] + interval_to_timedelta(interval),
+            warmup_bars=0, columns=stops.required_columns, downcast=lean
+        )
+        if sub_bars is None or sub_bars.empty:
+            return {"error": f"Dados insuficientes no intervalo {stops.sub_interval} para os stops."}
+
+    result = backtest_on_data(
+        processed_data, StrategyClass, interval,
+        symbol=symbol,
+        initial_balance=initial_balance,
+        strategy_params=strategy_params,
+        fee_pct=fee_pct,
+        start=start_date,
+        lookahead_checks=lookahead_checks,
+        execution=execution,
+        stops=stops,
+        sub_bars=sub_bars,
+        targets=targets
+    )
+    if "error" not in result:
+        # Memória dos dados usados no backtest (janela + aquecimento e, se houver, sub-barras)
+        result["data_memory"] = {"data": memory_report(processed_data)}
+        if sub_bars is not None:
+            result["data_memory"]["sub_bars"] = memory_report(sub_bars)
+    return result
+
+def backtest_on_data(
+    processed_data,
+    StrategyClass,
+    interval,
+    symbol="BTCUSDT",
+    initial_balance=10000,
+    strategy_params=None,
+    fee_pct=0.001,
+    indicators=None,
+    start=None,
+    lookahead_checks=0,
+    execution=None,
+    stops=None,
+    sub_bars=None,
+    targets=None
+):
+    """
+    Executa o backtest sobre dados já carregados e pré-processados.
+    Permite reaproveitar os mesmos dados (e o cache de indicadores) entre várias estratégias.
+    Barras anteriores a `start` servem só de aquecimento para os indicadores.
+    `sub_bars` são as sub-barras (ex: 1m) já carregadas, obrigatórias para stops com resolution='sub'.
+    """
+    result, _ = _execute_backtest(
+        processed_data, StrategyClass, interval, symbol, initial_balance, strategy_params, fee_pct, indicators, start,
+        lookahead_checks, get_execution_model(execution), get_stop_rules(stops), sub_bars, targets
+    )
+    return result
+
+def _execute_backtest(processed_data, StrategyClass, interval, symbol, initial_balance, strategy_params, fee_pct,
+                      indicators, start=None, lookahead_checks=0, execution=None, stops=None, sub_bars=None,
+                      targets=None):
+    """Núcleo do backtest. Retorna (resultado, índice de datas da curva de capital)."""
+    if execution is not None and stops is not None:
+        return {"error": "Stops ainda não são suportados junto com modelos de execução parcial."}, None
+    if stops is not None and stops.resolution == "sub" and sub_bars is None:
+        return {"error": f"Stops com resolution='sub' precisam das sub-barras ({stops.sub_interval}) em `sub_bars`."}, None
+    if targets is not None:
+        if targets not in TARGET_MODES:
+            return {"error": f"Modo de exposição-alvo desconhecido: '{targets}' (use {', '.join(TARGET_MODES)})."}, None
+        if execution is not None or stops is not None:
+            return {"error": "O motor de exposição-alvo ainda não suporta execução parcial nem stops."}, None
+    prepared = _prepare_execution(
+        processed_data, StrategyClass, interval, symbol, strategy_params, indicators, start, targets
+    )
+    if "error" in prepared:
+        return prepared, None
+    joined = prepared["joined"]
+    processed_data = prepared["processed_data"]
+    equity_index = joined.index
 
+    state = _new_engine_state(initial_balance, processed_data)
+    fills = None
+    if execution is not None:
+        # Capacidade/slippage por barra calculados de uma vez (vetorizado), sem a barra âncora
+        fills = execution.prepare(prepared["signal_data"], joined.index[1:])
+    if targets is not None:
+        _simulate_targets(
+            state, joined.index[1:], joined['open'].to_numpy(dtype=float)[1:], joined['shifted_signal'].to_numpy()[1:], fee_pct
+        )
+    elif stops is not None:
+        # Máximas/mínimas e o índice barra -> sub-barras calculados de uma vez
+        bars = stops.prepare(prepared["signal_data"], joined.index[1:], interval, sub_bars)
+        _simulate_bars_stops(
+            state, joined.index[1:], joined['open'].to_numpy(dtype=float)[1:], joined['shifted_signal'].to_numpy()[1:], fee_pct,
+            stops, bars
+        )
+    else:
+        _simulate_bars(
+            state, joined.index[1:], joined['open'].to_numpy(dtype=float)[1:], joined['shifted_signal'].to_numpy()[1:], fee_pct,
+            fills
+        )
+    lookahead = _check_lookahead(prepared, indicators, lookahead_checks) if lookahead_checks else None
+    result = _build_result(state, StrategyClass.__name__, interval, symbol, fee_pct, lookahead, strategy_params)
+    # Ano / mês / regime de volatilidade: uma redução agrupada sobre a curva e os trades
+    result["breakdown"] = compute_breakdown(
+        equity_index, result["equity_curve"], state["in_position"],
+        [d["exit"] for d in result["trade_dates"]], result["returns_per_trade"], result["trade_pnls"],
+        prepared["signal_data"]
+    )
+    if execution is not None:
+        result["execution"] = {
+            "model": type(execution).__name__,
+            "params": dict(vars(execution)),
+            "n_fills": state["n_fills"],
+            "n_partial_fills": state["n_partial_fills"],
+            "slippage_cost": round(float(state["slippage_cost"]), 2),
+        }
+    if targets is not None:
+        result["targets"] = {
+            "mode": targets,
+            "n_rebalances": state["n_rebalances"],
+            "long_exposure_pct": round(state["long_exposure_pct"], 2),
+            "short_exposure_pct": round(state["short_exposure_pct"], 2),
+            "avg_gross_exposure": round(state["avg_gross_exposure"], 4),
+        }
+    if stops is not None:
+        result["stops"] = {
+            "params": dict(vars(stops)),
+            "n_stop_exits": state["n_stop_exits"],
+            # Barras em que um stop podia disparar / repassadas nas sub-barras
+            "n_candidate_bars": state["n_stop_candidates"],
+            "n_refined_bars": state["n_refined_bars"],
+            "n_sub_bars": 0 if sub_bars is None else len(sub_bars),
+        }
+    return result, equity_index
+
+def _prepare_execution(processed_data, StrategyClass, interval, symbol, strategy_params, indicators, start=None,
+                       targets=None):
+    """
+    Gera os sinais e monta a tabela de execução (sinal da barra anterior + open da barra).
+    A primeira linha de `joined` é a barra âncora do saldo inicial (não negocia).
+    Com `targets` (modo de TARGET_MODES), a coluna de sinal traz a exposição-alvo,
+    limitada ao intervalo do modo.
+    """
     # 3. Gerar sinais
     params = strategy_params or {}
     strategy = StrategyClass(**params)
-    signals = strategy.generate_signals(processed_data)
-    if signals.empty:
+    higher_timeframes = None
+    if getattr(strategy, "higher_timeframes", None):
+        higher_timeframes = load_higher_timeframes(symbol, interval, processed_data, strategy.higher_timeframes)
+        if higher_timeframes is None:
+            return {"error": "Dados insuficientes nos timeframes superiores."}
+    signal_data = processed_data
+    # Estratégias de arrays devolvem int8 direto; as de DataFrame passam pelo adaptador (NaN = sem sinal)
+    array_strategy = as_array_strategy(strategy)
+    signals_are_targets = targets is not None and hasattr(array_strategy, "target_array")
+    produce = array_strategy.target_array if signals_are_targets else array_strategy.signal_array
+    signal_values = produce(processed_data, indicators=indicators, higher_timeframes=higher_timeframes)
+    index = processed_data.index
+    # Preços sempre em float64 no motor (float32 do modo lean é só armazenamento)
+    opens = as_float64(processed_data, 'open')
+    if signal_values.dtype.kind == 'f':
+        keep = ~np.isnan(signal_values)
+        if not keep.all():
+            index, opens, signal_values = index[keep], opens[keep], signal_values[keep]
+    if len(signal_values) == 0:
         return {"error": "Nenhum sinal gerado."}
-    signals = signals.copy().dropna(subset=['signal'])
-    signals['shifted_signal'] = signals['signal'].shift(1)
-    joined = signals.join(processed_data[['open']], how='inner')
-    joined = joined.iloc[1:]
-
-    # Para computar equity: Executa trade na próxima barra, só alterna entre posição e caixa
-    balance = initial_balance
-    position = 0
-    equity_curve = [balance]
-    trade_returns = []
-    trade_outcomes = []
-    trades = []
-    last_trade_day = None
-    trade_start_index = None
-    last_trade_price = None
-    trade_durations = []
-    trade_pnls = []
-    trade_types = []
-    trade_dates = []
-
-    for idx, row in joined.iterrows():
-        sig = row['shifted_signal']
-        open_price = row['open']
+    # Saída da estratégia (sinais, ou as exposições-alvo dela) para o detector de lookahead
+    signals = pd.DataFrame({'signal': signal_values}, index=index)
+    if targets is not None:
+        if not signals_are_targets:
+            signal_values = signals_to_targets(signal_values)
+        signal_values = np.clip(signal_values, *TARGET_MODES[targets])
+    # Sinal da barra anterior (executado no open da barra atual)
+    shifted = np.empty(len(signal_values))
+    shifted[0] = np.nan
+    shifted[1:] = signal_values[:-1]
+    joined = pd.DataFrame({'open': opens, 'shifted_signal': shifted}, index=index)
+    if start is not None:
+        # Descarta as barras de aquecimento: o backtest começa em `start`
+        start_ts = np.datetime64(pd.Timestamp(start))
+        joined = joined.iloc[int(np.searchsorted(index.values, start_ts)):]
+        processed_data = processed_data.iloc[int(np.searchsorted(processed_data.index.values, start_ts)):]
+        if len(joined) < 2:
+            return {"error": "Dados insuficientes para backtest."}
+    return {
+        "joined": joined,
+        "processed_data": processed_data,
+        "strategy": strategy,
+        "signals": signals,
+        "signals_are_targets": signals_are_targets,
+        "signal_data": signal_data,
+        "higher_timeframes": higher_timeframes,
+    }
+
+def _check_lookahead(prepared, indicators, n_cuts):
+    """
+    Roda o detector de lookahead da trade_audit sobre a estratégia já preparada.
+    Os prefixos reaproveitam os indicadores calculados sobre os dados completos.
+    Quando o motor usou as exposições-alvo da estratégia (target_array), é nelas que
+    o teste é feito, e não só em compute_signals.
+    """
+    strategy = prepared["strategy"]
+    data = prepared["signal_data"]
+    views = prepared["higher_timeframes"]
+    cache = indicators if indicators is not None and indicators.data is data else IndicatorCache(data)
+
+    def generate(prefix, n_rows):
+        prefix_views = {k: v.prefix(n_rows) for k, v in views.items()} if views else None
+        if prepared["signals_are_targets"]:
+            targets = strategy.target_array(prefix, indicators=cache.prefix(n_rows), higher_timeframes=prefix_views)
+            return pd.DataFrame({'signal': targets}, index=prefix.index)
+        return _generate_signals(strategy, prefix, indicators=cache.prefix(n_rows), higher_timeframes=prefix_views)
+
+    try:
+        lookahead = detect_lookahead(
+            generate, data, prepared["signals"]['signal'], n_cuts=n_cuts,
+            min_bars=max(50, getattr(strategy, "warmup_bars", None) or 0)
+        )
+        if prepared["signals_are_targets"]:
+            lookahead["checked"] = "targets"
+        return lookahead
+    except Exception as e:
+        return {"lookahead_detected": None, "n_cuts_tested": 0, "message": f"Erro no teste de lookahead: {str(e)}"}
+
+def _new_engine_state(initial_balance, processed_data):
+    """
+    Estado completo do motor de execução. Pode ser salvo (checkpoint) e retomado
+    com novas barras via _simulate_bars, produzindo o mesmo resultado de uma execução completa.
+    """
+    opens = as_float64(processed_data, "open")
+    return {
+        "initial_balance": initial_balance,
+        "balance": initial_balance,
+        "position": 0,
+        "n_bars": 0,
+        "last_timestamp": None,
+        "last_open": None,
+        "equity_curve": [initial_balance],
+        "in_position": [],
+        "trades": [],
+        "trade_returns": [],
+        "trade_outcomes": [],
+        "trade_durations": [],
+        "trade_pnls": [],
+        "trade_types": [],
+        "trade_dates": [],
+        "trade_start_index": None,
+        "trade_start_bar": None,
+        # Buy & hold: compra tudo na primeira barra
+        "benchmark_shares": initial_balance / opens[0],
+        "benchmark_opens": list(opens),
+    }
+
+def _close_trade(state, exit_index, price_exit, fee_exit, balance, bar, trade_start_index, trade_start_bar, **extra):
+    """
+    Registra o fechamento do trade comprado aberto (trades[-1]) no estado: retorno,
+    resultado, duração, PnL, tipo e datas, e completa o registro do trade.
+    `balance` é o caixa após a saída; `extra` vai para o registro (ex: exit_reason).
+    """
+    trades = state["trades"]
+    entry_balance = trades[-1]['balance_before_entry'] if trades else state["initial_balance"]
+    trade_duration = bar - (trade_start_bar if trade_start_bar is not None else 0)
+    state["trade_returns"].append((balance - entry_balance) / entry_balance)
+    state["trade_outcomes"].append(balance > entry_balance)
+    state["trade_durations"].append(trade_duration)
+    state["trade_pnls"].append(balance - entry_balance)
+    state["trade_types"].append('LONG')
+    state["trade_dates"].append({"entry": trade_start_index, "exit": exit_index})
+    trades[-1].update({'dt_exit': exit_index, 'price_exit': price_exit, 'fee_exit': fee_exit, 'balance_after_exit': balance, 'pnl': balance - entry_balance, 'duration': trade_duration, **extra})
+
+def _simulate_bars(state, index, opens, shifted_signals, fee_pct, fills=None):
+    """
+    Processa as barras em sequência, atualizando `state`.
+    Executa trade na próxima barra (sinal deslocado), só alterna entre posição e caixa.
+    Com `fills` (arrays de um modelo de execução), usa preenchimentos parciais com slippage.
+    """
+    if fills is not None:
+        return _simulate_bars_partial(state, index, opens, shifted_signals, fee_pct, fills)
+    balance = state["balance"]
+    position = state["position"]
+    bar = state["n_bars"]
+    equity_curve = state["equity_curve"]
+    in_position = state["in_position"]
+    trades = state["trades"]
+    trade_start_index = state["trade_start_index"]
+    trade_start_bar = state["trade_start_bar"]
+
+    for idx, open_price, sig in zip(index, opens, shifted_signals):
         # BUY
         if sig == 1 and position <= 0:
             fee = balance * fee_pct
@@ -140,80 +528,410 @@ def run_backtest(
             trades.append({'dt_entry': idx, 'type': 'BUY', 'price_entry': open_price, 'fee_entry': fee, 'balance_before_entry': balance, 'position_qty': position})
             balance = 0
             trade_start_index = idx
-            last_trade_price = open_price
+            trade_start_bar = bar
         # SELL
         elif sig == -1 and position > 0:
             gross = position * open_price
             fee = gross * fee_pct
-            proceeds = gross - fee
-            ret = (proceeds - (trades[-1]['balance_before_entry'] if trades else initial_balance)) / (trades[-1]['balance_before_entry'] if trades else initial_balance)
-            trade_returns.append(ret)
-            trade_outcomes.append(proceeds > (trades[-1]['balance_before_entry'] if trades else initial_balance))
-            trade_duration = joined.index.get_loc(idx) - (joined.index.get_loc(trade_start_index) if trade_start_index is not None else 0)
-            trade_durations.append(trade_duration)
-            trade_pnls.append(proceeds - (trades[-1]['balance_before_entry'] if trades else initial_balance))
-            trade_types.append('LONG')
-            trade_dates.append({"entry": trade_start_index, "exit": idx})
-            balance = proceeds
-            trades[-1].update({'dt_exit': idx, 'price_exit': open_price, 'fee_exit': fee, 'balance_after_exit': balance, 'pnl': proceeds - (trades[-1]['balance_before_entry'] if trades else initial_balance), 'duration': trade_duration})
+            balance = gross - fee
+            _close_trade(state, idx, open_price, fee, balance, bar, trade_start_index, trade_start_bar)
             position = 0
             trade_start_index = None
-            last_trade_price = None
+            trade_start_bar = None
         # equity curve após cada candle
         cur_equity = balance + position * open_price
         equity_curve.append(cur_equity)
-    
+        in_position.append(position > 0)
+        bar += 1
+
+    state.update({
+        "balance": balance,
+        "position": position,
+        "n_bars": bar,
+        "trade_start_index": trade_start_index,
+        "trade_start_bar": trade_start_bar,
+    })
+    if len(index):
+        state["last_timestamp"] = index[-1]
+        state["last_open"] = opens[-1]
+    return state
+
+def _simulate_bars_partial(state, index, opens, shifted_signals, fee_pct, fills):
+    """
+    Variante de _simulate_bars com preenchimentos parciais: cada barra preenche no
+    máximo fills["capacity"] unidades, com slippage half_spread + impact_coef * sqrt(qty).
+    O sinal define o alvo (comprado/zerado), que segue valendo nas barras seguintes até
+    a ordem ser completada. Um trade vai do primeiro preenchimento de compra até a
+    posição zerar; preços de entrada/saída são médios ponderados pelos preenchimentos.
+    """
+    balance = state["balance"]
+    position = state["position"]
+    bar = state["n_bars"]
+    target = state.get("target", 0)
+    entry_qty, entry_value = state.get("entry_qty", 0.0), state.get("entry_value", 0.0)
+    exit_qty, exit_value, exit_fees = state.get("exit_qty", 0.0), state.get("exit_value", 0.0), state.get("exit_fees", 0.0)
+    slippage_cost = state.get("slippage_cost", 0.0)
+    n_fills, n_partial = state.get("n_fills", 0), state.get("n_partial_fills", 0)
+    trades = state["trades"]
+    trade_start_index = state["trade_start_index"]
+    trade_start_bar = state["trade_start_bar"]
+    capacity, impact_coef, half_spread = fills["capacity"], fills["impact_coef"], fills["half_spread"]
+
+    for i, (idx, open_price, sig) in enumerate(zip(index, opens, shifted_signals)):
+        if sig == 1:
+            target = 1
+        elif sig == -1:
+            target = 0
+
+        # BUY (ou continuação de uma compra parcial)
+        if target == 1 and balance > 0 and capacity[i] > 0:
+            wanted = balance * (1 - fee_pct) / open_price
+            qty = min(wanted, capacity[i])
+            slip = half_spread + impact_coef[i] * np.sqrt(qty)
+            fill_price = open_price * (1 + slip)
+            cost = qty * fill_price
+            if qty >= wanted or cost * (1 + fee_pct) >= balance:
+                # Preenchimento completo: usa todo o caixa
+                fee = balance * fee_pct
+                qty = (balance - fee) / fill_price
+                cost, spent = balance - fee, balance
+            else:
+                fee = cost * fee_pct
+                spent = cost + fee
+                n_partial += 1
+            if trade_start_index is None:
+                trades.append({'dt_entry': idx, 'type': 'BUY', 'price_entry': fill_price, 'fee_entry': 0.0, 'balance_before_entry': balance, 'position_qty': 0.0})
+                trade_start_index = idx
+                trade_start_bar = bar
+            balance -= spent
+            if balance < 1e-9 * spent:
+                balance = 0
+            position += qty
+            entry_qty += qty
+            entry_value += cost
+            slippage_cost += qty * open_price * slip
+            n_fills += 1
+            trades[-1].update({'price_entry': entry_value / entry_qty, 'fee_entry': trades[-1]['fee_entry'] + fee, 'position_qty': entry_qty})
+        # SELL (ou continuação de uma venda parcial)
+        elif target == 0 and position > 0 and capacity[i] > 0:
+            qty = min(position, capacity[i])
+            slip = half_spread + impact_coef[i] * np.sqrt(qty)
+            fill_price = open_price * (1 - slip)
+            gross = qty * fill_price
+            fee = gross * fee_pct
+            balance += gross - fee
+            position = 0 if qty >= position else position - qty
+            if position > 0:
+                n_partial += 1
+            exit_qty += qty
+            exit_value += gross
+            exit_fees += fee
+            slippage_cost += qty * open_price * slip
+            n_fills += 1
+            if position == 0:
+                _close_trade(state, idx, exit_value / exit_qty, exit_fees, balance, bar, trade_start_index, trade_start_bar)
+                entry_qty = entry_value = exit_qty = exit_value = exit_fees = 0.0
+                trade_start_index = None
+                trade_start_bar = None
+        # equity curve após cada candle
+        state["equity_curve"].append(balance + position * open_price)
+        state["in_position"].append(position > 0)
+        bar += 1
+
+    state.update({
+        "balance": balance,
+        "position": position,
+        "n_bars": bar,
+        "trade_start_index": trade_start_index,
+        "trade_start_bar": trade_start_bar,
+        "target": target,
+        "entry_qty": entry_qty,
+        "entry_value": entry_value,
+        "exit_qty": exit_qty,
+        "exit_value": exit_value,
+        "exit_fees": exit_fees,
+        "slippage_cost": slippage_cost,
+        "n_fills": n_fills,
+        "n_partial_fills": n_partial,
+    })
+    if len(index):
+        state["last_timestamp"] = index[-1]
+        state["last_open"] = opens[-1]
+    return state
+
+def _simulate_bars_stops(state, index, opens, shifted_signals, fee_pct, stops, bars):
+    """
+    Variante de _simulate_bars com saídas por stop (ver execution.StopRules).
+    Entradas e saídas por sinal continuam no open; depois dele, cada barra com posição
+    testa o stop. Só as barras em que algum stop pode disparar (mínima <= maior nível
+    possível dentro da barra) são repassadas nas sub-barras, pelo índice barra -> fatia
+    pré-calculado em `bars`; nas outras nada muda e o custo é o de uma barra comum.
+    """
+    balance = state["balance"]
+    position = state["position"]
+    bar = state["n_bars"]
+    trades = state["trades"]
+    trade_start_index = state["trade_start_index"]
+    trade_start_bar = state["trade_start_bar"]
+    entry_price = state.get("entry_price")
+    peak = state.get("peak")
+    stopped = state.get("stopped_out", False)
+    n_stop_exits = state.get("n_stop_exits", 0)
+    n_candidates = state.get("n_stop_candidates", 0)
+    n_refined = state.get("n_refined_bars", 0)
+    highs, lows = bars["high"], bars["low"]
+    refine = "starts" in bars
+
+    def close_long(exit_index, price, reason):
+        nonlocal balance, position, trade_start_index, trade_start_bar, stopped, n_stop_exits
+        gross = position * price
+        fee = gross * fee_pct
+        balance = gross - fee
+        _close_trade(state, exit_index, price, fee, balance, bar, trade_start_index, trade_start_bar, exit_reason=reason)
+        position = 0
+        trade_start_index = None
+        trade_start_bar = None
+        if reason != "signal":
+            stopped = True
+            n_stop_exits += 1
+
+    for i, (idx, open_price, sig) in enumerate(zip(index, opens, shifted_signals)):
+        if sig != 1:
+            stopped = False
+        # BUY (não reentra enquanto o sinal que levou ao stop continuar)
+        if sig == 1 and position <= 0 and not stopped:
+            fee = balance * fee_pct
+            position = (balance - fee) / open_price
+            trades.append({'dt_entry': idx, 'type': 'BUY', 'price_entry': open_price, 'fee_entry': fee, 'balance_before_entry': balance, 'position_qty': position})
+            balance = 0
+            trade_start_index = idx
+            trade_start_bar = bar
+            entry_price = peak = open_price
+        # SELL
+        elif sig == -1 and position > 0:
+            close_long(idx, open_price, "signal")
+
+        if position > 0:
+            level = stops.level(entry_price, peak)
+            if open_price <= level:
+                # Abriu abaixo do stop: sai no open
+                close_long(idx, open_price, stops.reason(entry_price, peak))
+            elif lows[i] <= stops.level(entry_price, max(peak, highs[i])):
+                n_candidates += 1
+                start, end = (bars["starts"][i], bars["ends"][i]) if refine else (0, 0)
+                if end > start:
+                    # Repassa as sub-barras na ordem: stop vigente, depois a nova máxima
+                    n_refined += 1
+                    sub_open, sub_high, sub_low = bars["sub_open"], bars["sub_high"], bars["sub_low"]
+                    for j in range(start, end):
+                        level = stops.level(entry_price, peak)
+                        if sub_low[j] <= level:
+                            price = sub_open[j] if sub_open[j] <= level else level
+                            close_long(bars["sub_index"][j], price, stops.reason(entry_price, peak))
+                            break
+                        if sub_high[j] > peak:
+                            peak = sub_high[j]
+                elif lows[i] <= level:
+                    close_long(idx, level, stops.reason(entry_price, peak))
+            if position > 0 and highs[i] > peak:
+                peak = highs[i]
+        # equity curve após cada candle
+        state["equity_curve"].append(balance + position * open_price)
+        state["in_position"].append(position > 0)
+        bar += 1
+
+    state.update({
+        "balance": balance,
+        "position": position,
+        "n_bars": bar,
+        "trade_start_index": trade_start_index,
+        "trade_start_bar": trade_start_bar,
+        "entry_price": entry_price,
+        "peak": peak,
+        "stopped_out": stopped,
+        "n_stop_exits": n_stop_exits,
+        "n_stop_candidates": n_candidates,
+        "n_refined_bars": n_refined,
+    })
+    if len(index):
+        state["last_timestamp"] = index[-1]
+        state["last_open"] = opens[-1]
+    return state
+
+def _simulate_targets(state, index, opens, targets, fee_pct):
+    """
+    Motor de exposição-alvo, vetorizado (sem laço por barra). `targets` é a fração do
+    capital mantida a partir do open de cada barra, em [-1, 1] (negativa = vendido).
+
+    A carteira só é rebalanceada quando o alvo muda; entre mudanças a quantidade fica
+    fixa e o capital na barra t é E * (1 + w * (open_t / open_inicial - 1)), com E o
+    capital (já sem a taxa) no início do trecho. Cada rebalanceamento paga
+    fee_pct * |w_novo - w_atual| * capital, com w_atual o peso já deslocado pelo preço;
+    os capitais de início dos trechos saem de um produto acumulado. Um trade é um
+    período contínuo comprado ou vendido (redimensionamentos no meio fazem parte dele)
+    e a posição aberta no fim é liquidada no último open. Se o capital zerar (ex:
+    vendido numa alta forte), a conta fica zerada dali em diante.
+    Só comprado (alvos 0/1), o resultado é o mesmo de _simulate_bars.
+    """
+    initial_balance = state["initial_balance"]
+    o = np.asarray(opens, dtype=float)
+    w = np.nan_to_num(np.asarray(targets, dtype=float))
+    k = len(w)
+    if k == 0:
+        return state
+    prev = np.r_[0.0, w[:-1]]
+    changes = w != prev
+    starts = np.flatnonzero(changes)
+
+    # Trechos de alvo constante; o trecho 0 (até o primeiro rebalanceamento) é zerado
+    seg_start = np.r_[0, starts]
+    weights = np.r_[0.0, w[starts]]
+    ref = o[seg_start]
+    rel = o[starts] / ref[:-1]
+    growth = 1 + weights[:-1] * (rel - 1)   # capital antes do rebalanceamento / capital do início do trecho
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drift = np.where(growth > 0, weights[:-1] * rel / growth, 0.0)
+    pre_value = np.empty(len(weights))
+    seg_equity = np.empty(len(weights))
+    seg_equity[0] = pre_value[0] = initial_balance
+    seg_equity[1:] = initial_balance * np.cumprod(growth * (1 - fee_pct * np.abs(weights[1:] - drift)))
+    pre_value[1:] = seg_equity[:-1] * growth
+    seg = np.cumsum(changes)
+    equity = seg_equity[seg] * (1 + weights[seg] * (o / ref[seg] - 1))
+
+    # Capital final: liquida a posição aberta (peso deslocado até o último open)
+    last_rel = o[-1] / ref[-1]
+    last_weight = weights[-1] * last_rel / (1 + weights[-1] * (last_rel - 1)) if weights[-1] else 0.0
+    final_balance = equity[-1] * (1 - fee_pct * abs(last_weight))
+    ruined = np.flatnonzero(equity <= 0)
+    ruin_bar = int(ruined[0]) if len(ruined) else k
+    if ruin_bar < k:
+        equity[ruin_bar:] = 0.0
+        w = w.copy()
+        w[ruin_bar:] = 0.0
+        final_balance = 0.0
+
+    # Trades: trechos em que o lado (comprado/vendido/zerado) muda
+    side = np.sign(weights)
+    boundaries = np.flatnonzero(side[1:] != side[:-1]) + 1
+    # Capital na fronteira: após a taxa de fechamento do lado anterior (= antes da de abertura do novo)
+    boundary_value = pre_value[boundaries] * (1 - fee_pct * np.abs(drift[boundaries - 1]))
+    trades = state["trades"]
+    for i, b in enumerate(boundaries):
+        entry_bar = seg_start[b]
+        if side[b] == 0 or entry_bar >= ruin_bar:
+            continue
+        entry_balance = boundary_value[i]
+        if i + 1 < len(boundaries):
+            b_exit = boundaries[i + 1]
+            exit_bar = seg_start[b_exit]
+            proceeds = boundary_value[i + 1]
+            fee = fee_pct * abs(drift[b_exit - 1]) * pre_value[b_exit]
+        else:
+            exit_bar = k - 1
+            proceeds = final_balance
+            fee = equity[-1] - final_balance
+        if exit_bar >= ruin_bar:
+            exit_bar, proceeds, fee = ruin_bar, 0.0, 0.0
+        # Na última barra a duração conta até o fim (como a liquidação do motor padrão)
+        duration = (k if i + 1 == len(boundaries) and exit_bar < ruin_bar else exit_bar) - entry_bar
+        long_side = side[b] > 0
+        trades.append({
+            'dt_entry': index[entry_bar], 'type': 'BUY' if long_side else 'SELL', 'price_entry': ref[b],
+            'fee_entry': fee_pct * abs(weights[b]) * pre_value[b], 'balance_before_entry': entry_balance,
+            'position_qty': weights[b] * seg_equity[b] / ref[b], 'exposure': weights[b],
+            'dt_exit': index[exit_bar], 'price_exit': o[exit_bar], 'fee_exit': fee, 'balance_after_exit': proceeds,
+            'pnl': proceeds - entry_balance, 'duration': duration,
+        })
+        state["trade_returns"].append((proceeds - entry_balance) / entry_balance)
+        state["trade_outcomes"].append(proceeds > entry_balance)
+        state["trade_durations"].append(duration)
+        state["trade_pnls"].append(proceeds - entry_balance)
+        state["trade_types"].append('LONG' if long_side else 'SHORT')
+        state["trade_dates"].append({"entry": index[entry_bar], "exit": index[exit_bar]})
+
+    state["equity_curve"].extend(equity.tolist())
+    state["in_position"].extend((w != 0).tolist())
+    state.update({
+        "balance": final_balance,
+        "position": 0,
+        "n_bars": state["n_bars"] + k,
+        "last_timestamp": index[-1],
+        "last_open": o[-1],
+        "n_rebalances": int(np.count_nonzero(changes[:ruin_bar])),
+        "long_exposure_pct": float(np.mean(w > 0) * 100),
+        "short_exposure_pct": float(np.mean(w < 0) * 100),
+        "avg_gross_exposure": float(np.mean(np.abs(w))),
+    })
+    return state
+
+def _build_result(state, strategy_name, interval, symbol, fee_pct, lookahead=None, strategy_params=None):
+    """Monta o dicionário de resultado a partir do estado do motor (sem alterá-lo)."""
+    initial_balance = state["initial_balance"]
+    trades = [dict(t) for t in state["trades"]]
+    trade_returns = list(state["trade_returns"])
+    trade_outcomes = list(state["trade_outcomes"])
+    trade_durations = list(state["trade_durations"])
+    trade_pnls = list(state["trade_pnls"])
+    trade_types = list(state["trade_types"])
+    trade_dates = list(state["trade_dates"])
+    position = state["position"]
+
     # Se posição aberta ao final, liquida
     if position > 0:
-        gross = position * joined.iloc[-1]['open']
+        last_idx, last_open = state["last_timestamp"], state["last_open"]
+        gross = position * last_open
         fee = gross * fee_pct
-        final_balance = gross - fee
+        # Caixa residual só existe com preenchimentos parciais (senão é 0)
+        final_balance = gross - fee + state["balance"]
+        # Vendas parciais já feitas entram no preço médio e na taxa de saída
+        exit_qty = state.get("exit_qty", 0.0)
+        price_exit = (state["exit_value"] + gross) / (exit_qty + position) if exit_qty else last_open
+        fee_exit = state.get("exit_fees", 0.0) + fee
         # computar PnL desse trade final
-        ret = (final_balance - (trades[-1]['balance_before_entry'] if trades else initial_balance)) / (trades[-1]['balance_before_entry'] if trades else initial_balance)
+        entry_balance = trades[-1]['balance_before_entry'] if trades else initial_balance
+        ret = (final_balance - entry_balance) / entry_balance
         trade_returns.append(ret)
-        trade_outcomes.append(final_balance > (trades[-1]['balance_before_entry'] if trades else initial_balance))
-        trade_duration = len(joined) - (joined.index.get_loc(trade_start_index) if trade_start_index is not None else 0)
+        trade_outcomes.append(final_balance > entry_balance)
+        trade_duration = state["n_bars"] - (state["trade_start_bar"] if state["trade_start_bar"] is not None else 0)
         trade_durations.append(trade_duration)
-        trade_pnls.append(final_balance - (trades[-1]['balance_before_entry'] if trades else initial_balance))
+        trade_pnls.append(final_balance - entry_balance)
         trade_types.append('LONG')
-        trade_dates.append({"entry": trade_start_index, "exit": joined.index[-1]})
-        trades[-1].update({'dt_exit': joined.index[-1], 'price_exit': joined.iloc[-1]['open'], 'fee_exit': fee, 'balance_after_exit': final_balance, 'pnl': final_balance - (trades[-1]['balance_before_entry'] if trades else initial_balance), 'duration': trade_duration})
+        trade_dates.append({"entry": state["trade_start_index"], "exit": last_idx})
+        trades[-1].update({'dt_exit': last_idx, 'price_exit': price_exit, 'fee_exit': fee_exit, 'balance_after_exit': final_balance, 'pnl': final_balance - entry_balance, 'duration': trade_duration})
     else:
-        final_balance = balance
-    equity_curve = np.array(equity_curve)
-    returns = pd.Series(np.diff(equity_curve) / equity_curve[:-1])
+        final_balance = state["balance"]
+    equity_curve = np.array(state["equity_curve"])
+    in_position = state["in_position"]
 
-    # Drawdown e equity
-    max_dd, peak_idx, dd_idx, drawdown_curve = _compute_max_drawdown(equity_curve)
+    # Métricas da curva de capital e dos trades (motor vetorizado)
+    eq = compute_equity_metrics(equity_curve, interval, initial_balance=initial_balance, in_position=in_position)
+    tm = compute_trade_metrics(trade_returns, initial_balance)
+    max_dd = eq["max_drawdown"]
     max_dd_pct = abs(max_dd) * 100
-    recov_time = _compute_recovery_time(equity_curve, peak_idx, dd_idx)
+    recov_time = eq["recovery_time"]
+    drawdown_curve = eq["drawdown_curve"]
 
     total_return = final_balance - initial_balance
     total_return_pct = (final_balance / initial_balance - 1) * 100
 
-    # Métricas avançadas
-    avg_ret_per_trade = np.mean(trade_returns) if trade_returns else 0
-    avg_daily_ret = returns.mean() if not returns.empty else 0
-    win_rate = (np.sum(trade_outcomes) / len(trade_outcomes)) * 100 if trade_outcomes else 0
-    gross_profit = np.sum([r for r in trade_returns if r > 0]) * initial_balance
-    gross_loss = -np.sum([r for r in trade_returns if r < 0]) * initial_balance
-    profit_factor = (gross_profit / gross_loss) if gross_loss > 0 else np.inf
-    n_trades = len(trade_returns)
-    rf = 0
-    excess_ret = returns - rf
-    sharpe = (excess_ret.mean() / (excess_ret.std() + 1e-9)) * np.sqrt(252) if not returns.empty else np.nan
-    volatility = returns.std() * np.sqrt(252) if not returns.empty else np.nan
+    avg_ret_per_trade = tm["avg_return"]
+    avg_daily_ret = eq["mean_return"]
+    win_rate = tm["win_rate_pct"]
+    profit_factor = tm["profit_factor"]
+    n_trades = tm["n_trades"]
+    sharpe = eq["sharpe"]
+    sortino = eq["sortino"]
+    volatility = eq["volatility"]
     net_profit = total_return  # igual ao total_return (pode mudar no futuro)
-
-    # CAGR
-    n_days = len(processed_data)
-    cagr = _compute_cagr(initial_balance, final_balance, n_days)
+    cagr = eq["cagr_pct"]
+    calmar = eq["calmar"]
 
     # Tempo médio em posição
     mean_duration = np.mean(trade_durations) if trade_durations else 0
 
     # Benchmark hold
-    benchmark = _get_benchmark_hold_returns(processed_data, initial_balance)
+    benchmark = _get_benchmark_hold_returns(state, initial_balance)
 
     # Auditoria automática dos trades
     audit_report = None
@@ -234,11 +952,14 @@ def run_backtest(
             "audit_flags": [],
             "audit_message": f"Erro na auditoria: {str(e)}"
         }
+    if lookahead is not None:
+        audit_summary["lookahead"] = lookahead
 
     return {
         "symbol": symbol,
         "interval": interval,
         "strategy": strategy_name,
+        "strategy_params": dict(strategy_params or {}),
         "initial_balance": round(initial_balance, 2),
         "final_balance": round(final_balance, 2),
         "total_return": round(total_return, 2),
@@ -255,11 +976,17 @@ def run_backtest(
         "sharpe_ratio": round(sharpe, 2) if not np.isnan(sharpe) else "N/D",
         "volatility_pct": round(volatility * 100, 2) if not np.isnan(volatility) else "N/D",
         "cagr_pct": round(cagr, 2),
+        "sortino_ratio": round(sortino, 2) if not np.isnan(sortino) else "N/D",
+        "calmar_ratio": round(calmar, 2) if not np.isnan(calmar) else "N/D",
+        "ulcer_index": round(eq["ulcer_index"], 2),
+        "exposure_time_pct": round(eq["exposure_pct"], 2),
+        "annualization_periods": eq["annualization_periods"],
         "trade_fee_pct": fee_pct,
         "mean_trade_duration": round(mean_duration, 2),
         # ---- Detalhamento para gráficos/resultados avançados: ----
         "equity_curve": list(map(float, equity_curve)),
         "drawdown_curve": list(map(float, drawdown_curve)),
+        "rolling_sharpe": list(map(float, eq["rolling_sharpe"])),
         "returns_per_trade": list(map(float, trade_returns)),  # retornos cada trade
         "trade_durations": list(map(int, trade_durations)),    # duração cada trade
         "trade_pnls": list(map(float, trade_pnls)),            # lucro/prejuízo de cada trade
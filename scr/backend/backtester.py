@@ -1,30 +1,241 @@
+import numpy as np
 import pandas as pd
+from backend.indicators import IndicatorCache
+from backend.metrics import compute_trade_metrics, periods_per_year
+from backend.strategies._base import ArrayStrategy
+
 
 class Backtester:
-    def __init__(self, initial_capital=10000):
-        self.initial_capital = initial_capital
-    
-    def backtest(self, data, signals):
+    """
+    Motor de backtest reutilizável, ligado a um único dataset.
+
+    Tudo o que depende só dos dados (opens, índice, cache de indicadores) e os buffers
+    de trabalho (curva de capital, posição, retornos, trades) são alocados uma vez no
+    construtor, com o tamanho dos dados; cada `run(params)` reescreve esses buffers e
+    devolve apenas as métricas escalares. Feito para sweeps com milhares de execuções
+    sobre os mesmos dados, onde montar DataFrames/listas a cada execução custa tanto
+    quanto a própria conta.
+
+    Mesma semântica do motor padrão de backtest_service (ordem inteira no open da barra
+    seguinte, só comprado, taxa na entrada e na saída, posição liquidada no fim) e as
+    mesmas métricas de summarize_result. A posição é o último sinal não nulo propagado
+    para frente (1 = comprado, -1 = zerado), e o capital de cada barra sai de operações
+    vetorizadas sobre os buffers; só o encadeamento do saldo entre trades é um laço,
+    sobre os trades (não sobre as barras).
+
+    Aceita estratégias ArrayStrategy sem timeframes superiores: os sinais são calculados
+    sobre os dados completos (uma estratégia causal dá os mesmos sinais no prefixo), com
+    um IndicatorCache compartilhado entre as execuções.
+    """
+    def __init__(self, data, StrategyClass, interval, start=None, initial_balance=10000, fee_pct=0.001,
+                 symbol="BTCUSDT", indicators=None):
+        if not (isinstance(StrategyClass, type) and issubclass(StrategyClass, ArrayStrategy)):
+            raise ValueError(f"Backtester só aceita estratégias ArrayStrategy ({StrategyClass.__name__}).")
+        if getattr(StrategyClass, "higher_timeframes", None):
+            raise ValueError(f"Backtester não suporta timeframes superiores ({StrategyClass.__name__}).")
+        self.data = data
+        self.StrategyClass = StrategyClass
+        self.interval = interval
+        self.symbol = symbol
+        self.initial_balance = initial_balance
+        self.fee_pct = fee_pct
+        self.indicators = indicators if indicators is not None and indicators.data is data else IndicatorCache(data)
+        self.ann = periods_per_year(interval)
+
+        n = len(data)
+        self.n_bars = n
+        self.opens = data["open"].to_numpy(dtype=float)
+        # Barra âncora do saldo inicial: a primeira em `start` (o resto antes é aquecimento)
+        self.first_bar = 0 if start is None else int(
+            np.searchsorted(data.index.values, np.datetime64(pd.Timestamp(start)))
+        )
+
+        # Buffers por barra
+        self._positions = np.arange(1, n + 1)
+        self._last_signal = np.zeros(n + 1, dtype=np.int8)   # [0] = sem sinal ainda
+        self._index = np.empty(n, dtype=np.intp)
+        self._tmp_signal = np.empty(n, dtype=np.int8)
+        self._held = np.zeros(n + 1, dtype=bool)             # [0] = zerado antes da 1ª barra
+        self._mask = np.empty(n, dtype=bool)
+        self._entries = np.empty(n, dtype=bool)
+        self._exits = np.empty(n, dtype=bool)
+        self._trade_id = np.empty(n, dtype=np.intp)
+        self._equity = np.empty(n)
+        self._work = np.empty(n)
+        self._work2 = np.empty(n)
+        # Buffers por trade (no máximo uma entrada a cada duas barras)
+        max_trades = n // 2 + 2
+        self._qty = np.zeros(max_trades)       # [i] = quantidade do i-ésimo trade (1-based)
+        self._cash = np.zeros(max_trades)      # [i] = saldo após a saída do i-ésimo trade
+        self._trade_returns = np.empty(max_trades)
+        self.n_runs = 0
+
+    def run(self, params=None, n_rows=None):
         """
-        Executa o backtest baseado nos sinais gerados
+        Executa a estratégia com `params` sobre as primeiras `n_rows` barras dos dados
+        (None = todas) e retorna as métricas escalares (mesmas chaves/arredondamento
+        de summarize_result do motor padrão), ou {"error": ...}.
         """
-        portfolio = pd.DataFrame(index=signals.index)
-        portfolio['price'] = signals['price']
-        portfolio['signal'] = signals['signal']
-        
-        # Posições (1 = comprado, -1 = vendido, 0 = neutro)
-        portfolio['position'] = portfolio['signal'].diff()
-        
-        # Capital inicial
-        portfolio['capital'] = self.initial_capital
-        
-        # Calcula retornos diários
-        portfolio['daily_return'] = portfolio['price'].pct_change()
-        
-        # Retornos da estratégia
-        portfolio['strategy_return'] = portfolio['position'].shift(1) * portfolio['daily_return']
-        
-        # Retorno acumulado
-        portfolio['cumulative_return'] = (1 + portfolio['strategy_return']).cumprod()
-        
-        return portfolio
+        params = params or {}
+        n_rows = self.n_bars if n_rows is None else min(int(n_rows), self.n_bars)
+        p0 = self.first_bar
+        m = n_rows - p0          # pontos da curva (âncora + barras negociadas)
+        if m < 2:
+            return {"error": "Dados insuficientes para backtest."}
+        k = m - 1
+        strategy = self.StrategyClass(**params)
+        signals = strategy.signal_array(self.data, indicators=self.indicators)
+        if len(signals) != self.n_bars:
+            return {"error": "A estratégia precisa gerar um sinal por barra."}
+
+        # Posição: último sinal não nulo (deslocado uma barra) propagado para frente
+        shifted = signals[p0:n_rows - 1]
+        mask, index, last = self._mask[:k], self._index[:k], self._tmp_signal[:k]
+        np.not_equal(shifted, 0, out=mask)
+        np.multiply(self._positions[:k], mask, out=index)
+        np.maximum.accumulate(index, out=index)
+        self._last_signal[1:k + 1] = shifted
+        np.take(self._last_signal, index, out=last)
+        held_ext = self._held[:k + 1]
+        held = held_ext[1:]
+        np.equal(last, 1, out=held)
+        entries, exits = self._entries[:k], self._exits[:k]
+        np.greater(held, held_ext[:-1], out=entries)
+        np.less(held, held_ext[:-1], out=exits)
+
+        # Saldo encadeado trade a trade (mesmas operações do motor padrão)
+        opens = self.opens[p0 + 1:n_rows]
+        entry_bars = np.flatnonzero(entries)
+        exit_bars = np.flatnonzero(exits)
+        n_trades = len(entry_bars)
+        fee_pct = self.fee_pct
+        qty, cash, trade_returns = self._qty, self._cash, self._trade_returns
+        balance = self.initial_balance
+        cash[0] = balance
+        duration_sum = 0
+        final_balance = balance
+        for i in range(n_trades):
+            entry_balance = balance
+            entry = entry_bars[i]
+            qty[i + 1] = position = (balance - balance * fee_pct) / opens[entry]
+            if i < len(exit_bars):
+                exit_bar = exit_bars[i]
+                gross = position * opens[exit_bar]
+                balance = gross - gross * fee_pct
+                cash[i + 1] = balance
+                final_balance = balance
+            else:
+                # Posição aberta no fim: liquida no open da última barra
+                exit_bar = k
+                gross = position * opens[-1]
+                final_balance = gross - gross * fee_pct
+            trade_returns[i] = (final_balance - entry_balance) / entry_balance
+            duration_sum += exit_bar - entry
+
+        # Capital por barra: quantidade * open com posição, saldo em caixa sem
+        trade_id, equity = self._trade_id[:k], self._equity[:m]
+        np.cumsum(entries, out=trade_id)
+        equity[0] = self.initial_balance
+        np.take(cash, trade_id, out=equity[1:])
+        value = self._work[:k]
+        np.take(qty, trade_id, out=value)
+        np.multiply(value, opens, out=value)
+        np.copyto(equity[1:], value, where=held)
+
+        self.n_runs += 1
+        eq = self._equity_metrics(m)
+        tm = compute_trade_metrics(trade_returns[:n_trades], self.initial_balance)
+        initial_balance = self.initial_balance
+        total_return = final_balance - initial_balance
+        return {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "strategy": self.StrategyClass.__name__,
+            "initial_balance": round(initial_balance, 2),
+            "final_balance": round(final_balance, 2),
+            "total_return": round(total_return, 2),
+            "total_return_pct": round((final_balance / initial_balance - 1) * 100, 2),
+            "net_profit": round(total_return, 2),
+            "avg_return_per_trade": round(tm["avg_return"] * 100, 2),
+            "avg_daily_return": round(eq["mean_return"] * 100, 2),
+            "max_drawdown_pct": round(abs(eq["max_drawdown"]) * 100, 2),
+            "max_drawdown_value": round(abs(eq["max_drawdown"]) * initial_balance, 2),
+            "recovery_time_periods": eq["recovery_time"],
+            "win_rate_pct": round(tm["win_rate_pct"], 2),
+            "profit_factor": round(tm["profit_factor"], 2) if np.isfinite(tm["profit_factor"]) else "N/D",
+            "n_trades": tm["n_trades"],
+            "sharpe_ratio": round(eq["sharpe"], 2) if not np.isnan(eq["sharpe"]) else "N/D",
+            "volatility_pct": round(eq["volatility"] * 100, 2) if not np.isnan(eq["volatility"]) else "N/D",
+            "cagr_pct": round(eq["cagr_pct"], 2),
+            "sortino_ratio": round(eq["sortino"], 2) if not np.isnan(eq["sortino"]) else "N/D",
+            "calmar_ratio": round(eq["calmar"], 2) if not np.isnan(eq["calmar"]) else "N/D",
+            "ulcer_index": round(eq["ulcer_index"], 2),
+            "exposure_time_pct": round(eq["exposure_pct"], 2),
+            "annualization_periods": self.ann,
+            "trade_fee_pct": fee_pct,
+            "mean_trade_duration": round(duration_sum / n_trades, 2) if n_trades else 0,
+        }
+
+    def equity_curve(self, n_points=None):
+        """Cópia da curva de capital da última execução (`n_points` = tamanho dela)."""
+        return self._equity[:n_points].copy()
+
+    def _equity_metrics(self, m):
+        """
+        Métricas de compute_equity_metrics (curva única) calculadas nos buffers, sem
+        curvas auxiliares (drawdown e Sharpe móvel completos não são guardados).
+        """
+        eq = self._equity[:m]
+        k = m - 1
+        ann = self.ann
+        returns, work = self._work[:k], self._work2[:k]
+        np.subtract(eq[1:], eq[:-1], out=returns)
+        np.divide(returns, eq[:-1], out=returns)
+        mean_ret = returns.mean()
+        if k > 1:
+            np.subtract(returns, mean_ret, out=work)
+            np.multiply(work, work, out=work)
+            std_ret = np.sqrt(work.sum() / (k - 1))
+        else:
+            std_ret = np.nan
+        np.minimum(returns, 0.0, out=work)
+        np.multiply(work, work, out=work)
+        downside = np.sqrt(work.mean())
+        sharpe = mean_ret / (std_ret + 1e-9) * np.sqrt(ann)
+        sortino = mean_ret / (downside + 1e-12) * np.sqrt(ann) if downside > 0 else np.nan
+        exposure = np.count_nonzero(self._held[1:m]) / k * 100
+
+        # Drawdown, Ulcer e tempo de recuperação
+        roll_max, drawdown = self._work[:m], self._work2[:m]
+        np.maximum.accumulate(eq, out=roll_max)
+        np.subtract(eq, roll_max, out=drawdown)
+        np.divide(drawdown, roll_max, out=drawdown)
+        dd_end = int(np.argmin(drawdown))
+        max_dd = drawdown[dd_end]
+        np.multiply(drawdown, 100, out=drawdown)
+        np.multiply(drawdown, drawdown, out=drawdown)
+        ulcer = np.sqrt(drawdown.mean())
+        peak_value = eq[int(np.argmax(eq[:dd_end + 1]))]
+        recovery = None
+        if dd_end < m - 1:
+            recovered = self._mask[:m - dd_end]
+            np.greater_equal(eq[dd_end:], peak_value, out=recovered)
+            if recovered.any():
+                recovery = int(np.argmax(recovered))
+
+        years = m / ann
+        initial, final = self.initial_balance, eq[-1]
+        cagr = ((final / initial) ** (1 / years) - 1) * 100 if years > 0 and initial > 0 else 0.0
+        calmar = cagr / (abs(max_dd) * 100) if max_dd < 0 else np.nan
+        return {
+            "mean_return": mean_ret,
+            "sharpe": sharpe,
+            "sortino": sortino,
+            "volatility": std_ret * np.sqrt(ann),
+            "max_drawdown": max_dd,
+            "recovery_time": recovery,
+            "ulcer_index": ulcer,
+            "cagr_pct": cagr,
+            "calmar": calmar,
+            "exposure_pct": exposure,
+        }
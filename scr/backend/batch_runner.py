@@ -0,0 +1,154 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from backend.backtest_service import run_backtest
+from backend.data_handlers.binance_data import BinanceDataHandler, memory_report
+from backend.shared_data import SharedDataPublisher, attach_shared_frame
+
+# Valores usados quando o job não especifica o campo
+JOB_DEFAULTS = {
+    "symbol": "BTCUSDT",
+    "start_date": "1 Jan 2020",
+    "end_date": None,
+    "initial_balance": 10000,
+    "fee_pct": 0.001,
+    "params": {},
+    "execution": None,
+    "stops": None,
+    "targets": None,
+}
+
+
+def load_job_file(path):
+    """
+    Lê um arquivo de jobs em JSON ou YAML.
+
+    Formatos aceitos: uma lista de jobs, ou um objeto {"defaults": {...}, "jobs": [...]}.
+    Cada job tem: strategy, interval e opcionalmente symbol, start_date, end_date,
+    initial_balance, fee_pct (fração, ex: 0.001), params (dict da estratégia) e
+    execution (modelo de execução, ex: {"model": "volume", "participation": 0.05}),
+    stops (ex: {"trailing_pct": 0.05, "resolution": "sub", "sub_interval": "1m"}) e
+    targets (motor de exposição-alvo: "long_short" ou "long_only").
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML não instalado: use um arquivo .json ou instale 'pyyaml'.")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+
+    defaults = dict(JOB_DEFAULTS)
+    if isinstance(spec, dict):
+        defaults.update(spec.get("defaults", {}))
+        jobs = spec.get("jobs", [])
+    else:
+        jobs = spec
+
+    normalized = []
+    for i, job in enumerate(jobs):
+        if "strategy" not in job or "interval" not in job:
+            raise ValueError(f"Job {i} precisa dos campos 'strategy' e 'interval'.")
+        full = dict(defaults)
+        full.update(job)
+        full.setdefault("id", i)
+        normalized.append(full)
+    return normalized
+
+
+def summarize_result(result):
+    """Mantém só as métricas escalares do resultado (sem curvas, trades e auditoria)."""
+    return {k: v for k, v in result.items() if not isinstance(v, (list, dict))}
+
+
+def _json_default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    return str(obj)
+
+
+def _run_job(job, handle=None):
+    """
+    Executa um job (no processo worker) e devolve a linha de saída.
+    Com `handle`, os dados vêm da memória compartilhada em vez do disco.
+    """
+    started = time.perf_counter()
+    try:
+        source_data = attach_shared_frame(handle).frame if handle is not None else None
+        result = run_backtest(
+            strategy_name=job["strategy"],
+            interval=job["interval"],
+            symbol=job["symbol"],
+            start_date=job["start_date"],
+            end_date=job["end_date"],
+            initial_balance=job["initial_balance"],
+            strategy_params=job["params"],
+            fee_pct=job["fee_pct"],
+            source_data=source_data,
+            execution=job["execution"],
+            stops=job["stops"],
+            targets=job["targets"],
+        )
+    except Exception as e:
+        result = {"error": str(e)}
+    return {
+        "job_id": job["id"],
+        "job": job,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+        "metrics": summarize_result(result),
+    }
+
+
+def _publish_datasets(publisher, jobs, downcast=False):
+    """
+    Publica na memória compartilhada cada símbolo/intervalo usado pelos jobs (uma vez cada)
+    e imprime a memória ocupada por dataset.
+    """
+    handler = BinanceDataHandler()
+    handles = {}
+    for key in {(job["symbol"], job["interval"]) for job in jobs}:
+        data = handler.preprocess_data(handler.load_from_csv(*key, downcast=downcast))
+        # Sem dados locais: o worker segue o caminho normal (com download)
+        if data is None or data.empty:
+            handles[key] = None
+            continue
+        handles[key] = publisher.publish(key, data)
+        report = memory_report(data)
+        print(f"Dataset {key[0]} {key[1]}: {report['rows']} barras, {report['total_bytes'] / 2**20:.2f} MiB")
+    return handles
+
+
+def run_jobs(jobs, output_path, workers=None, lean=False):
+    """
+    Executa os jobs em um pool de processos e grava uma linha JSONL por job,
+    na ordem em que terminam (o arquivo pode ser acompanhado durante a execução).
+    Cada dataset é lido uma vez e compartilhado com os workers via memória compartilhada
+    (em float32 onde não há perda de precisão, com `lean=True`).
+
+    Returns:
+        int: número de jobs que terminaram com erro.
+    """
+    workers = workers or os.cpu_count() or 1
+    n_errors = 0
+    with SharedDataPublisher() as publisher, open(output_path, "w", encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        handles = _publish_datasets(publisher, jobs, downcast=lean)
+        futures = [executor.submit(_run_job, job, handles[(job["symbol"], job["interval"])]) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            line = future.result()
+            if "error" in line["metrics"]:
+                n_errors += 1
+            out.write(json.dumps(line, default=_json_default) + "\n")
+            out.flush()
+            status = line["metrics"].get("error", "ok")
+            print(f"[{done}/{len(jobs)}] job {line['job_id']}: {line['job']['strategy']} "
+                  f"{line['job']['symbol']} {line['job']['interval']} -> {status}")
+    return n_errors
@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+from backend.indicators import rolling_mean
+
+# Janela do ATR e número de faixas (quantis) de volatilidade dos regimes
+ATR_WINDOW = 14
+N_REGIMES = 3
+
+
+def _atr_pct(data, index):
+    """
+    ATR relativo (ATR / close) por barra, alinhado a `index`. Sem high/low (ex: dados
+    lean), usa a variação absoluta do fechamento (ou do open) como true range.
+    """
+    if {"high", "low", "close"} <= set(data.columns):
+        high, low, close = (data[c].to_numpy(dtype=float) for c in ("high", "low", "close"))
+        prev_close = np.r_[np.nan, close[:-1]]
+        with np.errstate(invalid="ignore"):
+            true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+        ref = close
+    else:
+        ref = data["close" if "close" in data.columns else "open"].to_numpy(dtype=float)
+        true_range = np.abs(np.diff(ref, prepend=np.nan))
+    atr = rolling_mean(true_range, ATR_WINDOW) / ref
+    # Alinha a `index` (subconjunto ordenado das datas de `data`) por busca binária
+    source = data.index.values
+    pos = np.minimum(np.searchsorted(source, index.values), len(source) - 1)
+    return np.where(source[pos] == index.values, atr[pos], np.nan)
+
+
+def _calendar_codes(values):
+    """
+    Códigos de mês e de ano de cada barra (datas ordenadas) por busca binária nos
+    inícios de mês do período, sem converter barra a barra para o calendário.
+    """
+    months = np.arange(values[0].astype("datetime64[M]"), values[-1].astype("datetime64[M]") + 1)
+    month_codes = np.searchsorted(months.astype("datetime64[ns]"), values, side="right") - 1
+    month_keys = months.astype(np.int64)
+    year_keys = month_keys // 12
+    year_codes = (year_keys - year_keys[0])[month_codes]
+    month_labels = [f"{m // 12 + 1970}-{m % 12 + 1:02d}" for m in month_keys]
+    year_labels = [str(y + 1970) for y in range(year_keys[0], year_keys[-1] + 1)]
+    return year_codes, year_labels, month_codes, month_labels
+
+
+def label_bars(index, data=None, n_regimes=N_REGIMES):
+    """
+    Rotula cada barra uma única vez com ano, mês e regime de volatilidade (quantis
+    do ATR relativo sobre o período; -1 = sem rótulo, ex: antes do ATR ficar pronto).
+
+    Returns:
+        lista de (tipo, códigos int por barra, rótulos, extras).
+    """
+    values = pd.DatetimeIndex(index).values
+    year_codes, year_labels, month_codes, month_labels = _calendar_codes(values)
+    groups = [("year", year_codes, year_labels, {}), ("month", month_codes, month_labels, {})]
+    if data is not None:
+        atr = _atr_pct(data, pd.DatetimeIndex(index))
+        valid = np.isfinite(atr)
+        if valid.any():
+            edges = np.quantile(atr[valid], np.linspace(0, 1, n_regimes + 1)[1:-1])
+            codes = np.where(valid, np.searchsorted(edges, atr, side="right"), -1)
+            labels = [f"Q{i + 1}" for i in range(n_regimes)]
+            groups.append(("regime", codes, labels, {"atr_window": ATR_WINDOW, "atr_pct_edges": edges.tolist()}))
+    return groups
+
+
+def compute_breakdown(index, equity, in_position=None, trade_exits=None, trade_returns=None, trade_pnls=None,
+                      data=None, n_regimes=N_REGIMES):
+    """
+    Estatísticas por ano, por mês e por regime de volatilidade, numa única redução
+    agrupada: os rótulos de todos os tipos viram ids de grupo de um só array
+    (barras repetidas uma vez por tipo), ordenado uma vez, e cada estatística sai de
+    um bincount/reduceat sobre ele.
+
+    Args:
+        index: datas da curva de capital (a primeira é a barra âncora do saldo inicial).
+        equity: curva de capital (mesmo tamanho de index).
+        in_position: posição aberta em cada barra (sem a âncora).
+        trade_exits, trade_returns, trade_pnls: saída, retorno e PnL de cada trade;
+            o trade é atribuído ao período/regime da barra em que saiu.
+        data: OHLC (índice de datas) para os regimes; None = só ano e mês.
+    Returns:
+        dict tipo -> lista de registros {period, return_pct, max_drawdown_pct, bars,
+        exposure_pct, n_trades, win_rate_pct, pnl, avg_trade_return_pct}; 'regime_info'
+        com os limites dos quantis.
+    """
+    equity = np.asarray(equity, dtype=float)
+    bar_index = pd.DatetimeIndex(index)[1:]
+    n = len(bar_index)
+    if n == 0:
+        return {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_returns = np.log(equity[1:] / equity[:-1])
+    log_returns[~np.isfinite(log_returns)] = 0.0
+    exposure = np.zeros(n) if in_position is None else np.asarray(in_position, dtype=float)[:n]
+
+    groups = label_bars(bar_index, data, n_regimes)
+    gid_parts, pos_parts, meta = [], [], []
+    offset = 0
+    for kind, codes, labels, _ in groups:
+        keep = codes >= 0
+        gid_parts.append(codes[keep] + offset)
+        pos_parts.append(np.flatnonzero(keep))
+        meta.extend((kind, label) for label in labels)
+        offset += len(labels)
+    n_groups = offset
+    gid = np.concatenate(gid_parts)
+    pos = np.concatenate(pos_parts)
+    # Ordenação estável: dentro de cada grupo as barras continuam em ordem de tempo
+    order = np.argsort(gid, kind="stable")
+    gid, pos = gid[order], pos[order]
+
+    counts = np.bincount(gid, minlength=n_groups)
+    lr = log_returns[pos]
+    total_log = np.bincount(gid, weights=lr, minlength=n_groups)
+    exposed = np.bincount(gid, weights=exposure[pos], minlength=n_groups)
+
+    # Drawdown dentro de cada grupo: log-capital acumulado desde o início do grupo;
+    # cada grupo é deslocado acima do anterior para o máximo acumulado não atravessar grupos
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    cum = np.cumsum(lr)
+    rel = cum - np.repeat(np.concatenate([[0.0], cum])[starts], counts)
+    span = max(rel.max(initial=0.0), 0.0) - min(rel.min(initial=0.0), 0.0) + 1.0
+    shifted = rel + gid * span
+    running_max = np.maximum(np.maximum.accumulate(shifted), gid * span)
+    drawdown = np.expm1(shifted - running_max)
+    max_dd = np.zeros(n_groups)
+    nonempty = counts > 0
+    if nonempty.any():
+        max_dd[nonempty] = np.minimum.reduceat(drawdown, starts[nonempty])
+
+    # Trades: rotulados pela barra de saída, mesma redução por id de grupo
+    n_trades = wins = pnl = ret_sum = np.zeros(n_groups)
+    if trade_exits is not None and len(trade_exits) and n:
+        exits = pd.DatetimeIndex(pd.to_datetime(list(trade_exits))).values
+        bar_pos = np.clip(np.searchsorted(bar_index.values, exits, side="right") - 1, 0, n - 1)
+        t_returns = np.asarray(trade_returns, dtype=float)
+        t_pnls = np.asarray(trade_pnls, dtype=float)
+        t_gid, t_idx = [], []
+        offset = 0
+        for kind, codes, labels, _ in groups:
+            trade_codes = codes[bar_pos]
+            keep = trade_codes >= 0
+            t_gid.append(trade_codes[keep] + offset)
+            t_idx.append(np.flatnonzero(keep))
+            offset += len(labels)
+        t_gid, t_idx = np.concatenate(t_gid), np.concatenate(t_idx)
+        n_trades = np.bincount(t_gid, minlength=n_groups)
+        wins = np.bincount(t_gid, weights=t_returns[t_idx] > 0, minlength=n_groups)
+        pnl = np.bincount(t_gid, weights=t_pnls[t_idx], minlength=n_groups)
+        ret_sum = np.bincount(t_gid, weights=t_returns[t_idx], minlength=n_groups)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return_pct = np.expm1(total_log) * 100
+        exposure_pct = exposed / counts * 100
+        win_rate = np.where(n_trades > 0, wins / n_trades * 100, 0.0)
+        avg_trade = np.where(n_trades > 0, ret_sum / n_trades * 100, 0.0)
+
+    breakdown = {kind: [] for kind, _, _, _ in groups}
+    for g, (kind, label) in enumerate(meta):
+        if not counts[g]:
+            continue  # período sem barras (lacuna nos dados)
+        breakdown[kind].append({
+            "period": label,
+            "return_pct": round(float(return_pct[g]), 2),
+            "max_drawdown_pct": round(float(abs(max_dd[g])) * 100, 2),
+            "bars": int(counts[g]),
+            "exposure_pct": round(float(exposure_pct[g]), 2),
+            "n_trades": int(n_trades[g]),
+            "win_rate_pct": round(float(win_rate[g]), 2),
+            "pnl": round(float(pnl[g]), 2),
+            "avg_trade_return_pct": round(float(avg_trade[g]), 2),
+        })
+    for kind, _, _, info in groups:
+        if info:
+            breakdown[f"{kind}_info"] = info
+    return breakdown
@@ -0,0 +1,144 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from backend.backtest_service import load_market_data, load_strategy_class, get_strategy_warmup, _execute_backtest
+from backend.indicators import IndicatorCache
+from backend.shared_data import SharedDataPublisher, attach_shared_frame
+
+# Métricas escalares exibidas lado a lado na comparação
+COMPARISON_METRICS = [
+    "total_return_pct", "cagr_pct", "sharpe_ratio", "sortino_ratio", "calmar_ratio",
+    "max_drawdown_pct", "ulcer_index", "win_rate_pct", "profit_factor", "n_trades",
+    "exposure_time_pct", "mean_trade_duration", "final_balance",
+]
+
+# Estado de cada processo worker: dados anexados da memória compartilhada e cache de indicadores
+_WORKER = {}
+
+def _init_worker(handle, indicator_handle=None, indicator_keys=None):
+    _WORKER["data"] = attach_shared_frame(handle).frame
+    _WORKER["indicators"] = IndicatorCache(_WORKER["data"])
+    if indicator_handle is not None:
+        # Indicadores calculados uma vez no processo principal, lidos sem cópia
+        shared = attach_shared_frame(indicator_handle).frame
+        _WORKER["indicators"].preload({key: shared[name] for name, key in indicator_keys.items()})
+
+def _publish_indicators(publisher, key, processed_data, strategies):
+    """
+    Calcula uma vez a união dos indicadores declarados pelas estratégias
+    (`required_indicators`) e publica em memória compartilhada.
+    Retorna (handle, coluna -> chave do cache), ou (None, None) se não houver nenhum.
+    """
+    keys = {}
+    for strategy in strategies:
+        for indicator in getattr(strategy, "required_indicators", None) or []:
+            keys.setdefault("|".join(map(str, indicator)), tuple(indicator))
+    if not keys:
+        return None, None
+    cache = IndicatorCache(processed_data)
+    frame = pd.DataFrame({name: cache.compute_key(k) for name, k in keys.items()}, index=processed_data.index)
+    return publisher.publish(key + ("indicators",), frame, columns=list(keys)), keys
+
+def _run_spec(strategy_name, params, interval, symbol, initial_balance, fee_pct, start_date):
+    """Executa uma estratégia no worker sobre os dados compartilhados."""
+    return _execute_backtest(
+        _WORKER["data"], load_strategy_class(strategy_name), interval, symbol,
+        initial_balance, params, fee_pct, _WORKER["indicators"], start_date
+    )
+
+def _spec_label(strategy_name, params):
+    if not params:
+        return strategy_name
+    args = ", ".join(f"{k}={v}" for k, v in params.items())
+    return f"{strategy_name}({args})"
+
+def compare_strategies(
+    specs,
+    interval,
+    symbol="BTCUSDT",
+    start_date="1 Jan 2020",
+    initial_balance=10000,
+    fee_pct=0.001,
+    max_workers=None,
+    end_date=None
+):
+    """
+    Compara várias estratégias sobre o mesmo símbolo/intervalo.
+
+    Os dados são carregados e pré-processados uma única vez e publicados em memória
+    compartilhada, junto com a união dos indicadores declarados pelas estratégias
+    (`required_indicators`, calculados uma vez); as execuções rodam em paralelo em
+    processos, que anexam dados e indicadores sem copiá-los.
+
+    Args:
+        specs (list[tuple]): Lista de (nome_da_estrategia, params). params pode ser None.
+        interval (str): Intervalo dos dados.
+        max_workers (int): Número de processos (padrão: um por estratégia, até 8).
+    Returns:
+        dict: {
+            "metrics": DataFrame (uma linha por estratégia, métricas lado a lado),
+            "equity_curves": DataFrame com as curvas alinhadas pelas datas,
+            "results": dict label -> resultado completo do backtest
+        }
+    """
+    jobs = []
+    order = []
+    results = {}
+    for strategy_name, params in specs:
+        label = _spec_label(strategy_name, params)
+        base_label, n = label, 2
+        while label in order:
+            label = f"{base_label} #{n}"
+            n += 1
+        order.append(label)
+        StrategyClass = load_strategy_class(strategy_name)
+        if StrategyClass is None:
+            results[label] = {"error": f"Estratégia '{strategy_name}' não encontrada."}
+            continue
+        jobs.append((label, strategy_name, StrategyClass, params))
+
+    # Aquecimento suficiente para a estratégia mais exigente (None = histórico completo)
+    warmups = [get_strategy_warmup(cls, params) for _, _, cls, params in jobs]
+    warmup = None if any(w is None for w in warmups) else max(warmups, default=0)
+    processed_data = load_market_data(symbol, interval, start_date, end_date, warmup_bars=warmup)
+    if processed_data is None or processed_data.empty:
+        return {"error": "Dados insuficientes para backtest."}
+
+    curves = {}
+    workers = max_workers or min(8, max(1, len(jobs)))
+    with SharedDataPublisher() as publisher:
+        indicator_handle, indicator_keys = _publish_indicators(
+            publisher, (symbol, interval), processed_data, [cls(**(params or {})) for _, _, cls, params in jobs]
+        )
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(publisher.publish((symbol, interval), processed_data), indicator_handle, indicator_keys)
+        ) as executor:
+            futures = {
+                label: executor.submit(
+                    _run_spec, strategy_name, params, interval, symbol, initial_balance, fee_pct, start_date
+                )
+                for label, strategy_name, _, params in jobs
+            }
+            for label, future in futures.items():
+                result, equity_index = future.result()
+                results[label] = result
+                if "error" not in result:
+                    curves[label] = pd.Series(result["equity_curve"], index=equity_index)
+
+    rows = {}
+    for label in order:
+        result = results[label]
+        rows[label] = {
+            m: (np.nan if "error" in result or result.get(m) == "N/D" else result.get(m))
+            for m in COMPARISON_METRICS
+        }
+    metrics = pd.DataFrame.from_dict(rows, orient="index", columns=COMPARISON_METRICS)
+    equity_curves = pd.DataFrame(curves).sort_index().ffill()
+
+    return {
+        "metrics": metrics,
+        "equity_curves": equity_curves,
+        "results": {label: results[label] for label in order},
+    }
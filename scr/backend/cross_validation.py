@@ -0,0 +1,251 @@
+import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from backend.backtest_service import (
+    load_market_data,
+    load_strategy_class,
+    get_strategy_warmup,
+    _execute_backtest,
+)
+from backend.indicators import IndicatorCache
+from backend.metrics import periods_per_year
+from backend.optimizer import sample_candidates
+from backend.shared_data import SharedDataPublisher, attach_shared_frame
+
+# Fração das barras usada como embargo/purga em volta de cada grupo de teste
+EMBARGO_PCT = 0.01
+CV_METRICS = ["sharpe_ratio", "total_return_pct"]
+
+# Estado de cada processo worker: dados e cache de indicadores, uma vez por processo
+_WORKER = {}
+
+
+def build_cpcv_folds(n_bars, n_groups=6, n_test_groups=2, embargo_bars=0):
+    """
+    Monta (uma única vez) os conjuntos de índices da validação cruzada combinatória purgada.
+
+    As barras são divididas em `n_groups` grupos contíguos; cada combinação de
+    `n_test_groups` grupos é um conjunto de teste e o resto é treino, sem as
+    `embargo_bars` barras antes (purga) e depois (embargo) de cada grupo de teste.
+
+    Returns:
+        dict com groups [(início, fim)], combinations [tupla de grupos de teste],
+        train_masks e test_masks (arrays bool n_combinações x n_bars).
+    """
+    if not 1 <= n_test_groups < n_groups:
+        raise ValueError("n_test_groups precisa estar entre 1 e n_groups - 1.")
+    edges = np.linspace(0, n_bars, n_groups + 1).astype(int)
+    groups = list(zip(edges[:-1], edges[1:]))
+    combinations = list(itertools.combinations(range(n_groups), n_test_groups))
+    test_masks = np.zeros((len(combinations), n_bars), dtype=bool)
+    train_masks = np.ones((len(combinations), n_bars), dtype=bool)
+    for c, combo in enumerate(combinations):
+        for g in combo:
+            start, stop = groups[g]
+            test_masks[c, start:stop] = True
+            train_masks[c, max(0, start - embargo_bars):min(n_bars, stop + embargo_bars)] = False
+    return {
+        "groups": groups,
+        "combinations": combinations,
+        "train_masks": train_masks,
+        "test_masks": test_masks,
+    }
+
+
+def _init_worker(handle, strategy_name):
+    data = attach_shared_frame(handle).frame
+    _WORKER["data"] = data
+    _WORKER["strategy"] = load_strategy_class(strategy_name)
+    _WORKER["indicators"] = IndicatorCache(data)
+
+
+def _candidate_returns(params, interval, symbol, initial_balance, fee_pct, start_date):
+    """
+    Backtest completo de um candidato (no worker) -> retornos por barra da curva de capital.
+    Sinais e indicadores são calculados uma vez; os folds só recortam esses retornos.
+    """
+    result, equity_index = _execute_backtest(
+        _WORKER["data"], _WORKER["strategy"], interval, symbol, initial_balance, params, fee_pct,
+        _WORKER["indicators"], start_date
+    )
+    if "error" in result:
+        return None
+    equity = np.asarray(result["equity_curve"], dtype=float)
+    returns = equity[1:] / equity[:-1] - 1
+    return equity_index[1:].values.astype("datetime64[ns]").view(np.int64), returns
+
+
+def _fold_metrics(returns, masks, ppy):
+    """
+    Métricas de cada candidato em cada conjunto de barras, vetorizado:
+    returns (n_candidatos x n_bars) contra masks (n_conjuntos x n_bars).
+    """
+    weights = masks.astype(float).T
+    counts = masks.sum(axis=1)
+    mean = returns @ weights / counts
+    var = (returns ** 2) @ weights / counts - mean ** 2
+    std = np.sqrt(np.clip(var * counts / np.maximum(counts - 1, 1), 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(ppy), np.nan)
+    total_return = (np.exp(np.log1p(returns) @ weights) - 1) * 100
+    return {"sharpe_ratio": sharpe, "total_return_pct": total_return}
+
+
+def _path_assignments(combinations, n_groups):
+    """
+    Caminhos do CPCV: cada grupo aparece em teste C(N-1, k-1) vezes; o caminho j usa,
+    para cada grupo, a j-ésima combinação que o testou.
+    """
+    by_group = [[c for c, combo in enumerate(combinations) if g in combo] for g in range(n_groups)]
+    n_paths = len(by_group[0])
+    return [[by_group[g][p] for g in range(n_groups)] for p in range(n_paths)]
+
+
+def run_cpcv(
+    strategy_name,
+    interval,
+    param_space,
+    symbol="BTCUSDT",
+    start_date="1 Jan 2020",
+    end_date=None,
+    initial_balance=10000,
+    fee_pct=0.001,
+    n_groups=6,
+    n_test_groups=2,
+    embargo_pct=EMBARGO_PCT,
+    metric="sharpe_ratio",
+    n_candidates=50,
+    constraint=None,
+    workers=None,
+    seed=0
+):
+    """
+    Validação cruzada combinatória purgada (CPCV) dos parâmetros de uma estratégia.
+
+    Cada candidato é testado uma única vez sobre o período completo (em paralelo, com
+    os dados na memória compartilhada e indicadores em cache por worker); as métricas de
+    treino/teste de todas as combinações de folds saem dos retornos por barra dessas
+    execuções. Para cada combinação, o melhor candidato no treino é avaliado no teste,
+    o que dá a distribuição fora da amostra, os caminhos do CPCV e a probabilidade de
+    overfitting do backtest (PBO: fração das combinações em que o escolhido no treino
+    fica abaixo da mediana no teste).
+
+    Args:
+        param_space (dict): {param: [valores]} ou {param: (min, max)} (ver optimizer.sample_candidates).
+        n_groups (int): Número de grupos (folds) contíguos.
+        n_test_groups (int): Grupos de teste por combinação.
+        embargo_pct (float): Fração das barras removida do treino em volta de cada grupo de teste.
+        metric (str): 'sharpe_ratio' ou 'total_return_pct'.
+    Returns:
+        dict com combinations (DataFrame por combinação), oos_distribution, paths,
+        pbo, candidates (DataFrame por candidato) e a configuração usada.
+    """
+    if metric not in CV_METRICS:
+        return {"error": f"Métrica '{metric}' não suportada (use {CV_METRICS})."}
+    StrategyClass = load_strategy_class(strategy_name)
+    if StrategyClass is None:
+        return {"error": f"Estratégia '{strategy_name}' não encontrada."}
+    candidates = sample_candidates(param_space, n_candidates, constraint, seed)
+    if len(candidates) < 2:
+        return {"error": "São necessários pelo menos 2 candidatos válidos."}
+
+    warmups = [get_strategy_warmup(StrategyClass, c) for c in candidates]
+    warmup = None if any(w is None for w in warmups) else max(warmups)
+    data = load_market_data(symbol, interval, start_date, end_date, warmup_bars=warmup)
+    if data is None or data.empty:
+        return {"error": "Dados insuficientes para backtest."}
+
+    with SharedDataPublisher() as publisher, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(publisher.publish((symbol, interval), data), strategy_name)
+    ) as executor:
+        futures = [
+            executor.submit(_candidate_returns, params, interval, symbol, initial_balance, fee_pct, start_date)
+            for params in candidates
+        ]
+        outputs = [f.result() for f in futures]
+
+    valid = [(params, out) for params, out in zip(candidates, outputs) if out is not None]
+    if len(valid) < 2:
+        return {"error": "Menos de 2 candidatos com backtest válido."}
+    candidates = [params for params, _ in valid]
+    # Alinha os retornos de todos os candidatos nas mesmas barras (barra sem retorno = 0)
+    bar_index = np.unique(np.concatenate([out[0] for _, out in valid]))
+    returns = np.zeros((len(valid), len(bar_index)))
+    for i, (_, (index, rets)) in enumerate(valid):
+        returns[i, np.searchsorted(bar_index, index)] = rets
+
+    n_bars = len(bar_index)
+    embargo_bars = int(math.ceil(n_bars * embargo_pct))
+    folds = build_cpcv_folds(n_bars, n_groups, n_test_groups, embargo_bars)
+    ppy = periods_per_year(interval)
+    train = _fold_metrics(returns, folds["train_masks"], ppy)[metric]
+    test = _fold_metrics(returns, folds["test_masks"], ppy)[metric]
+
+    n_cand = len(candidates)
+    rows = []
+    chosen = []
+    for c, combo in enumerate(folds["combinations"]):
+        is_scores = np.where(np.isnan(train[:, c]), -np.inf, train[:, c])
+        best = int(np.argmax(is_scores))
+        oos_scores = np.where(np.isnan(test[:, c]), -np.inf, test[:, c])
+        # Posição relativa (0..1) do escolhido no teste; logit <= 0 => abaixo da mediana
+        rank = (pd.Series(oos_scores).rank(method="average").iloc[best]) / (n_cand + 1)
+        chosen.append(best)
+        rows.append({
+            "combination": c,
+            "test_groups": combo,
+            "best_params": candidates[best],
+            f"is_{metric}": train[best, c],
+            f"oos_{metric}": test[best, c],
+            "oos_rank": rank,
+            "logit": math.log(rank / (1 - rank)),
+        })
+    combos = pd.DataFrame(rows)
+    oos = combos[f"oos_{metric}"].astype(float)
+
+    # Caminhos: concatena os retornos fora da amostra do candidato escolhido em cada grupo
+    path_rows = []
+    for p, assignment in enumerate(_path_assignments(folds["combinations"], n_groups)):
+        path_returns = np.concatenate([
+            returns[chosen[c], start:stop] for (start, stop), c in zip(folds["groups"], assignment)
+        ])
+        path_metrics = _fold_metrics(path_returns[None, :], np.ones((1, len(path_returns)), dtype=bool), ppy)
+        path_rows.append({
+            "path": p,
+            "sharpe_ratio": float(path_metrics["sharpe_ratio"][0, 0]),
+            "total_return_pct": float(path_metrics["total_return_pct"][0, 0]),
+        })
+
+    candidate_table = pd.DataFrame([{
+        **params,
+        f"is_mean_{metric}": np.nanmean(train[i]),
+        f"oos_mean_{metric}": np.nanmean(test[i]),
+        "times_chosen": chosen.count(i),
+    } for i, params in enumerate(candidates)]).sort_values(f"oos_mean_{metric}", ascending=False)
+
+    return {
+        "metric": metric,
+        "n_candidates": n_cand,
+        "n_groups": n_groups,
+        "n_test_groups": n_test_groups,
+        "n_combinations": len(folds["combinations"]),
+        "embargo_bars": embargo_bars,
+        "pbo": float((combos["logit"] <= 0).mean()),
+        "oos_distribution": {
+            "mean": float(oos.mean()),
+            "std": float(oos.std()),
+            "min": float(oos.min()),
+            "p25": float(oos.quantile(0.25)),
+            "median": float(oos.median()),
+            "p75": float(oos.quantile(0.75)),
+            "max": float(oos.max()),
+            "pct_positive": float((oos > 0).mean() * 100),
+        },
+        "combinations": combos,
+        "paths": pd.DataFrame(path_rows),
+        "candidates": candidate_table.reset_index(drop=True),
+    }
@@ -1,9 +1,165 @@
 # /src/backend/data_handlers/binance_data.py
 from binance.client import Client
+import numpy as np
 import pandas as pd
+import io
+import json
 import os
+import shutil
 import time
 from datetime import datetime
+from backend.data_handlers.catalog import load_catalog, update_catalog_entry
+from backend.data_handlers.file_store import atomic_write, dataset_lock, file_version, replace_file
+from backend.timeframes import interval_to_timedelta
+
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+    'taker_buy_quote', 'ignore'
+]
+KLINE_FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'volume',
+                       'quote_volume', 'trades', 'taker_buy_base', 'taker_buy_quote']
+# Máximo de klines por requisição do endpoint /api/v3/klines
+KLINE_PAGE_LIMIT = 1000
+
+def _line_timestamp(line):
+    """Extrai o timestamp (primeira coluna) de uma linha do CSV."""
+    return pd.Timestamp(line.split(b',', 1)[0].strip().decode())
+
+def _next_line_start(f, pos, data_start):
+    """Posição do início da primeira linha que começa depois do byte `pos`."""
+    if pos < data_start:
+        return data_start
+    f.seek(pos)
+    f.readline()
+    return f.tell()
+
+def _find_row_offset(f, data_start, size, target, strict=False):
+    """
+    Busca binária nos offsets do arquivo: retorna o início da primeira linha cujo
+    timestamp é >= target (ou > target se strict=True). Retorna `size` se não houver.
+    """
+    lo, hi = data_start - 1, size
+    while lo < hi:
+        mid = (lo + hi) // 2
+        pos = _next_line_start(f, mid, data_start)
+        f.seek(pos)
+        line = f.readline()
+        if not line.strip():
+            hi = mid
+            continue
+        ts = _line_timestamp(line)
+        if (ts > target) if strict else (ts >= target):
+            hi = mid
+        else:
+            lo = mid + 1
+    return _next_line_start(f, lo, data_start)
+
+def _rewind_lines(f, pos, n_lines, data_start, block_size=64 * 1024):
+    """Retorna o início da linha que está `n_lines` linhas antes de `pos`."""
+    newlines = 0
+    cur = pos
+    while cur > data_start:
+        read_from = max(data_start, cur - block_size)
+        f.seek(read_from)
+        block = f.read(cur - read_from)
+        # O '\n' imediatamente antes de `pos` fecha a linha anterior; por isso n_lines + 1
+        i = block.rfind(b'\n')
+        while i >= 0:
+            newlines += 1
+            if newlines == n_lines + 1:
+                return read_from + i + 1
+            i = block.rfind(b'\n', 0, i)
+        cur = read_from
+    return data_start
+
+def _page_to_frame(page):
+    """Converte uma página de klines da API (lista de listas) direto em colunas tipadas."""
+    columns = list(zip(*page))
+    data = {'timestamp': pd.to_datetime(np.asarray(columns[0], dtype=np.int64), unit='ms')}
+    for i, col in enumerate(KLINE_COLUMNS[1:], start=1):
+        if col in KLINE_FLOAT_COLUMNS:
+            data[col] = np.asarray(columns[i], dtype=float)
+        elif col == 'close_time':
+            data[col] = np.asarray(columns[i], dtype=np.int64)
+        else:
+            data[col] = columns[i]
+    return pd.DataFrame(data)
+
+def _repair_tail(filepath):
+    """
+    Prepara um CSV para receber mais linhas: descarta uma última linha incompleta
+    (download interrompido no meio da escrita) e retorna (último timestamp, se o
+    arquivo grava só a data). Retorna (None, None) se não houver linhas de dados.
+    """
+    if not os.path.exists(filepath):
+        return None, None
+    with open(filepath, 'rb+') as f:
+        size = os.fstat(f.fileno()).st_size
+        f.seek(max(0, size - 64 * 1024))
+        tail = f.read()
+        if tail and not tail.endswith(b'\n'):
+            cut = tail.rfind(b'\n') + 1
+            f.truncate(size - len(tail) + cut)
+            tail = tail[:cut]
+    lines = tail.splitlines()
+    if len(lines) < 1 or lines[-1].startswith(b'timestamp'):
+        return None, None
+    raw = lines[-1].split(b',', 1)[0].strip()
+    return pd.Timestamp(raw.decode()), len(raw) == 10
+
+# Máximo de casas decimais procuradas ao converter uma coluna para float32
+MAX_DECIMALS = 8
+
+def _float32_decimals(values):
+    """
+    Casas decimais d com que a coluna pode ir para float32 sem perda: os valores têm
+    no máximo d casas e round(float64(float32(v)), d) devolve exatamente o float64
+    original (ver as_float64). None se não houver (ex: volumes grandes com 8 casas).
+    """
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return 0
+    as32 = values.astype(np.float32)
+    if not np.isfinite(as32).all():
+        return None
+    for decimals in range(MAX_DECIMALS + 1):
+        if np.array_equal(np.round(values, decimals), values):
+            break
+    else:
+        return None
+    return decimals if np.array_equal(np.round(as32.astype(np.float64), decimals), values) else None
+
+def as_float64(df, column):
+    """
+    Coluna como float64 com os valores originais do CSV: colunas convertidas para
+    float32 por load_from_csv(downcast=True) são arredondadas de volta às casas decimais
+    registradas em df.attrs['float32_decimals']. O float32 é só armazenamento; as contas
+    do backtest devem usar isto.
+    """
+    values = df[column].to_numpy(dtype=float)
+    decimals = df.attrs.get('float32_decimals', {}).get(column)
+    if decimals is None or df[column].dtype != np.float32:
+        return values
+    return np.round(values, decimals)
+
+def memory_report(df):
+    """
+    Memória ocupada por um dataset carregado: bytes por coluna (com dtype),
+    do índice e total. Útil para estimar quantos símbolos cabem por worker.
+    """
+    if df is None:
+        return None
+    columns = {col: {"dtype": str(df[col].dtype), "bytes": int(df[col].memory_usage(index=False, deep=True))}
+               for col in df.columns}
+    index_bytes = int(df.index.memory_usage(deep=True))
+    return {
+        "rows": len(df),
+        "columns": columns,
+        "index_bytes": index_bytes,
+        "total_bytes": index_bytes + sum(c["bytes"] for c in columns.values()),
+    }
+
 
 class BinanceDataHandler:
     def __init__(self):
@@ -47,37 +203,220 @@ class BinanceDataHandler:
             return None
 
     def save_to_csv(self, df, symbol, interval):
-        """Salva os dados em CSV"""
+        """Salva os dados em CSV (escrita atômica, com lock do dataset) e atualiza o catálogo"""
         if df is not None and not df.empty:
             filename = f"{symbol}_{interval}.csv".replace("/", "-")
             filepath = os.path.join(self.DATA_DIR, filename)
-            df.to_csv(filepath, index=False)
+            with dataset_lock(filepath):
+                with atomic_write(filepath, newline='') as f:
+                    df.to_csv(f, index=False)
+                update_catalog_entry(filepath, self.DATA_DIR)
             print(f"Dados salvos em: {filepath}")
             return filepath
         return None
 
-    def load_from_csv(self, symbol, interval):
-        """Carrega dados salvos de um CSV"""
+    def download_klines_streaming(self, symbol, interval, start_date="1 Jan 2017", end_date=None,
+                                  page_limit=KLINE_PAGE_LIMIT, pause=0.2):
+        """
+        Baixa klines página por página (client.get_klines) gravando cada página em
+        disco assim que chega, sem acumular o histórico inteiro em memória.
+
+        As páginas vão para uma cópia de trabalho ({arquivo}.download), publicada no
+        CSV com um rename atômico ao final: leitores nunca veem o download pela metade
+        e downloads simultâneos do mesmo dataset são serializados pelo lock. Se o
+        download for interrompido, a cópia de trabalho e o {arquivo}.progress.json
+        ficam em disco e chamar de novo retoma da última barra gravada (se o CSV não
+        tiver sido reescrito nesse meio tempo). Só barras já fechadas são gravadas.
+        Num CSV existente, o download sempre continua da barra seguinte à última gravada
+        (`start_date` só vale para um arquivo novo), para não deixar buracos no arquivo.
+        Ao publicar, a entrada do dataset no catálogo (catalog.json) é atualizada.
+
+        Returns:
+            int: número de barras novas publicadas, incluindo as de um download
+            interrompido que foi retomado (None se houve erro).
+        """
         filename = f"{symbol}_{interval}.csv".replace("/", "-")
         filepath = os.path.join(self.DATA_DIR, filename)
-        if os.path.exists(filepath):
-            df = pd.read_csv(filepath)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            return df
-        return None
+        work_path = f"{filepath}.download"
+        progress_path = f"{filepath}.progress.json"
+
+        with dataset_lock(filepath):
+            base_version = None
+            pending = 0  # barras de um download interrompido ainda não publicadas
+            if os.path.exists(filepath):
+                with open(filepath, 'rb') as f:
+                    base_version = list(file_version(f))
+            if os.path.exists(work_path):
+                progress = {}
+                if os.path.exists(progress_path):
+                    with open(progress_path, encoding='utf-8') as p:
+                        progress = json.load(p)
+                if progress.get("base_version") != base_version:
+                    # O CSV mudou desde o download interrompido: a cópia de trabalho está velha
+                    os.remove(work_path)
+                else:
+                    pending = int(progress.get("rows_written", 0))
+            if not os.path.exists(work_path) and base_version is not None:
+                shutil.copyfile(filepath, work_path)
+
+            next_ms = int(pd.Timestamp(start_date).value // 10**6)
+            end_ms = int(pd.Timestamp(end_date).value // 10**6) if end_date is not None else None
+            last_ts, date_only = _repair_tail(work_path)
+            expected_ts = None
+            if last_ts is not None:
+                next_ms = int(last_ts.value // 10**6) + 1
+                expected_ts = last_ts + interval_to_timedelta(interval)
+            write_header = last_ts is None
+            rows = 0
+            print(f"Baixando {symbol} {interval} a partir de {pd.Timestamp(next_ms, unit='ms')} (streaming)...")
+            try:
+                with open(work_path, 'w' if write_header else 'a', newline='') as f:
+                    if write_header:
+                        f.write(','.join(KLINE_COLUMNS) + '\n')
+                    while end_ms is None or next_ms <= end_ms:
+                        page = self.client.get_klines(
+                            symbol=symbol, interval=interval, startTime=next_ms, endTime=end_ms, limit=page_limit
+                        )
+                        if not page:
+                            break
+                        df = _page_to_frame(page)
+                        # Barra ainda em formação (close_time no futuro) não é gravada
+                        now_ms = int(time.time() * 1000)
+                        closed = df['close_time'].to_numpy() < now_ms
+                        if not closed.all():
+                            df = df[closed]
+                        if df.empty:
+                            break
+                        if expected_ts is not None:
+                            # A primeira barra anexada tem de ser a seguinte à última gravada
+                            first_ts = df['timestamp'].iloc[0]
+                            if first_ts < expected_ts:
+                                raise ValueError(f"barra {first_ts} fora da grade após {last_ts} (esperado {expected_ts})")
+                            if first_ts > expected_ts:
+                                print(f"Aviso: a Binance não tem barras de {symbol} {interval} entre {last_ts} e {first_ts}.")
+                            expected_ts = None
+                        if date_only is None:
+                            # Mesmo formato do save_to_csv: só a data quando todas as barras são à meia-noite
+                            date_only = bool((df['timestamp'] == df['timestamp'].dt.normalize()).all())
+                        df.to_csv(f, header=False, index=False, date_format='%Y-%m-%d' if date_only else None)
+                        f.flush()
+                        os.fsync(f.fileno())
+                        rows += len(df)
+                        next_ms = int(page[-1][0]) + 1
+                        with atomic_write(progress_path, encoding='utf-8') as p:
+                            json.dump({"symbol": symbol, "interval": interval, "next_ms": next_ms,
+                                       "end_ms": end_ms, "rows_written": pending + rows,
+                                       "base_version": base_version}, p)
+                        if len(page) < page_limit or len(df) < len(page):
+                            break
+                        time.sleep(pause)  # Evitar rate limit
+            except Exception as e:
+                print(f"Download de {symbol} {interval} interrompido após {rows} barras: {str(e)} "
+                      "(chame novamente para retomar)")
+                return None
+            # Publica se esta chamada ou uma anterior (interrompida) gravou barras novas; a
+            # cópia de trabalho só é descartada se for igual ao CSV publicado (sem barras novas)
+            rows += pending
+            if base_version is None:
+                changed = rows > 0 or last_ts is not None
+            else:
+                changed = rows > 0 or os.path.getsize(work_path) != base_version[1]
+            if changed:
+                replace_file(work_path, filepath)
+                update_catalog_entry(filepath, self.DATA_DIR)
+            else:
+                os.remove(work_path)
+            if os.path.exists(progress_path):
+                os.remove(progress_path)
+        print(f"{rows} barras novas gravadas em: {filepath}")
+        return rows
+
+    def get_catalog(self, refresh=True):
+        """Catálogo dos dados locais (ver data_handlers.catalog.load_catalog)."""
+        return load_catalog(self.DATA_DIR, refresh)
+
+    def load_from_csv(self, symbol, interval, start=None, end=None, warmup_bars=0, columns=None, downcast=False):
+        """
+        Carrega dados salvos de um CSV.
+
+        Se `start`/`end` forem informados, localiza o intervalo por busca binária
+        nos offsets do arquivo (o CSV é ordenado por timestamp) e lê apenas essas
+        linhas, mais `warmup_bars` linhas anteriores a `start` para aquecer os
+        indicadores. `warmup_bars=None` mantém todo o histórico anterior a `start`.
+
+        `columns` limita as colunas lidas (além de 'timestamp'); com `downcast=True`,
+        colunas numéricas que cabem em float32 sem perda (ver _float32_decimals) são
+        convertidas, reduzindo a memória à metade; as_float64 recupera os valores originais.
+
+        A leitura não usa lock: tudo é lido pelo mesmo descritor, ou seja, de uma
+        única versão do arquivo (as escritas publicam versões novas por rename
+        atômico). A versão lida fica em df.attrs['version'].
+        """
+        filename = f"{symbol}_{interval}.csv".replace("/", "-")
+        filepath = os.path.join(self.DATA_DIR, filename)
+        usecols = None if columns is None else ['timestamp'] + [c for c in columns if c != 'timestamp']
+        try:
+            f = open(filepath, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            version = file_version(f)
+            if start is None and end is None:
+                df = pd.read_csv(f, usecols=usecols)
+            else:
+                df = self._read_csv_range(f, start, end, warmup_bars, usecols)
+        df.attrs['version'] = version
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        if downcast:
+            converted = {}
+            for col in df.columns:
+                if df[col].dtype == np.float64:
+                    decimals = _float32_decimals(df[col].to_numpy())
+                    if decimals is not None:
+                        df[col] = df[col].astype(np.float32)
+                        converted[col] = decimals
+            df.attrs['float32_decimals'] = converted
+        return df
+
+    def _read_csv_range(self, f, start, end, warmup_bars, usecols=None):
+        """Lê (do arquivo aberto `f`) só as linhas entre start e end (inclusive) + barras de aquecimento."""
+        header = f.readline()
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        stop = size if end is None else _find_row_offset(f, data_start, size, pd.Timestamp(end), strict=True)
+        begin = data_start
+        if start is not None:
+            first = _find_row_offset(f, data_start, size, pd.Timestamp(start), strict=False)
+            if first >= stop:
+                begin = stop  # nenhuma linha dentro do intervalo
+            elif warmup_bars is not None:
+                begin = _rewind_lines(f, first, warmup_bars, data_start) if warmup_bars > 0 else first
+        f.seek(begin)
+        chunk = f.read(max(0, stop - begin))
+        return pd.read_csv(io.BytesIO(header + chunk), usecols=usecols)
 
     def preprocess_data(self, df):
-        """Pré-processamento dos dados"""
+        """
+        Pré-processamento dos dados.
+        Mantém só as colunas OHLCV presentes (load_from_csv pode ter lido menos) e
+        descarta a primeira barra (retorno NaN) por fatiamento, sem cópias intermediárias.
+        """
         if df is None or df.empty:
             return None
-            
-        cols_to_keep = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
-        df = df[cols_to_keep].copy()
-        df.set_index('timestamp', inplace=True)
-        df['returns'] = df['close'].pct_change()
-        df.dropna(inplace=True)
+
+        cols_to_keep = [c for c in ['open', 'high', 'low', 'close', 'volume'] if c in df.columns]
+        df = df.set_index('timestamp')[cols_to_keep]
+        if 'close' in df.columns:
+            df['returns'] = df['close'].pct_change()
+        df = df.iloc[1:]
+        if df.isna().any(axis=None):
+            df = df.dropna()
         return df
 
+    def memory_report(self, df):
+        """Memória ocupada por um dataset carregado (ver memory_report)."""
+        return memory_report(df)
+
     def download_all_intervals(self, symbol='BTCUSDT', intervals=None, start_date="1 Jan 2017"):
         """Baixa múltiplos intervalos de tempo"""
         if intervals is None:
@@ -92,8 +431,7 @@ class BinanceDataHandler:
         
         print(f"Iniciando download de dados para {symbol}...")
         for interval in intervals:
-            df = self.fetch_klines(symbol, interval, start_date)
-            self.save_to_csv(df, symbol, interval)
+            self.download_klines_streaming(symbol, interval, start_date)
             time.sleep(1)  # Evitar rate limit
 
 # Exemplo de uso integrado com backtesting
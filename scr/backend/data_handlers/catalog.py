@@ -0,0 +1,197 @@
+import contextlib
+import hashlib
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from backend.data_handlers.file_store import atomic_write, dataset_lock
+from backend.timeframes import interval_to_timedelta
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "binance"
+)
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+# Lacunas listadas por dataset (as maiores); o total fica sempre em n_gaps/missing_bars
+MAX_LISTED_GAPS = 50
+
+
+def _dataset_key(filename):
+    """'BTCUSDT_4h.csv' -> ('BTCUSDT', '4h')."""
+    symbol, interval = filename[:-len(".csv")].rsplit("_", 1)
+    return symbol, interval
+
+
+def _read_catalog(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if catalog.get("version") != CATALOG_VERSION:
+        return {}
+    return catalog.get("datasets", {})
+
+
+def _write_catalog(path, datasets):
+    with atomic_write(path, encoding="utf-8") as f:
+        json.dump({"version": CATALOG_VERSION, "datasets": datasets}, f, indent=1, sort_keys=True)
+
+
+def _find_gaps(timestamps, interval):
+    """Lacunas entre barras consecutivas: [(última antes, primeira depois, barras faltando)]."""
+    try:
+        step = interval_to_timedelta(interval).value
+    except ValueError:
+        return []  # intervalos sem duração fixa (ex: '1M')
+    ts = timestamps.astype("datetime64[ns]").view(np.int64)
+    missing = np.diff(ts) // step - 1
+    at = np.flatnonzero(missing > 0)
+    return [(int(ts[i]), int(ts[i + 1]), int(missing[i])) for i in at]
+
+
+def scan_dataset(filepath):
+    """
+    Lê um CSV do armazenamento uma vez e gera a entrada do catálogo: linhas,
+    primeiro/último timestamp, lacunas, sha256 e (tamanho, mtime) do arquivo lido.
+    """
+    symbol, interval = _dataset_key(os.path.basename(filepath))
+    with open(filepath, "rb") as f:
+        st = os.fstat(f.fileno())
+        raw = f.read()
+    timestamps = pd.to_datetime(pd.read_csv(io.BytesIO(raw), usecols=["timestamp"])["timestamp"]).to_numpy()
+    gaps = _find_gaps(timestamps, interval)
+    largest = sorted(gaps, key=lambda g: g[2], reverse=True)[:MAX_LISTED_GAPS]
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "file": os.path.basename(filepath),
+        "rows": int(len(timestamps)),
+        "first": str(pd.Timestamp(timestamps[0])) if len(timestamps) else None,
+        "last": str(pd.Timestamp(timestamps[-1])) if len(timestamps) else None,
+        "n_gaps": len(gaps),
+        "missing_bars": int(sum(g[2] for g in gaps)),
+        "gaps": [[str(pd.Timestamp(a)), str(pd.Timestamp(b)), n] for a, b, n in sorted(largest)],
+        "sha256": hashlib.sha256(raw).hexdigest(),
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+
+
+def _invalid_entry(filepath, error):
+    """
+    Entrada de um CSV que não pôde ser lido (sem coluna timestamp, vazio, truncado):
+    fica no catálogo com `error` e sem barras, para não ser reescaneada até mudar.
+    """
+    symbol, interval = _dataset_key(os.path.basename(filepath))
+    st = os.stat(filepath)
+    return {
+        "symbol": symbol, "interval": interval, "file": os.path.basename(filepath), "rows": 0,
+        "first": None, "last": None, "n_gaps": 0, "missing_bars": 0, "gaps": [], "sha256": None,
+        "size": st.st_size, "mtime_ns": st.st_mtime_ns, "error": (str(error).splitlines() or [""])[0],
+    }
+
+
+def update_catalog_entry(filepath, data_dir=None):
+    """
+    Atualiza (ou remove, se o arquivo não existir mais) a entrada de um dataset no
+    catálogo. Chamado pelos escritores logo após publicar uma nova versão do CSV.
+    """
+    data_dir = data_dir or os.path.dirname(filepath)
+    path = os.path.join(data_dir, CATALOG_FILE)
+    key = os.path.basename(filepath)[:-len(".csv")]
+    entry = scan_dataset(filepath) if os.path.exists(filepath) else None
+    with dataset_lock(path):
+        datasets = _read_catalog(path)
+        if entry is None:
+            datasets.pop(key, None)
+        else:
+            datasets[key] = entry
+        _write_catalog(path, datasets)
+    return entry
+
+
+def load_catalog(data_dir=DATA_DIR, refresh=True):
+    """
+    Catálogo dos dados locais: {'{SÍMBOLO}_{intervalo}': entrada (ver scan_dataset)}.
+
+    A leitura é só do manifesto (catalog.json), sem abrir os CSVs. Com `refresh=True`,
+    compara tamanho/mtime de cada CSV (os.scandir, sem abrir) com o manifesto e só
+    reescaneia os arquivos novos ou alterados fora do BinanceDataHandler (ex: copiados
+    à mão); na primeira chamada isso constrói o catálogo inteiro. CSVs que não podem
+    ser lidos entram marcados com `error` (ver _invalid_entry), com um aviso.
+    """
+    path = os.path.join(data_dir, CATALOG_FILE)
+    datasets = _read_catalog(path)
+    if not refresh or not os.path.isdir(data_dir):
+        return datasets
+    files = {}
+    with os.scandir(data_dir) as entries:
+        for e in entries:
+            if e.name.endswith(".csv") and not e.name.startswith(".") and "_" in e.name:
+                st = e.stat()
+                files[e.name[:-len(".csv")]] = (e.path, st.st_size, st.st_mtime_ns)
+    stale = [key for key, (_, size, mtime) in files.items()
+             if key not in datasets or (datasets[key]["size"], datasets[key]["mtime_ns"]) != (size, mtime)]
+    removed = [key for key in datasets if key not in files]
+    if not stale and not removed:
+        return datasets
+    with dataset_lock(path):
+        datasets = _read_catalog(path)
+        for key in stale:
+            with contextlib.suppress(FileNotFoundError):
+                try:
+                    datasets[key] = scan_dataset(files[key][0])
+                except (ValueError, KeyError) as e:
+                    datasets[key] = _invalid_entry(files[key][0], e)
+                    print(f"Aviso: {datasets[key]['file']} ignorado no catálogo: {datasets[key]['error']}")
+        for key in removed:
+            datasets.pop(key, None)
+        _write_catalog(path, datasets)
+    return datasets
+
+
+def find_dataset(symbol, interval, data_dir=DATA_DIR, refresh=True):
+    """Entrada do catálogo de um símbolo/intervalo (None se não houver dados locais)."""
+    key = f"{symbol}_{interval}".replace("/", "-")
+    return load_catalog(data_dir, refresh).get(key)
+
+
+def available_symbols(data_dir=DATA_DIR, refresh=True):
+    """Símbolos com dados locais -> intervalos disponíveis de cada um."""
+    symbols = {}
+    for entry in load_catalog(data_dir, refresh).values():
+        if not entry["rows"]:
+            continue
+        symbols.setdefault(entry["symbol"], []).append(entry["interval"])
+    return {symbol: sorted(intervals, key=_interval_sort_key) for symbol, intervals in sorted(symbols.items())}
+
+
+def _interval_sort_key(interval):
+    try:
+        return interval_to_timedelta(interval).value
+    except ValueError:
+        return float("inf")
+
+
+def covers(entry, start_date=None, end_date=None):
+    """True se o dataset tem barras dentro de [start_date, end_date]."""
+    if entry is None or not entry["rows"]:
+        return False
+    if start_date is not None and pd.Timestamp(start_date) > pd.Timestamp(entry["last"]):
+        return False
+    if end_date is not None and pd.Timestamp(end_date) < pd.Timestamp(entry["first"]):
+        return False
+    return True
+
+
+def format_catalog(datasets):
+    """Tabela de texto do catálogo (para a CLI)."""
+    lines = [f"{'Símbolo':<12} {'Int.':<5} {'Barras':>8}  {'Início':<19}  {'Fim':<19}  {'Lacunas':>7}  sha256"]
+    for entry in sorted(datasets.values(), key=lambda e: (e["symbol"], _interval_sort_key(e["interval"]))):
+        lines.append(
+            f"{entry['symbol']:<12} {entry['interval']:<5} {entry['rows']:>8}  {str(entry['first']):<19}  "
+            f"{str(entry['last']):<19}  {entry['n_gaps']:>7}  {(entry['sha256'] or 'inválido')[:12]}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,135 @@
+import contextlib
+import os
+import shutil
+import stat
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Intervalo entre tentativas de obter o lock / substituir o arquivo (Windows)
+LOCK_POLL_S = 0.05
+REPLACE_RETRIES = 50
+
+
+@contextlib.contextmanager
+def dataset_lock(filepath, timeout=None):
+    """
+    Lock exclusivo entre processos de um dataset (arquivo `{filepath}.lock`).
+
+    Só escritores usam o lock; leitores nunca esperam (ver atomic_write).
+    `timeout=None` espera indefinidamente; caso contrário levanta TimeoutError.
+    """
+    lock_path = f"{filepath}.lock"
+    deadline = None if timeout is None else time.monotonic() + timeout
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Dataset em uso por outro processo: {filepath}")
+                time.sleep(LOCK_POLL_S)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def _fsync_dir(path):
+    """Garante que o rename foi persistido no diretório (no-op onde não é suportado)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def replace_file(src, dst):
+    """
+    os.replace atômico; no Windows, tenta de novo enquanto algum leitor estiver
+    com o arquivo antigo aberto.
+    """
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(src, dst)
+            break
+        except PermissionError:
+            if attempt == REPLACE_RETRIES - 1:
+                raise
+            time.sleep(LOCK_POLL_S)
+    _fsync_dir(os.path.dirname(os.path.abspath(dst)))
+
+
+def _publish_mode(filepath):
+    """
+    Permissões do arquivo publicado: as da versão atual, se existir; senão as de um
+    open() comum (0o666 menos a umask). O mkstemp cria o temporário com 0o600.
+    """
+    try:
+        return stat.S_IMODE(os.stat(filepath).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+@contextlib.contextmanager
+def atomic_write(filepath, mode="w", copy_existing=False, **open_kwargs):
+    """
+    Escreve uma nova versão de `filepath` num arquivo temporário no mesmo diretório
+    e a publica com um rename atômico ao final (com fsync). Leitores veem sempre a
+    versão anterior completa ou a nova completa, nunca um arquivo pela metade; quem
+    já abriu a versão anterior continua lendo-a até fechar. Se houver erro, o
+    temporário é descartado e o arquivo original fica intacto.
+
+    `copy_existing=True` começa o temporário como cópia da versão atual (para
+    acrescentar linhas com mode='a').
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(filepath)}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        if copy_existing and os.path.exists(filepath):
+            shutil.copyfile(filepath, tmp_path)
+        with open(tmp_path, mode, **open_kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _publish_mode(filepath))
+        replace_file(tmp_path, filepath)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def file_version(f):
+    """
+    Versão do arquivo aberto em `f`: (inode, tamanho, mtime_ns). Cada escrita
+    (rename atômico) gera uma versão nova; a versão lida por um leitor é a do
+    descritor que ele abriu, mesmo que o arquivo seja substituído durante a leitura.
+    """
+    st = os.fstat(f.fileno())
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
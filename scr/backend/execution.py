@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+from backend.data_handlers.binance_data import as_float64
+from backend.timeframes import interval_to_timedelta
+
+
+class VolumeSlippageModel:
+    """
+    Modelo de execução com slippage e limite de tamanho por barra baseados no volume.
+
+    Em cada barra, o preenchimento é limitado a `participation` x volume (em unidades
+    do ativo); o que sobra da ordem fica pendente para as barras seguintes enquanto o
+    sinal não mudar. O slippage de um preenchimento de `qty` unidades é
+
+        spread_bps / 2 / 10000 + impact * (high - low) / open * sqrt(qty / volume)
+
+    (meio spread + impacto "raiz quadrada" proporcional à amplitude da barra). Volume e
+    amplitude usados na barra t são os da barra t-1, já conhecidos no open de t.
+    """
+    required_columns = ["open", "high", "low", "volume"]
+
+    def __init__(self, participation=0.1, impact=1.0, spread_bps=1.0):
+        self.participation = participation
+        self.impact = impact
+        self.spread_bps = spread_bps
+
+    def prepare(self, data, index):
+        """
+        Arrays por barra (vetorizados) alinhados a `index`: capacidade de preenchimento
+        e coeficiente de impacto (slippage = half_spread + impact_coef * sqrt(qty)).
+        """
+        columns = {col: as_float64(data, col) for col in ("open", "high", "low", "volume")}
+        prev = pd.DataFrame(columns, index=data.index).shift(1).reindex(index)
+        volume = prev["volume"].to_numpy(dtype=float)
+        range_frac = ((prev["high"] - prev["low"]) / prev["open"]).to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            impact_coef = self.impact * range_frac / np.sqrt(volume)
+        valid = np.isfinite(impact_coef) & (volume > 0)
+        return {
+            "capacity": np.where(valid, self.participation * volume, 0.0),
+            "impact_coef": np.where(valid, impact_coef, 0.0),
+            "half_spread": self.spread_bps / 2 / 10000,
+        }
+
+
+# Modelos selecionáveis por nome (ex: em arquivos de jobs)
+EXECUTION_MODELS = {
+    "volume": VolumeSlippageModel,
+}
+
+
+def get_execution_model(spec):
+    """
+    Resolve o modelo de execução de um backtest.
+
+    Aceita None (execução padrão: tudo no open, só a taxa), uma instância de modelo,
+    o nome de um modelo ('volume') ou um dict {"model": "volume", **parâmetros}.
+    """
+    if spec is None or hasattr(spec, "prepare"):
+        return spec
+    if isinstance(spec, str):
+        spec = {"model": spec}
+    params = dict(spec)
+    name = params.pop("model", "volume")
+    if name not in EXECUTION_MODELS:
+        raise ValueError(f"Modelo de execução '{name}' não encontrado.")
+    return EXECUTION_MODELS[name](**params)
+
+
+class StopRules:
+    """
+    Saídas por stop de posições compradas: stop loss fixo (`stop_loss_pct` abaixo do
+    preço de entrada) e/ou trailing stop (`trailing_pct` abaixo da máxima desde a entrada).
+    Vale o mais alto dos dois; a saída é no nível do stop (ou no open, se abrir abaixo dele).
+    Depois de um stop, só há nova entrada quando o sinal deixar de ser 1 e voltar.
+
+    Com resolution='bar', dentro de cada barra o stop é testado contra o nível vigente
+    no open e o trailing só sobe com a máxima da barra ao final dela (a ordem entre
+    máxima e mínima é desconhecida). Com resolution='sub', as barras em que um stop
+    pode disparar são repassadas nas sub-barras de `sub_interval` (padrão '1m'), na
+    ordem em que aconteceram; as demais seguem só com a barra do próprio intervalo.
+    """
+    required_columns = ["open", "high", "low"]
+
+    def __init__(self, stop_loss_pct=None, trailing_pct=None, resolution="bar", sub_interval="1m"):
+        if not stop_loss_pct and not trailing_pct:
+            raise ValueError("Informe stop_loss_pct e/ou trailing_pct.")
+        if resolution not in ("bar", "sub"):
+            raise ValueError(f"Resolução '{resolution}' inválida (use 'bar' ou 'sub').")
+        self.stop_loss_pct = stop_loss_pct
+        self.trailing_pct = trailing_pct
+        self.resolution = resolution
+        self.sub_interval = sub_interval
+
+    def level(self, entry_price, peak):
+        """Nível do stop para o preço de entrada e a máxima desde a entrada."""
+        level = -np.inf
+        if self.stop_loss_pct:
+            level = entry_price * (1 - self.stop_loss_pct)
+        if self.trailing_pct:
+            level = max(level, peak * (1 - self.trailing_pct))
+        return level
+
+    def reason(self, entry_price, peak):
+        """Qual regra define o nível atual ('stop_loss' ou 'trailing')."""
+        if self.stop_loss_pct and (not self.trailing_pct
+                                   or entry_price * (1 - self.stop_loss_pct) >= peak * (1 - self.trailing_pct)):
+            return "stop_loss"
+        return "trailing"
+
+    def prepare(self, data, index, interval=None, sub_bars=None):
+        """
+        Arrays por barra alinhados a `index` (máximas/mínimas) e, com sub-barras, o
+        índice pré-calculado barra -> fatia das sub-barras [starts[i], ends[i]), via
+        searchsorted nos timestamps (as sub-barras de uma barra são as que abrem dentro dela).
+        """
+        bars = pd.DataFrame({col: as_float64(data, col) for col in ("high", "low")}, index=data.index).reindex(index)
+        prepared = {"high": bars["high"].to_numpy(dtype=float), "low": bars["low"].to_numpy(dtype=float)}
+        if sub_bars is not None:
+            parent = index.values.astype("datetime64[ns]").view(np.int64)
+            sub_ts = sub_bars.index.values.astype("datetime64[ns]").view(np.int64)
+            step = interval_to_timedelta(interval).value
+            prepared.update({
+                "starts": np.searchsorted(sub_ts, parent, side="left"),
+                "ends": np.searchsorted(sub_ts, parent + step, side="left"),
+                "sub_index": sub_bars.index,
+                "sub_open": as_float64(sub_bars, "open"),
+                "sub_high": as_float64(sub_bars, "high"),
+                "sub_low": as_float64(sub_bars, "low"),
+            })
+        return prepared
+
+
+def get_stop_rules(spec):
+    """
+    Resolve as regras de stop de um backtest: None (sem stops), uma instância de
+    StopRules ou um dict de parâmetros (ex: {"trailing_pct": 0.05, "resolution": "sub"}).
+    """
+    if spec is None or isinstance(spec, StopRules):
+        return spec
+    return StopRules(**spec)
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import pickle
+import pandas as pd
+from backend.backtest_service import (
+    load_market_data,
+    load_strategy_class,
+    get_strategy_warmup,
+    select_window,
+    _prepare_execution,
+    _new_engine_state,
+    _simulate_bars,
+    _build_result,
+)
+from backend.breakdown import compute_breakdown
+from backend.data_handlers.binance_data import memory_report
+from backend.data_handlers.file_store import atomic_write
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "checkpoints")
+CHECKPOINT_VERSION = 2
+
+
+def checkpoint_path_for(config):
+    """Caminho padrão do checkpoint para uma configuração de backtest."""
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    name = f"{config['symbol']}_{config['interval']}_{config['strategy']}_{digest}.pkl".replace("/", "-")
+    return os.path.join(CHECKPOINT_DIR, name)
+
+
+def load_checkpoint(path):
+    """Lê um checkpoint salvo. Retorna None se não existir ou estiver em formato antigo/corrompido."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            ckpt = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if ckpt.get("version") != CHECKPOINT_VERSION:
+        return None
+    return ckpt
+
+
+def save_checkpoint(path, config, state, equity_index):
+    """
+    Grava o checkpoint de forma atômica (temporário único + rename, ver atomic_write), com as datas
+    da curva de capital (usadas no breakdown por período).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write(path, "wb") as f:
+        pickle.dump({"version": CHECKPOINT_VERSION, "config": config, "state": state, "equity_index": equity_index},
+                    f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def run_backtest_incremental(
+    strategy_name,
+    interval,
+    symbol="BTCUSDT",
+    start_date="1 Jan 2020",
+    initial_balance=10000,
+    strategy_params=None,
+    fee_pct=0.001,
+    checkpoint_path=None
+):
+    """
+    Backtest retomável: salva o estado completo do motor (posição aberta, saldo,
+    curva de capital, ledger de trades) e, na próxima execução, processa só as
+    barras novas acrescentadas aos dados desde o checkpoint.
+
+    O resultado é idêntico ao de run_backtest sobre os dados completos (inclusive
+    breakdown e data_memory, que dependem do período inteiro). Se a configuração
+    mudou ou os dados já processados foram alterados, refaz do zero. O estado dos
+    indicadores é reconstruído a partir das últimas `warmup_bars` barras.
+    """
+    config = {
+        "strategy": strategy_name,
+        "interval": interval,
+        "symbol": symbol,
+        "start_date": start_date,
+        "initial_balance": initial_balance,
+        "strategy_params": strategy_params or {},
+        "fee_pct": fee_pct,
+    }
+    path = checkpoint_path or checkpoint_path_for(config)
+
+    StrategyClass = load_strategy_class(strategy_name)
+    if StrategyClass is None:
+        return {"error": f"Estratégia '{strategy_name}' não encontrada."}
+    warmup = get_strategy_warmup(StrategyClass, strategy_params)
+
+    state = None
+    n_new = 0
+    ckpt = load_checkpoint(path)
+    if ckpt is not None and ckpt["config"] == config:
+        state = ckpt["state"]
+        equity_index = ckpt["equity_index"]
+        last_ts = state["last_timestamp"]
+        # O período inteiro vai para o breakdown; os sinais só são gerados para as barras
+        # a partir da última processada (+ aquecimento dos indicadores)
+        full_data = load_market_data(symbol, interval, start_date, warmup_bars=warmup)
+        data = None if full_data is None else select_window(full_data, last_ts, warmup_bars=warmup)
+        if data is None or last_ts not in data.index or data.at[last_ts, "open"] != state["last_open"]:
+            state = None  # dados reescritos: checkpoint inválido
+        else:
+            prepared = _prepare_execution(data, StrategyClass, interval, symbol, strategy_params, None)
+            if "error" in prepared:
+                return prepared
+            joined = prepared["joined"]
+            new_bars = joined[joined.index > last_ts]
+            _simulate_bars(state, new_bars.index, new_bars["open"].to_numpy(dtype=float), new_bars["shifted_signal"].to_numpy(), fee_pct)
+            state["benchmark_opens"].extend(data.loc[data.index > last_ts, "open"].tolist())
+            equity_index = equity_index.append(new_bars.index)
+            n_new = len(new_bars)
+
+    resumed = state is not None
+    if not resumed:
+        full_data = data = load_market_data(symbol, interval, start_date, warmup_bars=warmup)
+        if data is None or data.empty:
+            return {"error": "Dados insuficientes para backtest."}
+        prepared = _prepare_execution(data, StrategyClass, interval, symbol, strategy_params, None, start_date)
+        if "error" in prepared:
+            return prepared
+        joined = prepared["joined"]
+        state = _new_engine_state(initial_balance, prepared["processed_data"])
+        _simulate_bars(state, joined.index[1:], joined["open"].to_numpy(dtype=float)[1:], joined["shifted_signal"].to_numpy()[1:], fee_pct)
+        equity_index = joined.index
+        n_new = len(joined) - 1
+
+    save_checkpoint(path, config, state, equity_index)
+    result = _build_result(state, strategy_name, interval, symbol, fee_pct, strategy_params=strategy_params)
+    # Mesmo formato do resultado de run_backtest
+    result["breakdown"] = compute_breakdown(
+        equity_index, result["equity_curve"], state["in_position"],
+        [d["exit"] for d in result["trade_dates"]], result["returns_per_trade"], result["trade_pnls"], full_data
+    )
+    result["data_memory"] = {"data": memory_report(full_data)}
+    result["incremental"] = {
+        "resumed": resumed,
+        "new_bars": n_new,
+        "last_timestamp": str(pd.Timestamp(state["last_timestamp"])) if state["last_timestamp"] is not None else None,
+        "checkpoint_path": path,
+    }
+    return result
@@ -0,0 +1,75 @@
+import threading
+import pandas as pd
+
+
+def rolling_mean(values, window):
+    """
+    Média móvel simples de um array NumPy (NaN nas primeiras window-1 barras).
+    Usa o mesmo kernel de IndicatorCache.sma (sem copiar o array), para que
+    estratégias com e sem cache produzam exatamente os mesmos valores.
+    """
+    return pd.Series(values, copy=False).rolling(window).mean().to_numpy()
+
+
+class IndicatorCache:
+    """
+    Cache thread-safe de indicadores calculados sobre um mesmo DataFrame.
+    Permite que várias estratégias (ou várias execuções da mesma estratégia)
+    compartilhem médias móveis e outras séries sem recalculá-las.
+
+    Caches de prefixos dos dados (ver `prefix`) só reaproveitam os valores calculados
+    sobre os dados completos para os indicadores embutidos, sabidamente causais (o
+    valor na barra t usa apenas barras <= t): sma e ema. Indicadores registrados pela
+    estratégia via `get` são recalculados sobre o prefixo, para que um lookahead dentro
+    deles apareça no detector de lookahead (que compara prefixos com os dados completos).
+    """
+    def __init__(self, data, parent=None):
+        self.data = data
+        self._parent = parent
+        self._cache = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute, causal=False):
+        """
+        Retorna o indicador `key`, calculando-o com `compute(data)` só na primeira vez.
+        `causal=True` (só para indicadores embutidos) deixa caches de prefixo
+        reaproveitarem o valor do cache pai.
+        """
+        if key in self._cache:
+            return self._cache[key]
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._cache:
+                if self._parent is not None and causal:
+                    # Indicador causal: o prefixo é exatamente o início da série completa
+                    self._cache[key] = self._parent.get(key, compute, causal=True).iloc[:len(self.data)]
+                else:
+                    self._cache[key] = compute(self.data)
+        return self._cache[key]
+
+    def prefix(self, n_rows):
+        """Cache sobre as primeiras `n_rows` barras, reaproveitando os indicadores causais deste cache."""
+        return IndicatorCache(self.data.iloc[:n_rows], parent=self)
+
+    def preload(self, values):
+        """Registra indicadores já calculados fora deste cache (chave -> Series alinhada aos dados)."""
+        with self._lock:
+            self._cache.update(values)
+
+    def compute_key(self, key):
+        """Indicador embutido pela chave do cache (ex: ("sma", "close", 20) -> self.sma("close", 20))."""
+        return getattr(self, key[0])(*key[1:])
+
+    def sma(self, column, window):
+        """Média móvel simples de `column`."""
+        return self.get(("sma", column, window), lambda data: data[column].rolling(window).mean(), causal=True)
+
+    def ema(self, column, span):
+        """Média móvel exponencial de `column`."""
+        return self.get(("ema", column, span), lambda data: data[column].ewm(span=span, adjust=False).mean(),
+                        causal=True)
+
+    def __len__(self):
+        return len(self._cache)
@@ -0,0 +1,155 @@
+import re
+import numpy as np
+
+# Número de barras por ano para cada intervalo (cripto negocia 24/7, 365 dias)
+PERIODS_PER_YEAR = {
+    "1m": 365 * 24 * 60,
+    "5m": 365 * 24 * 12,
+    "15m": 365 * 24 * 4,
+    "1h": 365 * 24,
+    "4h": 365 * 6,
+    "1d": 365,
+}
+
+_INTERVAL_UNITS = {"m": 365 * 24 * 60, "h": 365 * 24, "d": 365, "w": 52, "M": 12}
+
+
+def periods_per_year(interval):
+    """Retorna quantas barras do intervalo (ex: '4h') existem em um ano."""
+    if interval in PERIODS_PER_YEAR:
+        return PERIODS_PER_YEAR[interval]
+    match = re.fullmatch(r"(\d+)([mhdwM])", str(interval))
+    if not match:
+        raise ValueError(f"Intervalo desconhecido: '{interval}'")
+    n, unit = int(match.group(1)), match.group(2)
+    return _INTERVAL_UNITS[unit] / n
+
+
+def compute_equity_metrics(equity, interval="1d", initial_balance=None, in_position=None,
+                           rolling_window=None, rf=0.0):
+    """
+    Calcula todas as métricas da curva de capital em poucas passagens vetorizadas.
+
+    Aceita uma curva (1-D) ou várias curvas empilhadas (2-D, uma por linha) para
+    sweeps de parâmetros. Para 2-D todas as métricas voltam como arrays (uma por curva).
+
+    Args:
+        equity (array-like): Curva(s) de capital, shape (n,) ou (n_curvas, n).
+        interval (str): Intervalo das barras, usado na anualização.
+        initial_balance (float|array): Saldo inicial (padrão: primeiro ponto da curva).
+        in_position (array-like): Máscara bool (mesmo shape das barras) indicando
+            se havia posição aberta em cada barra; usada para o tempo de exposição.
+        rolling_window (int): Janela do Sharpe móvel (padrão: ~1 mês de barras).
+        rf (float): Taxa livre de risco por período.
+    Returns:
+        dict: métricas (escalares para 1-D, arrays para 2-D) + curvas.
+    """
+    eq = np.asarray(equity, dtype=float)
+    single = eq.ndim == 1
+    eq = np.atleast_2d(eq)
+    n_curves, n_points = eq.shape
+    ann = periods_per_year(interval)
+    if initial_balance is None:
+        initial = eq[:, 0]
+    else:
+        initial = np.broadcast_to(np.asarray(initial_balance, dtype=float), (n_curves,))
+    final = eq[:, -1]
+
+    # Passagem 1: retornos por período e momentos
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(eq, axis=1) / eq[:, :-1]
+    n_ret = returns.shape[1]
+    if n_ret > 0:
+        excess = returns - rf
+        mean_ret = returns.mean(axis=1)
+        std_ret = returns.std(axis=1, ddof=1) if n_ret > 1 else np.full(n_curves, np.nan)
+        downside = np.sqrt(np.mean(np.minimum(excess, 0.0) ** 2, axis=1))
+        sharpe = excess.mean(axis=1) / (std_ret + 1e-9) * np.sqrt(ann)
+        sortino = np.where(downside > 0, excess.mean(axis=1) / (downside + 1e-12) * np.sqrt(ann), np.nan)
+        volatility = std_ret * np.sqrt(ann)
+    else:
+        mean_ret = np.zeros(n_curves)
+        sharpe = sortino = volatility = np.full(n_curves, np.nan)
+
+    # Passagem 2: drawdown, Ulcer e tempo de recuperação
+    roll_max = np.maximum.accumulate(eq, axis=1)
+    drawdown = (eq - roll_max) / roll_max
+    max_dd = drawdown.min(axis=1)
+    dd_end = np.argmin(drawdown, axis=1)
+    idx = np.arange(n_points)
+    before_end = idx[None, :] <= dd_end[:, None]
+    dd_start = np.argmax(np.where(before_end, eq, -np.inf), axis=1)
+    ulcer = np.sqrt(np.mean((drawdown * 100) ** 2, axis=1))
+    peak_value = eq[np.arange(n_curves), dd_start]
+    recovered = (idx[None, :] >= dd_end[:, None]) & (eq >= peak_value[:, None])
+    has_recovery = recovered.any(axis=1) & (dd_end < n_points - 1)
+    recovery = np.where(has_recovery, np.argmax(recovered, axis=1) - dd_end, -1)
+
+    # CAGR e Calmar com anualização pelo intervalo
+    years = n_points / ann
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cagr = np.where((years > 0) & (initial > 0), ((final / initial) ** (1 / years) - 1) * 100, 0.0)
+        calmar = np.where(max_dd < 0, cagr / (np.abs(max_dd) * 100), np.nan)
+
+    # Tempo de exposição (fração das barras com posição aberta)
+    if in_position is not None:
+        exposure = np.atleast_2d(np.asarray(in_position, dtype=bool)).mean(axis=1) * 100
+    else:
+        exposure = np.full(n_curves, np.nan)
+
+    # Passagem 3: Sharpe móvel por somas acumuladas
+    window = rolling_window or max(2, int(round(ann / 12)))
+    rolling_sharpe = np.full((n_curves, n_ret), np.nan)
+    if 1 < window <= n_ret:
+        csum = np.cumsum(np.pad(returns, ((0, 0), (1, 0))), axis=1)
+        csum2 = np.cumsum(np.pad(returns ** 2, ((0, 0), (1, 0))), axis=1)
+        s1 = csum[:, window:] - csum[:, :-window]
+        s2 = csum2[:, window:] - csum2[:, :-window]
+        mean_w = s1 / window
+        var_w = np.maximum(s2 - window * mean_w ** 2, 0.0) / (window - 1)
+        rolling_sharpe[:, window - 1:] = (mean_w - rf) / (np.sqrt(var_w) + 1e-9) * np.sqrt(ann)
+
+    metrics = {
+        "final_balance": final,
+        "total_return": final - initial,
+        "total_return_pct": (final / initial - 1) * 100,
+        "mean_return": mean_ret,
+        "sharpe": sharpe,
+        "sortino": sortino,
+        "volatility": volatility,
+        "max_drawdown": max_dd,
+        "drawdown_start": dd_start,
+        "drawdown_end": dd_end,
+        "recovery_time": recovery,
+        "ulcer_index": ulcer,
+        "cagr_pct": cagr,
+        "calmar": calmar,
+        "exposure_pct": exposure,
+        "annualization_periods": ann,
+        "drawdown_curve": drawdown,
+        "rolling_sharpe": rolling_sharpe,
+    }
+    if single:
+        metrics = {k: (v[0] if isinstance(v, np.ndarray) else v) for k, v in metrics.items()}
+        metrics["recovery_time"] = None if metrics["recovery_time"] < 0 else int(metrics["recovery_time"])
+    return metrics
+
+
+def compute_trade_metrics(trade_returns, initial_balance):
+    """
+    Estatísticas dos trades (win rate, profit factor, etc.) em uma passagem vetorizada.
+    """
+    r = np.asarray(trade_returns, dtype=float)
+    if r.size == 0:
+        return {"n_trades": 0, "avg_return": 0, "win_rate_pct": 0,
+                "gross_profit": 0.0, "gross_loss": 0.0, "profit_factor": np.inf}
+    gross_profit = r.clip(min=0).sum() * initial_balance
+    gross_loss = -r.clip(max=0).sum() * initial_balance
+    return {
+        "n_trades": int(r.size),
+        "avg_return": r.mean(),
+        "win_rate_pct": np.count_nonzero(r > 0) / r.size * 100,
+        "gross_profit": gross_profit,
+        "gross_loss": gross_loss,
+        "profit_factor": gross_profit / gross_loss if gross_loss > 0 else np.inf,
+    }
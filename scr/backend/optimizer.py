@@ -0,0 +1,284 @@
+import itertools
+import math
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+import pandas as pd
+from backend.backtest_service import (
+    load_market_data,
+    load_strategy_class,
+    get_strategy_warmup,
+    backtest_on_data,
+)
+from backend.backtester import Backtester
+from backend.shared_data import SharedDataPublisher, attach_shared_frame
+
+# Menor fração do período usada na primeira rodada (fatias menores são ruído puro)
+MIN_FRACTION = 0.1
+
+# Intervalo (s) entre consultas ao cancelamento de iter_grid_sweep enquanto espera resultados
+CANCEL_POLL_SECONDS = 0.2
+
+# Estado de cada processo worker: dados anexados uma vez por processo
+_WORKER = {}
+
+
+def expand_grid(param_space):
+    """Produto cartesiano de um espaço discreto {param: [valores]} -> lista de dicts."""
+    names = list(param_space)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_space[n] for n in names))]
+
+
+def sample_candidates(param_space, n_candidates, constraint=None, seed=0):
+    """
+    Sorteia candidatos do espaço de parâmetros.
+
+    Cada parâmetro pode ser uma lista de valores (discreto) ou uma tupla (min, max):
+    int -> inteiro uniforme, float -> uniforme contínuo. Se todo o espaço for discreto
+    e menor que n_candidates, devolve a grade inteira.
+    """
+    rng = random.Random(seed)
+    if all(isinstance(v, (list, range)) for v in param_space.values()):
+        grid = [c for c in expand_grid(param_space) if constraint is None or constraint(c)]
+        if len(grid) <= n_candidates:
+            return grid
+        return rng.sample(grid, n_candidates)
+
+    candidates, seen, attempts = [], set(), 0
+    while len(candidates) < n_candidates and attempts < n_candidates * 100:
+        attempts += 1
+        cand = {}
+        for name, space in param_space.items():
+            if isinstance(space, tuple):
+                low, high = space
+                cand[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                cand[name] = rng.choice(list(space))
+        key = tuple(sorted(cand.items()))
+        if key in seen or (constraint is not None and not constraint(cand)):
+            continue
+        seen.add(key)
+        candidates.append(cand)
+    return candidates
+
+
+def _init_worker(handle, strategy_name):
+    _WORKER["data"] = attach_shared_frame(handle).frame
+    _WORKER["strategy"] = load_strategy_class(strategy_name)
+
+
+def _score(result, metric):
+    value = result.get(metric, np.nan) if "error" not in result else np.nan
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        value = np.nan
+    return -np.inf if np.isnan(value) else value
+
+
+def _worker_engine(interval, symbol, initial_balance, fee_pct, start_date):
+    """
+    Backtester do worker sobre os dados anexados, criado uma vez por processo e
+    reutilizado por todos os candidatos; None se a estratégia não for suportada.
+    """
+    key = (interval, symbol, initial_balance, fee_pct, start_date)
+    if _WORKER.get("engine_key") != key:
+        try:
+            _WORKER["engine"] = Backtester(
+                _WORKER["data"], _WORKER["strategy"], interval, start=start_date,
+                initial_balance=initial_balance, fee_pct=fee_pct, symbol=symbol
+            )
+        except ValueError:
+            _WORKER["engine"] = None
+        _WORKER["engine_key"] = key
+    return _WORKER["engine"]
+
+
+def _evaluate(params, n_rows, interval, symbol, initial_balance, fee_pct, start_date, metric):
+    """Roda um candidato sobre as primeiras `n_rows` barras dos dados do worker."""
+    engine = _worker_engine(interval, symbol, initial_balance, fee_pct, start_date)
+    if engine is not None:
+        metrics = engine.run(params, n_rows)
+        return _score(metrics, metric), metrics
+    data = _WORKER["data"].iloc[:n_rows]
+    result = backtest_on_data(
+        data, _WORKER["strategy"], interval,
+        symbol=symbol, initial_balance=initial_balance,
+        strategy_params=params, fee_pct=fee_pct, start=start_date
+    )
+    return _score(result, metric), {k: v for k, v in result.items() if not isinstance(v, (list, dict))}
+
+
+def optimize_strategy(
+    strategy_name,
+    interval,
+    param_space,
+    symbol="BTCUSDT",
+    start_date="1 Jan 2020",
+    end_date=None,
+    initial_balance=10000,
+    fee_pct=0.001,
+    n_candidates=81,
+    eta=3,
+    min_fraction=None,
+    metric="sharpe_ratio",
+    constraint=None,
+    workers=None,
+    seed=0
+):
+    """
+    Otimização adaptativa por successive halving.
+
+    Os candidatos são avaliados em fatias crescentes do período (sempre a partir de
+    start_date); a cada rodada só o melhor 1/eta segue para uma fatia eta vezes maior,
+    até a última rodada, que usa o período completo. Avaliações rodam em paralelo;
+    os workers leem os dados da memória compartilhada.
+
+    Args:
+        param_space (dict): {param: [valores]} ou {param: (min, max)}.
+        n_candidates (int): Quantos candidatos entram na primeira rodada.
+        eta (int): Fator de redução/crescimento entre rodadas.
+        min_fraction (float): Fração do período na 1ª rodada (padrão: eta ** -(n_rodadas-1), mín. 10%).
+        metric (str): Métrica do resultado a maximizar (ex: 'sharpe_ratio', 'cagr_pct').
+        constraint (callable): Filtro de candidatos válidos (ex: short < long).
+    Returns:
+        dict com best_params, best_metrics, leaderboard (DataFrame da rodada final),
+        rounds (resumo de cada rodada) e n_backtests / full_backtest_equivalent.
+    """
+    StrategyClass = load_strategy_class(strategy_name)
+    if StrategyClass is None:
+        return {"error": f"Estratégia '{strategy_name}' não encontrada."}
+    candidates = sample_candidates(param_space, n_candidates, constraint, seed)
+    if not candidates:
+        return {"error": "Nenhum candidato válido no espaço de parâmetros."}
+
+    warmups = [get_strategy_warmup(StrategyClass, c) for c in candidates]
+    warmup = None if any(w is None for w in warmups) else max(warmups)
+    data = load_market_data(symbol, interval, start_date, end_date, warmup_bars=warmup)
+    if data is None or data.empty:
+        return {"error": "Dados insuficientes para backtest."}
+    first_bar = int(np.searchsorted(data.index.values, np.datetime64(pd.Timestamp(start_date))))
+    n_period = len(data) - first_bar
+
+    # A rodada final mantém ~eta candidatos no período completo
+    n_rounds = max(1, int(math.floor(math.log(len(candidates), eta) + 1e-9)))
+    if min_fraction is None:
+        min_fraction = max(MIN_FRACTION, eta ** -(n_rounds - 1))
+
+    rounds = []
+    n_backtests = 0
+    cost = 0.0
+    survivors = candidates
+    with SharedDataPublisher() as publisher, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(publisher.publish((symbol, interval), data), strategy_name)
+    ) as executor:
+        for r in range(n_rounds):
+            fraction = 1.0 if r == n_rounds - 1 else min(1.0, min_fraction * eta ** r)
+            n_rows = first_bar + max(2, int(math.ceil(n_period * fraction)))
+            futures = [
+                executor.submit(_evaluate, params, n_rows, interval, symbol, initial_balance, fee_pct, start_date, metric)
+                for params in survivors
+            ]
+            scored = [(f.result(), params) for f, params in zip(futures, survivors)]
+            scored.sort(key=lambda item: item[0][0], reverse=True)
+            n_backtests += len(scored)
+            cost += len(scored) * fraction
+            rounds.append({
+                "round": r,
+                "fraction": fraction,
+                "n_candidates": len(scored),
+                "best_score": scored[0][0][0],
+                "best_params": scored[0][1],
+            })
+            if r == n_rounds - 1:
+                break
+            keep = max(1, len(scored) // eta)
+            survivors = [params for _, params in scored[:keep]]
+
+    leaderboard = pd.DataFrame([{**params, metric: score, **{
+        k: v for k, v in metrics.items() if k in ("total_return_pct", "max_drawdown_pct", "n_trades")
+    }} for (score, metrics), params in scored])
+    (best_score, best_metrics), best_params = scored[0]
+    return {
+        "best_params": best_params,
+        "best_score": best_score,
+        "best_metrics": best_metrics,
+        "leaderboard": leaderboard,
+        "rounds": rounds,
+        "n_backtests": n_backtests,
+        "full_backtest_equivalent": round(cost, 2),
+    }
+
+
+def iter_grid_sweep(
+    strategy_name,
+    interval,
+    param_grid,
+    symbol="BTCUSDT",
+    start_date="1 Jan 2020",
+    end_date=None,
+    initial_balance=10000,
+    fee_pct=0.001,
+    constraint=None,
+    workers=None,
+    cancelled=None
+):
+    """
+    Varredura completa de uma grade de parâmetros, entregando os resultados à medida
+    que cada backtest termina (para interfaces que atualizam parcialmente).
+
+    Os dados são carregados uma vez e compartilhados com os workers via memória
+    compartilhada. Só alguns backtests por worker ficam submetidos de cada vez;
+    `cancelled` (função sem argumentos, ex: flag da interface) é consultada antes de
+    cada submissão e a cada CANCEL_POLL_SECONDS enquanto espera resultados: ao
+    retornar True, os backtests pendentes são cancelados e a varredura termina sem
+    esperar o próximo resultado. Fechar o gerador tem o mesmo efeito.
+
+    Yields:
+        (params, metrics): parâmetros do candidato e métricas escalares do resultado
+        (ou {"error": ...}).
+    """
+    StrategyClass = load_strategy_class(strategy_name)
+    if StrategyClass is None:
+        raise ValueError(f"Estratégia '{strategy_name}' não encontrada.")
+    candidates = [c for c in expand_grid(param_grid) if constraint is None or constraint(c)]
+    if not candidates:
+        return
+    warmups = [get_strategy_warmup(StrategyClass, c) for c in candidates]
+    warmup = None if any(w is None for w in warmups) else max(warmups)
+    data = load_market_data(symbol, interval, start_date, end_date, warmup_bars=warmup)
+    if data is None or data.empty:
+        raise ValueError("Dados insuficientes para backtest.")
+
+    publisher = SharedDataPublisher()
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(publisher.publish((symbol, interval), data), strategy_name)
+    )
+    is_cancelled = cancelled or (lambda: False)
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    queue = iter(candidates)
+    pending = {}
+    try:
+        while not is_cancelled():
+            for params in itertools.islice(queue, max_pending - len(pending)):
+                pending[executor.submit(_evaluate, params, len(data), interval, symbol, initial_balance, fee_pct,
+                                        start_date, "sharpe_ratio")] = params
+                if is_cancelled():
+                    break
+            if not pending:
+                break
+            done, _ = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                params = pending.pop(future)
+                _, metrics = future.result()
+                yield params, metrics
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
+        publisher.close()
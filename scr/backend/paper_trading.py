@@ -0,0 +1,276 @@
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+from backend.backtest_service import (
+    load_market_data,
+    load_strategy_class,
+    get_strategy_warmup,
+    _new_engine_state,
+    _simulate_bars,
+    _build_result,
+)
+from backend.data_handlers.binance_data import BinanceDataHandler
+
+REPLAY_HOST = "127.0.0.1"
+# Limites (em microssegundos) dos histogramas de latência: escala logarítmica de 1us a 10s
+LATENCY_BINS_US = np.logspace(0, 7, 29)
+
+
+class LatencyRecorder:
+    """Acumula amostras de latência por etapa e gera histogramas/percentis."""
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def histogram(self, name, bins=LATENCY_BINS_US):
+        """Contagens por faixa (limites em microssegundos)."""
+        values = np.asarray(self.samples.get(name, []), dtype=float) * 1e6
+        counts, edges = np.histogram(values, bins=bins)
+        return {"bin_edges_us": edges.tolist(), "counts": counts.tolist()}
+
+    def summary(self):
+        """Percentis (em microssegundos) e histograma de cada etapa."""
+        report = {}
+        for name, values in self.samples.items():
+            us = np.asarray(values, dtype=float) * 1e6
+            p50, p90, p99 = np.percentile(us, [50, 90, 99])
+            report[name] = {
+                "count": len(us),
+                "p50_us": round(float(p50), 1),
+                "p90_us": round(float(p90), 1),
+                "p99_us": round(float(p99), 1),
+                "max_us": round(float(us.max()), 1),
+                "histogram": self.histogram(name),
+            }
+        return report
+
+
+def _kline_message(symbol, interval, bar, close, high, low, volume, closed):
+    """Mensagem no formato do stream de klines da Binance (campos principais)."""
+    return {
+        "e": "kline",
+        "E": int(time.time() * 1000),
+        "s": symbol,
+        "k": {
+            "t": int(bar["timestamp"].value // 10**6),
+            "i": interval,
+            "o": str(bar["open"]),
+            "h": str(high),
+            "l": str(low),
+            "c": str(close),
+            "v": str(volume),
+            "x": closed,
+        },
+    }
+
+
+class KlineReplayServer:
+    """
+    Servidor local que reproduz os klines salvos em CSV como um stream da Binance:
+    cada cliente recebe mensagens JSON, uma por linha, de todas as barras entre start e end.
+
+    Com `ticks_per_bar` > 1, cada barra gera atualizações parciais (x=false, fechamento
+    interpolado entre open e close) antes da mensagem final da barra fechada (x=true).
+    `bar_delay` é a pausa em segundos entre barras (0 = o mais rápido possível).
+    """
+    def __init__(self, symbol, interval, start=None, end=None, ticks_per_bar=1, bar_delay=0.0,
+                 host=REPLAY_HOST, port=0):
+        self.symbol = symbol
+        self.interval = interval
+        self.start = start
+        self.end = end
+        self.ticks_per_bar = max(1, ticks_per_bar)
+        self.bar_delay = bar_delay
+        self.host = host
+        self.port = port
+        self._server = None
+        self._bars = None
+
+    def _load_bars(self):
+        if self._bars is None:
+            df = BinanceDataHandler().load_from_csv(
+                self.symbol, self.interval, start=self.start, end=self.end,
+                columns=["open", "high", "low", "close", "volume"]
+            )
+            if df is None or df.empty:
+                raise ValueError(f"Sem dados locais para {self.symbol} {self.interval}.")
+            self._bars = df
+        return self._bars
+
+    async def _handle_client(self, reader, writer):
+        try:
+            for bar in self._load_bars().to_dict(orient="records"):
+                for tick in range(1, self.ticks_per_bar):
+                    frac = tick / self.ticks_per_bar
+                    price = bar["open"] + (bar["close"] - bar["open"]) * frac
+                    msg = _kline_message(self.symbol, self.interval, bar, price, max(bar["open"], price),
+                                         min(bar["open"], price), bar["volume"] * frac, False)
+                    writer.write(json.dumps(msg).encode() + b"\n")
+                msg = _kline_message(self.symbol, self.interval, bar, bar["close"], bar["high"], bar["low"],
+                                     bar["volume"], True)
+                writer.write(json.dumps(msg).encode() + b"\n")
+                await writer.drain()
+                if self.bar_delay:
+                    await asyncio.sleep(self.bar_delay)
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def start_server(self):
+        """Abre o servidor; retorna (host, port) efetivos (port=0 escolhe uma porta livre)."""
+        self._load_bars()
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+async def replay_stream(host, port):
+    """Gerador assíncrono das mensagens de kline do servidor de replay local."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            yield line
+    finally:
+        writer.close()
+
+
+async def binance_stream(symbol, interval):
+    """Gerador assíncrono do stream real de klines da Binance (requer o pacote 'websockets')."""
+    try:
+        import websockets
+    except ImportError:
+        raise ImportError("Pacote 'websockets' não instalado: use o servidor de replay local ou instale 'websockets'.")
+    url = f"wss://stream.binance.com:9443/ws/{symbol.lower()}@kline_{interval}"
+    async with websockets.connect(url) as ws:
+        async for message in ws:
+            yield message
+
+
+class PaperTrader:
+    """
+    Executa uma estratégia incremental (init_state/update) sobre um stream de klines.
+
+    O sinal é decidido no fechamento de cada barra e executado no open da barra
+    seguinte, pelo mesmo motor (_simulate_bars) e modelo de taxas do run_backtest:
+    o resultado é o mesmo de um backtest sobre as mesmas barras.
+    """
+    def __init__(self, strategy, strategy_name, symbol, interval, initial_balance=10000, fee_pct=0.001,
+                 strategy_params=None):
+        self.strategy = strategy
+        self.strategy_name = strategy_name
+        self.strategy_params = dict(strategy_params or {})
+        self.symbol = symbol
+        self.interval = interval
+        self.initial_balance = initial_balance
+        self.fee_pct = fee_pct
+        self.strategy_state = strategy.init_state()
+        self.engine_state = None
+        self.pending_signal = np.nan
+        self.current_bar = None
+        self.n_ticks = 0
+        self.n_bars = 0
+        self.latency = LatencyRecorder()
+
+    def warm_up(self, closes):
+        """Alimenta os indicadores com fechamentos históricos (sem operar)."""
+        for close in closes:
+            self.strategy.update(self.strategy_state, float(close))
+
+    def on_message(self, raw, received):
+        """Processa uma mensagem do stream. `received` é o perf_counter do recebimento."""
+        msg = json.loads(raw)
+        k = msg["k"]
+        self.n_ticks += 1
+        self.latency.record("feed", max(0.0, time.time() - msg["E"] / 1000))
+        bar_time = pd.Timestamp(k["t"], unit="ms")
+        if bar_time != self.current_bar:
+            # Primeira mensagem da barra: o open já é conhecido, executa o sinal pendente
+            self.current_bar = bar_time
+            self.n_bars += 1
+            open_price = float(k["o"])
+            if self.engine_state is None:
+                # Primeira barra do stream: âncora do saldo inicial (não negocia)
+                self.engine_state = _new_engine_state(self.initial_balance, pd.DataFrame({"open": [open_price]}))
+                self.engine_state["last_timestamp"], self.engine_state["last_open"] = bar_time, open_price
+            else:
+                _simulate_bars(self.engine_state, [bar_time], [open_price], [self.pending_signal], self.fee_pct)
+                self.engine_state["benchmark_opens"].append(open_price)
+            self.latency.record("tick_to_fill", time.perf_counter() - received)
+        if k["x"]:
+            self.pending_signal = self.strategy.update(self.strategy_state, float(k["c"]))
+            self.latency.record("tick_to_decision", time.perf_counter() - received)
+
+    def result(self):
+        """Resultado no formato do run_backtest (posição aberta liquidada no último open) + latências."""
+        if self.engine_state is None:
+            return {"error": "Nenhuma barra recebida do stream."}
+        result = _build_result(
+            self.engine_state, self.strategy_name, self.interval, self.symbol, self.fee_pct,
+            strategy_params=self.strategy_params
+        )
+        result["paper"] = {"bars": self.n_bars, "ticks": self.n_ticks, "latency": self.latency.summary()}
+        return result
+
+
+async def _consume(trader, stream):
+    async for raw in stream:
+        trader.on_message(raw, time.perf_counter())
+
+
+async def _run_replay(trader, server):
+    host, port = await server.start_server()
+    try:
+        await _consume(trader, replay_stream(host, port))
+    finally:
+        await server.close()
+
+
+def run_paper_trading(
+    strategy_name,
+    interval,
+    symbol="BTCUSDT",
+    start_date="1 Jan 2024",
+    end_date=None,
+    initial_balance=10000,
+    strategy_params=None,
+    fee_pct=0.001,
+    ticks_per_bar=1,
+    bar_delay=0.0
+):
+    """
+    Paper trading da estratégia contra o servidor de replay local (CSV salvo).
+
+    Os indicadores são aquecidos com as barras anteriores a start_date; a partir dela,
+    as barras chegam pelo stream e são operadas uma a uma. Retorna o dicionário do
+    run_backtest + "paper" (barras, ticks e histogramas de latência tick->decisão).
+    """
+    StrategyClass = load_strategy_class(strategy_name)
+    if StrategyClass is None:
+        return {"error": f"Estratégia '{strategy_name}' não encontrada."}
+    strategy = StrategyClass(**(strategy_params or {}))
+    if not hasattr(strategy, "update"):
+        return {"error": f"Estratégia '{strategy_name}' não suporta atualização incremental (update)."}
+
+    trader = PaperTrader(strategy, strategy_name, symbol, interval, initial_balance, fee_pct, strategy_params)
+    warmup = get_strategy_warmup(StrategyClass, strategy_params)
+    history = load_market_data(symbol, interval, start_date, end_date, warmup_bars=warmup)
+    if history is None or history.empty:
+        return {"error": "Dados insuficientes para paper trading."}
+    trader.warm_up(history.loc[history.index < pd.Timestamp(start_date), "close"].to_numpy())
+
+    server = KlineReplayServer(symbol, interval, start_date, end_date, ticks_per_bar=ticks_per_bar, bar_delay=bar_delay)
+    asyncio.run(_run_replay(trader, server))
+    return trader.result()
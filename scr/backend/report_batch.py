@@ -0,0 +1,124 @@
+import hashlib
+import html
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from backend.run_archive import load_run
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "reports")
+INDEX_FILE = "index.html"
+PLOTLY_BUNDLE = "plotly.min.js"
+
+# Métricas mostradas na tabela do índice
+INDEX_METRICS = [
+    ("total_return_pct", "Retorno %"),
+    ("cagr_pct", "CAGR %"),
+    ("sharpe_ratio", "Sharpe"),
+    ("max_drawdown_pct", "Max DD %"),
+    ("win_rate_pct", "Win %"),
+    ("n_trades", "Trades"),
+]
+
+
+def report_filename(result, position):
+    """
+    Nome único e estável do relatório: posição na lista + estratégia/símbolo/intervalo
+    + hash curto dos parâmetros (rodar de novo no mesmo diretório sobrescreve o mesmo arquivo).
+    """
+    params = json.dumps(result.get("strategy_params", {}), sort_keys=True, default=str)
+    digest = hashlib.sha1(params.encode()).hexdigest()[:8]
+    stem = f"{position:04d}_{result.get('strategy')}_{result.get('symbol')}_{result.get('interval')}_{digest}"
+    return re.sub(r"[^A-Za-z0-9_.-]", "-", stem) + ".html"
+
+
+def _write_plotly_bundle(output_dir):
+    """Grava uma única cópia do plotly.js no diretório; os relatórios a referenciam."""
+    path = os.path.join(output_dir, PLOTLY_BUNDLE)
+    if not os.path.exists(path):
+        from plotly.offline import get_plotlyjs
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(get_plotlyjs())
+
+
+def _render_report(source, position, output_dir, heatmap_types):
+    """
+    Renderiza um relatório (no processo worker). `source` é um dicionário de resultado
+    ou o run_id de uma execução salva (carregada aqui, sem passar as curvas entre processos).
+    """
+    from backend.visualization import build_results_figure, compute_heatmap_aggregates
+
+    result = load_run(source) if isinstance(source, str) else source
+    if "error" in result:
+        return {"position": position, "error": result["error"]}
+    filename = report_filename(result, position)
+    label = f"{result.get('strategy')} {result.get('symbol')} {result.get('interval')} {result.get('strategy_params', {})}"
+
+    aggregates = compute_heatmap_aggregates(result)
+    parts = []
+    for i, heatmap_type in enumerate(heatmap_types):
+        fig = build_results_figure(result, heatmap_type=heatmap_type, aggregates=aggregates, title=label)
+        parts.append(fig.to_html(full_html=False, include_plotlyjs="directory" if i == 0 else False))
+    with open(os.path.join(output_dir, filename), "w", encoding="utf-8") as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(label)}</title></head>"
+                f"<body>{''.join(parts)}</body></html>\n")
+    return {
+        "position": position,
+        "file": filename,
+        "label": label,
+        "metrics": {key: result.get(key) for key, _ in INDEX_METRICS},
+    }
+
+
+def write_index(entries, output_dir):
+    """Gera o index.html com uma linha (link + métricas principais) por relatório."""
+    header = "".join(f"<th>{title}</th>" for _, title in INDEX_METRICS)
+    rows = []
+    for entry in sorted(entries, key=lambda e: e["position"]):
+        if "error" in entry:
+            rows.append(f"<tr><td>{entry['position']}</td><td colspan=\"{len(INDEX_METRICS) + 1}\">"
+                        f"Erro: {html.escape(str(entry['error']))}</td></tr>")
+            continue
+        cells = "".join(f"<td>{html.escape(str(entry['metrics'].get(key)))}</td>" for key, _ in INDEX_METRICS)
+        rows.append(f"<tr><td>{entry['position']}</td><td><a href=\"{entry['file']}\">"
+                    f"{html.escape(entry['label'])}</a></td>{cells}</tr>")
+    path = os.path.join(output_dir, INDEX_FILE)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Relatórios de backtest</title></head><body>\n"
+                f"<h1>Relatórios de backtest ({len(entries)})</h1>\n"
+                f"<table border=\"1\" cellpadding=\"4\"><tr><th>#</th><th>Execução</th>{header}</tr>\n"
+                + "\n".join(rows) + "\n</table></body></html>\n")
+    return path
+
+
+def generate_reports(sources, output_dir=REPORTS_DIR, heatmap_types=("pnl",), workers=None):
+    """
+    Gera relatórios HTML interativos para muitos resultados, sem abrir navegador.
+
+    Cada resultado é renderizado em paralelo (pool de processos) para um arquivo com
+    nome único; séries longas usam traces WebGL com arrays binários e os agregados
+    dos heatmaps são calculados uma vez por resultado. O plotly.js é gravado uma única
+    vez no diretório, e um index.html lista todos os relatórios.
+
+    Args:
+        sources (list): Dicionários de resultado (run_backtest) e/ou run_ids do arquivo de execuções.
+        heatmap_types (tuple): Heatmaps incluídos em cada relatório ('pnl', 'win', 'drawdown', 'bestworst').
+    Returns:
+        str: caminho do index.html.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    _write_plotly_bundle(output_dir)
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_render_report, source, position, output_dir, list(heatmap_types))
+            for position, source in enumerate(sources)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {"position": futures.index(future), "error": str(e)}
+            entries.append(entry)
+            print(f"[{done}/{len(futures)}] {entry.get('file', entry.get('error'))}")
+    return write_index(entries, output_dir)
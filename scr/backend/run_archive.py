@@ -0,0 +1,144 @@
+import json
+import os
+import uuid
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from backend.data_handlers.file_store import atomic_write, dataset_lock
+
+ARCHIVE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "runs")
+INDEX_FILE = "index.json"
+
+# Curvas numéricas salvas como arrays float64
+CURVE_KEYS = ["equity_curve", "drawdown_curve", "rolling_sharpe", "returns_per_trade", "trade_pnls"]
+# Colunas do ledger de trades: datas viram int64 (ns), o resto float64
+LEDGER_DATE_COLUMNS = ["dt_entry", "dt_exit"]
+LEDGER_NUMERIC_COLUMNS = [
+    "price_entry", "price_exit", "fee_entry", "fee_exit", "balance_before_entry",
+    "balance_after_exit", "position_qty", "pnl", "duration",
+]
+# Métricas copiadas para o índice (listagem rápida sem abrir os arquivos)
+INDEX_METRICS = [
+    "total_return_pct", "cagr_pct", "sharpe_ratio", "max_drawdown_pct", "win_rate_pct", "n_trades",
+]
+
+
+def _json_default(obj):
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    return str(obj)
+
+
+def _write_json_atomic(path, payload):
+    with atomic_write(path, encoding="utf-8") as f:
+        json.dump(payload, f, default=_json_default, indent=1)
+
+
+def list_runs(archive_dir=ARCHIVE_DIR):
+    """Lista as execuções salvas (mais recentes primeiro) lendo só o índice."""
+    path = os.path.join(archive_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_run(result, label=None, archive_dir=ARCHIVE_DIR):
+    """
+    Salva o resultado de um backtest no arquivo de execuções: um .npz por execução
+    (métricas, curvas e ledger de trades) + uma entrada no índice.
+
+    Returns:
+        str: run_id da execução salva.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    created = datetime.now()
+    run_id = f"{created:%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+    arrays = {key: np.asarray(result.get(key, []), dtype=float) for key in CURVE_KEYS}
+    arrays["trade_durations"] = np.asarray(result.get("trade_durations", []), dtype=np.int64)
+    arrays["trade_types"] = np.asarray(result.get("trade_types", []), dtype=str)
+    arrays["benchmark_equity"] = np.asarray(result.get("benchmark", {}).get("equity_curve", []), dtype=float)
+
+    ledger = pd.DataFrame(result.get("trades", []))
+    for col in LEDGER_DATE_COLUMNS:
+        values = pd.to_datetime(ledger[col]) if col in ledger else pd.Series(pd.NaT, index=ledger.index)
+        arrays[f"ledger_{col}"] = values.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    for col in LEDGER_NUMERIC_COLUMNS:
+        values = ledger[col] if col in ledger else pd.Series(np.nan, index=ledger.index)
+        arrays[f"ledger_{col}"] = values.to_numpy(dtype=float)
+
+    metrics = {k: v for k, v in result.items() if not isinstance(v, (list, dict))}
+    extras = {
+        "benchmark": {k: v for k, v in result.get("benchmark", {}).items() if k != "equity_curve"},
+        "trade_audit": result.get("trade_audit", {}),
+        "strategy_params": result.get("strategy_params", {}),
+        "breakdown": result.get("breakdown", {}),
+    }
+    arrays["metrics_json"] = np.array(json.dumps({"metrics": metrics, **extras}, default=_json_default))
+    np.savez(os.path.join(archive_dir, f"{run_id}.npz"), **arrays)
+
+    entry = {
+        "run_id": run_id,
+        "created": created.isoformat(timespec="seconds"),
+        "label": label or f"{result.get('strategy')} {result.get('symbol')} {result.get('interval')}",
+        "symbol": result.get("symbol"),
+        "interval": result.get("interval"),
+        "strategy": result.get("strategy"),
+        "strategy_params": result.get("strategy_params", {}),
+        **{k: metrics.get(k) for k in INDEX_METRICS},
+    }
+    # Lê-modifica-grava do índice sob lock: saves/deletes simultâneos não perdem entradas
+    index_path = os.path.join(archive_dir, INDEX_FILE)
+    with dataset_lock(index_path):
+        runs = list_runs(archive_dir)
+        runs.insert(0, entry)
+        _write_json_atomic(index_path, runs)
+    return run_id
+
+
+def load_run(run_id, archive_dir=ARCHIVE_DIR):
+    """
+    Carrega uma execução salva no mesmo formato de dicionário de run_backtest
+    (sem refazer o backtest). Retorna {"error": ...} se não existir.
+    """
+    path = os.path.join(archive_dir, f"{run_id}.npz")
+    if not os.path.exists(path):
+        return {"error": f"Execução '{run_id}' não encontrada."}
+    with np.load(path) as npz:
+        payload = json.loads(npz["metrics_json"].item())
+        result = dict(payload["metrics"])
+        for key in CURVE_KEYS:
+            result[key] = npz[key].tolist()
+        result["trade_durations"] = npz["trade_durations"].tolist()
+        result["trade_types"] = npz["trade_types"].tolist()
+
+        columns = {col: pd.to_datetime(npz[f"ledger_{col}"].view("datetime64[ns]")) for col in LEDGER_DATE_COLUMNS}
+        columns.update({col: npz[f"ledger_{col}"] for col in LEDGER_NUMERIC_COLUMNS})
+        ledger = pd.DataFrame(columns)
+        benchmark = dict(payload["benchmark"])
+        benchmark["equity_curve"] = npz["benchmark_equity"].tolist()
+
+    result["trades"] = ledger.to_dict(orient="records")
+    result["trade_dates"] = [{"entry": e, "exit": x} for e, x in zip(ledger["dt_entry"], ledger["dt_exit"])]
+    result["benchmark"] = benchmark
+    result["trade_audit"] = payload["trade_audit"]
+    result["strategy_params"] = payload["strategy_params"]
+    result["breakdown"] = payload.get("breakdown", {})
+    result["run_id"] = run_id
+    return result
+
+
+def delete_run(run_id, archive_dir=ARCHIVE_DIR):
+    """Remove uma execução do arquivo e do índice."""
+    path = os.path.join(archive_dir, f"{run_id}.npz")
+    if os.path.exists(path):
+        os.remove(path)
+    index_path = os.path.join(archive_dir, INDEX_FILE)
+    with dataset_lock(index_path):
+        runs = [r for r in list_runs(archive_dir) if r["run_id"] != run_id]
+        _write_json_atomic(index_path, runs)
@@ -0,0 +1,121 @@
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Blocos já anexados neste processo (cada worker anexa uma única vez por dataset)
+_ATTACHED = {}
+
+
+def _open_block(name):
+    try:
+        # Python 3.13+: não registra o bloco no resource tracker do worker
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Antes do 3.13 o attach registra o bloco no tracker do worker, que o apagaria
+        # (e avisaria de "leak") ao sair; quem libera o bloco é o publicador
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class SharedDataPublisher:
+    """
+    Publica as colunas OHLCV de cada símbolo/intervalo em blocos de
+    multiprocessing.shared_memory, uma única vez.
+
+    O handle retornado por `publish` é um dict pequeno (nomes, dtypes e shapes dos
+    blocos): é ele que vai para os workers, que anexam as colunas como views
+    NumPy somente-leitura via `attach_shared_frame`, sem copiar nem reler dados.
+    Use como context manager (ou chame `close`) para liberar os blocos.
+    """
+    def __init__(self):
+        self._blocks = []
+        self.handles = {}
+
+    def _put(self, array):
+        array = np.ascontiguousarray(array)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        view[...] = array
+        self._blocks.append(shm)
+        return {"name": shm.name, "dtype": array.dtype.str, "shape": array.shape}
+
+    def publish(self, key, df, columns=None):
+        """
+        Publica `df` (índice de datas + colunas numéricas) sob `key` (ex: ('BTCUSDT', '4h')).
+        Retorna o handle para os workers. Publicar a mesma chave de novo reaproveita os blocos.
+        """
+        if key in self.handles:
+            return self.handles[key]
+        columns = [c for c in (columns or OHLCV_COLUMNS + ["returns"]) if c in df.columns]
+        index = pd.DatetimeIndex(df.index).values.astype("datetime64[ns]").view(np.int64)
+        handle = {
+            "key": key,
+            "index": self._put(index),
+            "index_name": df.index.name,
+            "columns": {col: self._put(df[col].to_numpy()) for col in columns},
+            # Casas decimais das colunas em float32 (modo lean), para as_float64 nos workers
+            "float32_decimals": {c: d for c, d in df.attrs.get("float32_decimals", {}).items() if c in columns},
+        }
+        self.handles[key] = handle
+        return handle
+
+    @property
+    def nbytes(self):
+        return sum(b.size for b in self._blocks)
+
+    def close(self):
+        """Libera todos os blocos publicados (os workers já devem ter terminado)."""
+        for shm in self._blocks:
+            shm.close()
+            # Workers filhos dividem o tracker deste processo e podem ter desregistrado o
+            # bloco ao anexar (ver _open_block); registrar de novo (idempotente) mantém o
+            # unlink consistente com o tracker
+            resource_tracker.register(shm._name, "shared_memory")
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+        self.handles = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SharedFrame:
+    """Colunas anexadas de um handle publicado: arrays somente-leitura apontando para a memória compartilhada."""
+    def __init__(self, handle):
+        self.handle = handle
+        self._blocks = []
+        self.index = pd.DatetimeIndex(self._view(handle["index"]).view("datetime64[ns]"), name=handle["index_name"])
+        self.columns = {col: self._view(desc) for col, desc in handle["columns"].items()}
+        self._frame = None
+
+    def _view(self, desc):
+        shm = _open_block(desc["name"])
+        self._blocks.append(shm)
+        arr = np.ndarray(tuple(desc["shape"]), dtype=np.dtype(desc["dtype"]), buffer=shm.buf)
+        arr.setflags(write=False)
+        return arr
+
+    @property
+    def frame(self):
+        """DataFrame montado sobre as views (sem cópia dos dados)."""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.columns, index=self.index, copy=False)
+            self._frame.attrs["float32_decimals"] = dict(self.handle.get("float32_decimals", {}))
+        return self._frame
+
+
+def attach_shared_frame(handle):
+    """Anexa (uma vez por processo) os blocos de um handle e retorna o SharedFrame."""
+    key = tuple(desc["name"] for desc in handle["columns"].values())
+    if key not in _ATTACHED:
+        _ATTACHED[key] = SharedFrame(handle)
+    return _ATTACHED[key]
@@ -0,0 +1,106 @@
+import inspect
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+
+
+class ArrayStrategy(ABC):
+    """
+    Protocolo de estratégia orientado a arrays.
+
+    A subclasse declara `required_columns` (colunas lidas dos dados) e `warmup_bars`
+    (barras até o primeiro sinal válido) e implementa `compute_signals`, que recebe
+    views NumPy dessas colunas e devolve um array int8 de sinais (1 compra, -1 venda,
+    0 nada), um por barra. O motor usa `signal_array` direto, sem montar DataFrames.
+    `required_indicators` lista as chaves dos indicadores embutidos do IndicatorCache
+    que a estratégia lê (ex: ("sma", "close", 20)), para que possam ser calculados uma
+    vez e compartilhados entre execuções em processos diferentes (ver comparison).
+    Uma estratégia que declara `higher_timeframes` ({intervalo: barras de aquecimento})
+    recebe também `higher_timeframes` (intervalo -> view alinhada) em compute_signals
+    e compute_targets.
+    """
+    required_columns = ["close"]
+    required_indicators = []
+    higher_timeframes = None
+    warmup_bars = 0
+
+    @abstractmethod
+    def compute_signals(self, columns, indicators=None):
+        """
+        Args:
+            columns (dict): nome da coluna -> array NumPy (somente leitura) das barras.
+            indicators (IndicatorCache): cache opcional de indicadores dos mesmos dados.
+        Returns:
+            np.ndarray: sinais int8, mesmo tamanho das colunas.
+        """
+
+    def compute_targets(self, columns, indicators=None, **context):
+        """
+        Exposição-alvo por barra em [-1, 1] para o motor de exposição-alvo: fração do
+        capital comprada (positiva) ou vendida (negativa); 0 = zerado. O padrão é o
+        último sinal de compute_signals propagado para frente (ver signals_to_targets);
+        estratégias com tamanho fracionário sobrescrevem este método.
+        """
+        return signals_to_targets(self.compute_signals(columns, indicators=indicators, **context))
+
+    def _timeframe_context(self, higher_timeframes):
+        """Argumentos extras de compute_signals/compute_targets: as views dos timeframes superiores declarados."""
+        if not self.higher_timeframes:
+            return {}
+        if higher_timeframes is None:
+            raise ValueError(f"{type(self).__name__} declara timeframes superiores, mas eles não foram carregados.")
+        return {"higher_timeframes": higher_timeframes}
+
+    def signal_array(self, data, indicators=None, higher_timeframes=None, **context):
+        """Sinais int8 para as barras de `data` (DataFrame com as colunas requeridas)."""
+        columns = {col: data[col].to_numpy() for col in self.required_columns}
+        signals = self.compute_signals(columns, indicators=indicators, **self._timeframe_context(higher_timeframes))
+        return np.asarray(signals, dtype=np.int8)
+
+    def target_array(self, data, indicators=None, higher_timeframes=None, **context):
+        """Exposições-alvo float64 (limitadas a [-1, 1]) para as barras de `data`."""
+        columns = {col: data[col].to_numpy() for col in self.required_columns}
+        targets = self.compute_targets(columns, indicators=indicators, **self._timeframe_context(higher_timeframes))
+        return np.clip(np.asarray(targets, dtype=float), -1.0, 1.0)
+
+    def generate_signals(self, data, indicators=None, higher_timeframes=None):
+        """Interface DataFrame (colunas price/signal) para quem ainda consome sinais em tabela."""
+        signals = pd.DataFrame(index=data.index)
+        if 'close' in data:
+            signals['price'] = data['close']
+        signals['signal'] = self.signal_array(data, indicators, higher_timeframes=higher_timeframes)
+        return signals
+
+
+class DataFrameStrategyAdapter:
+    """
+    Adapta uma estratégia que gera DataFrame (`generate_signals` -> coluna 'signal')
+    ao protocolo de arrays: devolve os sinais como float64 alinhados às barras dos dados,
+    com NaN onde a estratégia não gerou sinal.
+    """
+    def __init__(self, strategy):
+        self.strategy = strategy
+
+    def signal_array(self, data, **context):
+        # Só repassa os argumentos extras (ex: indicators) que a estratégia aceita
+        accepted = inspect.signature(self.strategy.generate_signals).parameters
+        kwargs = {k: v for k, v in context.items() if k in accepted and v is not None}
+        signals = self.strategy.generate_signals(data, **kwargs)
+        if signals.empty:
+            return np.full(len(data), np.nan)
+        return signals['signal'].reindex(data.index).to_numpy(dtype=float)
+
+
+def signals_to_targets(signals):
+    """
+    Exposição-alvo implícita em sinais de compra/venda: o último sinal não nulo
+    propagado para frente (1 = comprado, -1 = vendido, 0 antes do primeiro sinal).
+    """
+    signals = np.nan_to_num(np.asarray(signals, dtype=float))
+    last = np.maximum.accumulate(np.where(signals != 0, np.arange(len(signals)), -1))
+    return np.where(last >= 0, signals[np.maximum(last, 0)], 0.0)
+
+
+def as_array_strategy(strategy):
+    """Retorna a estratégia no protocolo de arrays (ela mesma ou um adaptador)."""
+    return strategy if hasattr(strategy, "signal_array") else DataFrameStrategyAdapter(strategy)
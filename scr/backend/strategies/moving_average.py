@@ -1,24 +1,64 @@
-import pandas as pd
+from collections import deque
+import numpy as np
+from backend.indicators import rolling_mean
+from backend.strategies._base import ArrayStrategy
+
+class MovingAverageStrategy(ArrayStrategy):
+    required_columns = ["close"]
 
-class MovingAverageStrategy:
     def __init__(self, short_window=50, long_window=200):
         self.short_window = short_window
         self.long_window = long_window
-    
-    def generate_signals(self, data):
+
+    @property
+    def warmup_bars(self):
+        """Barras necessárias antes do primeiro sinal válido (janela da média mais longa)."""
+        return max(self.short_window, self.long_window)
+
+    @property
+    def required_indicators(self):
+        """Médias lidas do IndicatorCache em compute_signals."""
+        return [("sma", "close", self.short_window), ("sma", "close", self.long_window)]
+
+    def compute_signals(self, columns, indicators=None):
         """
-        Gera sinais de compra/venda baseados em crossover de médias móveis
+        Gera sinais de compra/venda baseados em crossover de médias móveis.
+        Compra (1) com a média curta acima da longa, venda (-1) abaixo.
+        Se `indicators` (IndicatorCache) for passado, reaproveita as médias já calculadas.
         """
-        signals = pd.DataFrame(index=data.index)
-        signals['price'] = data['close']
-        signals['short_ma'] = data['close'].rolling(self.short_window).mean()
-        signals['long_ma'] = data['close'].rolling(self.long_window).mean()
-        
-        # Sinal de compra (1) quando a média curta cruza a longa para cima
-        signals['signal'] = 0
-        signals.loc[signals['short_ma'] > signals['long_ma'], 'signal'] = 1
-        
-        # Sinal de venda (-1) quando a média curta cruza a longa para baixo
-        signals.loc[signals['short_ma'] < signals['long_ma'], 'signal'] = -1
-        
+        if indicators is not None:
+            short_ma = indicators.sma('close', self.short_window).to_numpy()
+            long_ma = indicators.sma('close', self.long_window).to_numpy()
+        else:
+            close = columns['close']
+            short_ma = rolling_mean(close, self.short_window)
+            long_ma = rolling_mean(close, self.long_window)
+        signals = np.zeros(len(short_ma), dtype=np.int8)
+        signals[short_ma > long_ma] = 1
+        signals[short_ma < long_ma] = -1
         return signals
+
+    def init_state(self):
+        """Estado incremental (para paper trading): últimos fechamentos e somas das janelas."""
+        return {"closes": deque(maxlen=max(self.short_window, self.long_window) + 1), "short_sum": 0.0, "long_sum": 0.0}
+
+    def update(self, state, close):
+        """
+        Atualiza as médias com o fechamento de uma nova barra em O(1) e retorna o sinal
+        da barra (1, -1 ou 0), igual à última linha de generate_signals sobre o mesmo histórico.
+        """
+        closes = state["closes"]
+        closes.append(close)
+        n = len(closes)
+        state["short_sum"] += close
+        state["long_sum"] += close
+        # Remove da soma o fechamento que acabou de sair de cada janela
+        if n > self.short_window:
+            state["short_sum"] -= closes[-self.short_window - 1]
+        if n > self.long_window:
+            state["long_sum"] -= closes[-self.long_window - 1]
+        if n < self.warmup_bars:
+            return 0
+        short_ma = state["short_sum"] / self.short_window
+        long_ma = state["long_sum"] / self.long_window
+        return 1 if short_ma > long_ma else (-1 if short_ma < long_ma else 0)
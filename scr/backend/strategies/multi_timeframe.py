@@ -0,0 +1,55 @@
+import pandas as pd
+
+class MultiTimeframeTrendStrategy:
+    """
+    Crossover de médias móveis no timeframe de execução, filtrado pela tendência
+    de um timeframe superior (fechamento acima da média de `trend_window` barras).
+    """
+    def __init__(self, short_window=10, long_window=30, trend_interval="1d", trend_window=50):
+        self.short_window = short_window
+        self.long_window = long_window
+        self.trend_interval = trend_interval
+        self.trend_window = trend_window
+
+    @property
+    def warmup_bars(self):
+        return max(self.short_window, self.long_window)
+
+    @property
+    def required_columns(self):
+        """Colunas dos dados usadas pela estratégia (o resto não precisa ser carregado)."""
+        return ["close"]
+
+    @property
+    def required_indicators(self):
+        """Médias do timeframe de execução lidas do IndicatorCache."""
+        return [("sma", "close", self.short_window), ("sma", "close", self.long_window)]
+
+    @property
+    def higher_timeframes(self):
+        """Timeframes superiores necessários e respectivas barras de aquecimento."""
+        return {self.trend_interval: self.trend_window}
+
+    def generate_signals(self, data, indicators=None, higher_timeframes=None):
+        """
+        Compra (1) quando a média curta está acima da longa E o timeframe superior está
+        em tendência de alta; vende (-1) quando a média curta cruza abaixo ou a tendência vira.
+        """
+        signals = pd.DataFrame(index=data.index)
+        signals['price'] = data['close']
+        if indicators is not None:
+            signals['short_ma'] = indicators.sma('close', self.short_window)
+            signals['long_ma'] = indicators.sma('close', self.long_window)
+        else:
+            signals['short_ma'] = data['close'].rolling(self.short_window).mean()
+            signals['long_ma'] = data['close'].rolling(self.long_window).mean()
+
+        trend_view = higher_timeframes[self.trend_interval]
+        trend_close = trend_view.data['close']
+        trend_ma = trend_close.rolling(self.trend_window).mean()
+        signals['trend_up'] = trend_view.align(trend_close > trend_ma) == 1
+
+        signals['signal'] = 0
+        signals.loc[(signals['short_ma'] > signals['long_ma']) & signals['trend_up'], 'signal'] = 1
+        signals.loc[(signals['short_ma'] < signals['long_ma']) | ~signals['trend_up'], 'signal'] = -1
+        return signals
@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Máximo de mapas de alinhamento guardados: cada janela diferente (prefixos de
+# successive halving, janelas de um sweep) é uma entrada do tamanho dos dados
+ALIGNMENT_CACHE_SIZE = 8
+
+# Cache LRU dos mapas de alinhamento: (símbolo, intervalo de execução, intervalo superior, janelas) -> array
+_ALIGNMENT_CACHE = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def interval_to_timedelta(interval):
+    """Converte um intervalo da Binance ('15m', '4h', '1d', '1w') em pd.Timedelta."""
+    units = {"m": "min", "h": "h", "d": "D", "w": "W"}
+    n, unit = interval[:-1], interval[-1]
+    if unit not in units or not n.isdigit():
+        raise ValueError(f"Intervalo desconhecido: '{interval}'")
+    return pd.Timedelta(int(n), unit=units[unit])
+
+
+def build_alignment_map(exec_index, exec_interval, htf_index, htf_interval):
+    """
+    Mapeia cada barra do timeframe de execução para a última barra do timeframe
+    superior que já estava FECHADA no fechamento da barra de execução (sem lookahead).
+
+    Os índices são os horários de abertura das barras (como nos dados da Binance).
+    Retorna um array int64 com a posição da barra superior (-1 = nenhuma fechada ainda).
+    """
+    exec_close = (pd.DatetimeIndex(exec_index) + interval_to_timedelta(exec_interval)).values.astype("datetime64[ns]")
+    htf_close = (pd.DatetimeIndex(htf_index) + interval_to_timedelta(htf_interval)).values.astype("datetime64[ns]")
+    return np.searchsorted(htf_close, exec_close, side="right").astype(np.int64) - 1
+
+
+def get_alignment_map(symbol, exec_index, exec_interval, htf_index, htf_interval):
+    """
+    Versão em cache de build_alignment_map, por (símbolo, par de intervalos) e janela
+    dos dados; guarda só os ALIGNMENT_CACHE_SIZE mapas usados mais recentemente.
+    """
+    key = (
+        symbol, exec_interval, htf_interval,
+        len(exec_index), exec_index[0] if len(exec_index) else None, exec_index[-1] if len(exec_index) else None,
+        len(htf_index), htf_index[0] if len(htf_index) else None, htf_index[-1] if len(htf_index) else None,
+    )
+    with _CACHE_LOCK:
+        cached = _ALIGNMENT_CACHE.get(key)
+        if cached is not None:
+            _ALIGNMENT_CACHE.move_to_end(key)
+    if cached is None:
+        cached = build_alignment_map(exec_index, exec_interval, htf_index, htf_interval)
+        cached.setflags(write=False)
+        with _CACHE_LOCK:
+            _ALIGNMENT_CACHE[key] = cached
+            while len(_ALIGNMENT_CACHE) > ALIGNMENT_CACHE_SIZE:
+                _ALIGNMENT_CACHE.popitem(last=False)
+    return cached
+
+
+def clear_alignment_cache():
+    with _CACHE_LOCK:
+        _ALIGNMENT_CACHE.clear()
+
+
+class TimeframeView:
+    """
+    Dados de um timeframe superior já mapeados para o timeframe de execução.
+
+    A estratégia calcula seus indicadores sobre `data` (barras do timeframe superior)
+    e usa `align()` para trazê-los às barras de execução com um único take vetorizado,
+    sem asof/merge por barra.
+    """
+    def __init__(self, interval, data, index_map, exec_index):
+        self.interval = interval
+        self.data = data
+        self.index_map = index_map
+        self.exec_index = exec_index
+        self._aligned = None
+
+    def align(self, values):
+        """Alinha uma série/array do timeframe superior às barras de execução (NaN antes da 1ª barra fechada)."""
+        arr = np.asarray(values, dtype=float)
+        out = arr[np.maximum(self.index_map, 0)]
+        out[self.index_map < 0] = np.nan
+        return pd.Series(out, index=self.exec_index)
+
+    def prefix(self, n_rows):
+        """
+        Visão restrita às primeiras `n_rows` barras de execução, contendo apenas as
+        barras superiores já fechadas até lá (usado na detecção de lookahead).
+        """
+        index_map = self.index_map[:n_rows]
+        last = int(index_map.max()) + 1 if len(index_map) else 0
+        return TimeframeView(self.interval, self.data.iloc[:max(last, 0)], index_map, self.exec_index[:n_rows])
+
+    @property
+    def aligned(self):
+        """DataFrame com todas as colunas do timeframe superior alinhadas às barras de execução."""
+        if self._aligned is None:
+            self._aligned = pd.DataFrame(
+                {col: self.align(self.data[col]).to_numpy() for col in self.data.columns},
+                index=self.exec_index
+            )
+        return self._aligned
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 def audit_trades(trades, max_pnl_threshold=0.5, max_duration_threshold=60, verbose=True):
     """
@@ -35,11 +36,13 @@ def audit_trades(trades, max_pnl_threshold=0.5, max_duration_threshold=60, verbo
     df['high_pnl'] = df['pnl_pct'].abs() > max_pnl_threshold
 
     # FLAG 2: Trades com duração muito longa ou zero (riscos de forward/loop bias)
-    df['zero_or_short_duration'] = df['duration'] <= 0
+    # Saídas por stop na própria barra de entrada são legítimas (entrada no open, stop depois)
+    stop_exit = df['exit_reason'].isin(['stop_loss', 'trailing']) if 'exit_reason' in df.columns else False
+    df['zero_or_short_duration'] = (df['duration'] <= 0) & ~stop_exit
     df['long_duration'] = df['duration'] > max_duration_threshold
 
     # FLAG 3: Entry/Exit em sequência igual
-    df['same_entry_exit'] = df['dt_entry'] == df['dt_exit']
+    df['same_entry_exit'] = (df['dt_entry'] == df['dt_exit']) & ~stop_exit
 
     summary = {
         "total_trades": len(df),
@@ -58,6 +61,63 @@ def audit_trades(trades, max_pnl_threshold=0.5, max_duration_threshold=60, verbo
 
     return df
 
+def _sample_cut_points(n_bars, n_cuts, min_bars, seed):
+    """Sorteia pontos de corte estratificados ao longo dos dados (um por faixa)."""
+    if n_bars - 1 <= min_bars:
+        return []
+    rng = np.random.default_rng(seed)
+    edges = np.linspace(min_bars, n_bars - 1, n_cuts + 1)
+    cuts = rng.integers(edges[:-1].astype(int), np.maximum(edges[1:].astype(int), edges[:-1].astype(int) + 1))
+    return sorted(set(int(c) for c in cuts))
+
+def detect_lookahead(generate, data, full_signals=None, n_cuts=8, min_bars=50, max_workers=None, seed=0):
+    """
+    Detecta uso de dados futuros (lookahead) na geração de sinais.
+
+    Para cada ponto de corte sorteado, gera os sinais usando só o prefixo dos dados
+    (barras < corte) e compara com os sinais gerados sobre os dados completos nas
+    mesmas barras. Numa estratégia sem lookahead eles são idênticos; qualquer
+    diferença prova que o sinal de alguma barra dependeu de barras posteriores.
+
+    Args:
+        generate (callable): generate(prefix_data, n_rows) -> DataFrame com coluna 'signal'.
+        data (pd.DataFrame): Dados completos.
+        full_signals (pd.Series): Sinais sobre os dados completos (calculados se None).
+        n_cuts (int): Número de pontos de corte testados (em paralelo).
+        min_bars (int): Tamanho mínimo do prefixo testado.
+    Returns:
+        dict: resumo com lookahead_detected, cortes testados e primeira barra divergente.
+    """
+    if full_signals is None:
+        full_signals = generate(data, len(data))['signal']
+    full = full_signals.reindex(data.index).fillna(0).to_numpy()
+    cuts = _sample_cut_points(len(data), n_cuts, min_bars, seed)
+
+    def check(cut):
+        prefix_signals = generate(data.iloc[:cut], cut)['signal']
+        prefix = prefix_signals.reindex(data.index[:cut]).fillna(0).to_numpy()
+        mismatch = np.flatnonzero(prefix != full[:cut])
+        return cut, mismatch
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        outcomes = list(executor.map(check, cuts))
+
+    bad = [(cut, mismatch) for cut, mismatch in outcomes if mismatch.size > 0]
+    first_bar = min((int(m[0]) for _, m in bad), default=None)
+    detected = bool(bad)
+    return {
+        "lookahead_detected": detected,
+        "n_cuts_tested": len(cuts),
+        "cuts_with_mismatch": [str(data.index[cut - 1]) for cut, _ in bad],
+        "mismatched_bars": int(sum(m.size for _, m in bad)),
+        "first_mismatch": str(data.index[first_bar]) if first_bar is not None else None,
+        "message": (
+            f"Lookahead detectado: sinais mudam quando barras futuras são removidas ({len(bad)}/{len(cuts)} cortes)."
+            if detected else
+            f"Nenhum lookahead detectado em {len(cuts)} cortes testados."
+        ),
+    }
+
 # Exemplo rápido de uso:
 if __name__ == "__main__":
     # Simulação fictícia:
@@ -0,0 +1,204 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from backend import backtest_service, metrics
+from backend.backtest_service import load_strategy_class, run_backtest
+from backend.batch_runner import summarize_result, _json_default
+from backend.data_handlers.catalog import load_catalog
+from backend.data_handlers.file_store import atomic_write
+from backend.strategies import _base as strategy_base
+from backend.timeframes import interval_to_timedelta
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "universe_cache")
+# Histórico mínimo (barras dentro do período) para um símbolo/intervalo entrar no ranking
+MIN_HISTORY_BARS = 500
+# Métricas do ranking: (métrica, maior é melhor)
+RANK_METRICS = [("sharpe_ratio", True), ("cagr_pct", True), ("max_drawdown_pct", False)]
+
+
+def _window_bars(entry, start_date=None, end_date=None):
+    """Estimativa (pelo catálogo, sem abrir o CSV) de quantas barras o dataset tem no período."""
+    if not entry["rows"]:
+        return 0
+    first, last = pd.Timestamp(entry["first"]), pd.Timestamp(entry["last"])
+    begin = max(first, pd.Timestamp(start_date)) if start_date is not None else first
+    end = min(last, pd.Timestamp(end_date)) if end_date is not None else last
+    if end < begin:
+        return 0
+    try:
+        step = interval_to_timedelta(entry["interval"])
+    except ValueError:
+        return entry["rows"]
+    # Lacunas já descontadas quando o período é o histórico inteiro
+    return min(entry["rows"], int((end - begin) / step) + 1)
+
+
+@functools.lru_cache(maxsize=None)
+def _engine_source_hash():
+    """Hash do código do motor e das métricas: mudanças nele invalidam o cache."""
+    source = "".join(inspect.getsource(m) for m in (backtest_service, metrics, strategy_base))
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def _cache_key(entry, strategy_name, strategy_params, start_date, end_date, initial_balance, fee_pct):
+    """
+    Chave das métricas em cache: checksum do dataset (catálogo) + código da estratégia
+    e do motor + parâmetros do backtest. Dados, estratégia ou motor alterados geram
+    outra chave.
+    """
+    StrategyClass = load_strategy_class(strategy_name)
+    source = inspect.getsource(inspect.getmodule(StrategyClass))
+    payload = json.dumps({
+        "dataset": entry["sha256"],
+        "strategy": strategy_name,
+        "strategy_source": hashlib.sha1(source.encode()).hexdigest(),
+        "engine_source": _engine_source_hash(),
+        "params": strategy_params or {},
+        "symbol": entry["symbol"],
+        "interval": entry["interval"],
+        "start_date": start_date,
+        "end_date": end_date,
+        "initial_balance": initial_balance,
+        "fee_pct": fee_pct,
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _read_cache(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_cache(cache_dir, key, metrics):
+    os.makedirs(cache_dir, exist_ok=True)
+    with atomic_write(os.path.join(cache_dir, f"{key}.json"), encoding="utf-8") as f:
+        json.dump(metrics, f, default=_json_default)
+
+
+def _scan_dataset(strategy_name, strategy_params, symbol, interval, start_date, end_date, initial_balance, fee_pct):
+    """Backtest de um símbolo/intervalo (no processo worker) -> métricas escalares."""
+    result = run_backtest(
+        strategy_name, interval, symbol=symbol, start_date=start_date, end_date=end_date,
+        initial_balance=initial_balance, strategy_params=strategy_params, fee_pct=fee_pct, lookahead_checks=0
+    )
+    return summarize_result(result)
+
+
+def rank_results(rows):
+    """
+    Ranking dos resultados: posição em cada métrica de RANK_METRICS (1 = melhor) e a
+    média dessas posições (`score`, menor é melhor). Métricas 'N/D' ficam por último.
+    """
+    df = pd.DataFrame([r for r in rows if "error" not in r])
+    if df.empty:
+        return df
+    rank_cols = []
+    for metric, higher_is_better in RANK_METRICS:
+        values = pd.to_numeric(df.get(metric), errors="coerce")
+        df[f"{metric}_rank"] = values.rank(ascending=not higher_is_better, method="min", na_option="bottom")
+        rank_cols.append(f"{metric}_rank")
+    df["score"] = df[rank_cols].mean(axis=1)
+    return df.sort_values(["score", f"{RANK_METRICS[0][0]}_rank"]).reset_index(drop=True)
+
+
+def iter_universe_scan(
+    strategy_name,
+    strategy_params=None,
+    intervals=None,
+    symbols=None,
+    start_date=None,
+    end_date=None,
+    initial_balance=10000,
+    fee_pct=0.001,
+    min_bars=MIN_HISTORY_BARS,
+    workers=None,
+    use_cache=True,
+    cache_dir=CACHE_DIR
+):
+    """
+    Roda a estratégia sobre todos os símbolos/intervalos do armazenamento local e
+    entrega o ranking parcial à medida que cada backtest termina.
+
+    Os datasets vêm do catálogo (sem abrir os CSVs); os com menos de `min_bars` barras
+    no período são pulados. Os backtests vão para um pool de processos, dos maiores
+    datasets para os menores (os mais longos não ficam para o fim). Métricas de
+    datasets e estratégia inalterados (mesmo checksum/código/parâmetros) vêm do cache
+    em `cache_dir`, sem rodar de novo.
+
+    Yields:
+        (entry, ranking): entry = {symbol, interval, bars, status ('ok', 'cached',
+        'skipped' ou 'error'), métricas...}; ranking = DataFrame (ver rank_results)
+        com todos os resultados até agora.
+    """
+    if load_strategy_class(strategy_name) is None:
+        raise ValueError(f"Estratégia '{strategy_name}' não encontrada.")
+    datasets = [
+        e for e in load_catalog().values()
+        if (intervals is None or e["interval"] in intervals) and (symbols is None or e["symbol"] in symbols)
+    ]
+    tasks = []
+    rows = []
+    for entry in datasets:
+        bars = _window_bars(entry, start_date, end_date)
+        base = {"symbol": entry["symbol"], "interval": entry["interval"], "bars": bars}
+        if bars < min_bars:
+            yield {**base, "status": "skipped"}, rank_results(rows)
+            continue
+        key = _cache_key(entry, strategy_name, strategy_params, start_date, end_date, initial_balance, fee_pct)
+        cached = _read_cache(cache_dir, key) if use_cache else None
+        if cached is not None:
+            rows.append({**base, **cached})
+            yield {**base, **cached, "status": "cached"}, rank_results(rows)
+            continue
+        tasks.append((bars, key, base))
+    if not tasks:
+        return
+
+    # Maiores primeiro: o pool pega as tarefas na ordem em que foram submetidas
+    tasks.sort(key=lambda t: t[0], reverse=True)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(_scan_dataset, strategy_name, strategy_params, base["symbol"], base["interval"],
+                            start_date, end_date, initial_balance, fee_pct): (key, base)
+            for _, key, base in tasks
+        }
+        for future in as_completed(futures):
+            key, base = futures[future]
+            try:
+                metrics = future.result()
+            except Exception as e:
+                metrics = {"error": str(e)}
+            if "error" in metrics:
+                yield {**base, **metrics, "status": "error"}, rank_results(rows)
+                continue
+            if use_cache:
+                _write_cache(cache_dir, key, metrics)
+            rows.append({**base, **metrics})
+            yield {**base, **metrics, "status": "ok"}, rank_results(rows)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def scan_universe(strategy_name, strategy_params=None, verbose=True, **kwargs):
+    """
+    Versão bloqueante de iter_universe_scan: retorna o ranking final (DataFrame) e
+    a lista de datasets pulados ou com erro.
+    """
+    ranking = pd.DataFrame()
+    excluded = []
+    for entry, ranking in iter_universe_scan(strategy_name, strategy_params, **kwargs):
+        if entry["status"] in ("skipped", "error"):
+            excluded.append(entry)
+        if verbose:
+            detail = entry.get("error") or (f"{entry['bars']} barras" if entry["status"] == "skipped"
+                                            else f"Sharpe {entry.get('sharpe_ratio')} | CAGR {entry.get('cagr_pct')}%")
+            print(f"[{entry['status']}] {entry['symbol']} {entry['interval']}: {detail}")
+    return ranking, excluded
@@ -3,12 +3,16 @@ import plotly.express as px
 import pandas as pd
 from plotly.subplots import make_subplots
 import numpy as np
-import matplotlib.pyplot as plt
+
+# Séries com mais pontos que isso usam traces WebGL (Scattergl)
+WEBGL_THRESHOLD = 2000
+HEATMAP_TYPES = ['pnl', 'win', 'drawdown', 'bestworst']
 
 def plot_results(results):
     """
     Plota os resultados do backtest (versão Matplotlib para compatibilidade)
     """
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 6))
     
     # Preço e médias móveis
@@ -28,30 +32,78 @@ def plot_results(results):
     plt.savefig('data/backtest_plot.png')
     plt.show()
 
-def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
+def _series_trace(y, name, **kwargs):
     """
-    Plota resultados do backtest de forma interativa usando Plotly,
-    com linha do equity curve, médias, retorno acumulado e um heatmap customizável.
+    Trace de linha para uma série: Scattergl (WebGL) acima de WEBGL_THRESHOLD pontos.
+    Os valores vão como array NumPy, que o Plotly (>= 6) serializa como array binário
+    tipado em base64 em vez de uma lista JSON de números.
+    """
+    y = np.asarray(y, dtype=float)
+    trace_cls = go.Scattergl if len(y) > WEBGL_THRESHOLD else go.Scatter
+    return trace_cls(y=y, mode='lines', name=name, **kwargs)
 
-    Args:
-        results (dict): Resultado do backtest.
-        trades (list[dict]): Lista de trades (result['trades']). Opcional (pega do results).
-        heatmap_type (str): Tipo de heatmap: 'pnl', 'win', 'drawdown', 'bestworst'.
+def compute_heatmap_aggregates(results, trades=None, top_n=10):
+    """
+    Pré-calcula, de uma vez e vetorizado, os dados dos quatro heatmaps.
+
+    Os trades são agrupados pelo dia de entrada com np.unique + np.bincount
+    (sem groupby por tipo de heatmap).
+
+    Returns:
+        dict heatmap_type -> DataFrame com colunas 'date' e 'value'
+        ('bestworst' tem também 'is_best' e 'is_worst'); None quando não há dados.
+    """
+    aggregates = dict.fromkeys(HEATMAP_TYPES)
+    trades = trades or results.get('trades', [])
+    if trades:
+        entries = pd.to_datetime(pd.Series([t.get('dt_entry') for t in trades]), errors='coerce')
+        pnls = np.array([t.get('pnl', np.nan) for t in trades], dtype=float)
+        valid = entries.notna().to_numpy() & ~np.isnan(pnls)
+        if valid.any():
+            days = entries[valid].to_numpy().astype('datetime64[D]')
+            pnls = pnls[valid]
+            unique_days, inverse = np.unique(days, return_inverse=True)
+            counts = np.bincount(inverse)
+            daily_pnl = np.bincount(inverse, weights=pnls)
+            win_rate = np.bincount(inverse, weights=(pnls > 0).astype(float)) / counts
+            dates = pd.to_datetime(unique_days).date
+            aggregates['pnl'] = pd.DataFrame({'date': dates, 'value': daily_pnl})
+            aggregates['win'] = pd.DataFrame({'date': dates, 'value': win_rate})
+
+            order = np.argsort(daily_pnl, kind='stable')
+            is_worst = np.zeros(len(daily_pnl), dtype=bool)
+            is_best = np.zeros(len(daily_pnl), dtype=bool)
+            is_worst[order[:top_n]] = True
+            is_best[order[::-1][:top_n]] = True
+            aggregates['bestworst'] = pd.DataFrame({
+                'date': dates, 'value': daily_pnl, 'is_best': is_best, 'is_worst': is_worst
+            })
+
+    dd_curve = results.get('drawdown_curve')
+    if dd_curve is not None and len(dd_curve):
+        dd_curve = np.asarray(dd_curve, dtype=float)
+        if 'price' in results and hasattr(results['price'], 'index'):
+            dates = results['price'].index
+        else:
+            dates = np.arange(len(dd_curve))
+        aggregates['drawdown'] = pd.DataFrame({'date': dates, 'value': dd_curve})
+    return aggregates
+
+HEATMAP_LABELS = {
+    'pnl': ("PnL diário", "Data: %{x}<br>PnL: %{z:,.2f}"),
+    'win': ("Taxa de acerto diário (1=win, 0=loss)", "Data: %{x}<br>Win-rate: %{z:.2%}"),
+    'drawdown': ("Drawdown diário", "Data: %{x}<br>Drawdown: %{z:.2%}"),
+    'bestworst': ("Top 10 melhores/piores dias (PnL)", "Data: %{x}<br>PnL: %{z:,.2f}"),
+}
+
+def build_results_figure(results, trades=None, heatmap_type='pnl', aggregates=None, title=None):
+    """
+    Monta a figura interativa do backtest (equity curve, preço, médias e heatmap),
+    sem gravar nem exibir. `aggregates` (de compute_heatmap_aggregates) evita
+    recalcular os agrupamentos quando a mesma execução gera vários relatórios.
     """
     # --- Prepara dados principais ---
-    df = pd.DataFrame({
-        'Equity': results.get('cumulative_return', []),
-    })
-    if 'price' in results:
-        df['price'] = results['price']
-    if 'short_ma' in results:
-        df['Short MA'] = results['short_ma']
-    if 'long_ma' in results:
-        df['Long MA'] = results['long_ma']
-    # Tenta adicionar datas, se estiverem no índice ou como coluna
-    if isinstance(results.get('price'), (pd.Series, pd.DataFrame)):
-        if hasattr(results['price'], 'index'):
-            df.index = results['price'].index
+    equity = results.get('cumulative_return', results.get('equity_curve', []))
 
     # --- Layout com subplot para heatmap abaixo ---
     fig = make_subplots(
@@ -63,81 +115,28 @@ def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
     )
 
     # === Linha principal do topo: Equity curve, preço e médias ===
-    fig.add_trace(go.Scatter(
-        y=df['Equity'], mode='lines', name='Equity Curve',
-        hoverinfo='x+y'
-    ), row=1, col=1)
-    if 'price' in df:
-        fig.add_trace(go.Scatter(
-            y=df['price'], mode='lines', name='Preço',
-            line=dict(dash='dot'), opacity=0.6
-        ), row=1, col=1)
-    if 'Short MA' in df:
-        fig.add_trace(go.Scatter(
-            y=df['Short MA'], mode='lines', name='Média Curta',
-            line=dict(dash='dash'), opacity=0.8
-        ), row=1, col=1)
-    if 'Long MA' in df:
-        fig.add_trace(go.Scatter(
-            y=df['Long MA'], mode='lines', name='Média Longa',
-            line=dict(dash='dot'), opacity=0.8
-        ), row=1, col=1)
+    fig.add_trace(_series_trace(equity, 'Equity Curve', hoverinfo='x+y'), row=1, col=1)
+    if 'price' in results:
+        fig.add_trace(_series_trace(results['price'], 'Preço', line=dict(dash='dot'), opacity=0.6), row=1, col=1)
+    if 'short_ma' in results:
+        fig.add_trace(_series_trace(results['short_ma'], 'Média Curta', line=dict(dash='dash'), opacity=0.8), row=1, col=1)
+    if 'long_ma' in results:
+        fig.add_trace(_series_trace(results['long_ma'], 'Média Longa', line=dict(dash='dot'), opacity=0.8), row=1, col=1)
+
+    n_lines = len(fig.data)
+
+    # --- Heatmap (agregados pré-calculados) ---
+    if aggregates is None:
+        aggregates = compute_heatmap_aggregates(results, trades)
+    heatmap_df = aggregates.get(heatmap_type)
+    heatmap_title, hovertemplate = HEATMAP_LABELS.get(heatmap_type, ("", None))
 
-    # --- Prepara dados para HEATMAP ---
-    trades = trades or results.get('trades', [])
-    df_trades = pd.DataFrame(trades) if trades else pd.DataFrame()
-    if not df_trades.empty:
-        # Garantir que existam colunas pasta each heatmap, e o dt_entry seja datetime
-        if 'dt_entry' in df_trades.columns and not pd.api.types.is_datetime64_any_dtype(df_trades['dt_entry']):
-            df_trades['dt_entry'] = pd.to_datetime(df_trades['dt_entry'], errors='coerce')
-            df_trades['date'] = df_trades['dt_entry'].dt.date
-    
-    heatmap_df = None
-    heatmap_title = ""
-    hovertemplate = None
-
-    # -- PnL por data (HEATMAP_TYPE = 'pnl') --
-    if heatmap_type == 'pnl' and not df_trades.empty and 'pnl' in df_trades.columns:
-        grp = df_trades.groupby('date').agg({'pnl': 'sum'})
-        heatmap_df = grp.reset_index()
-        heatmap_title = "PnL diário"
-        hovertemplate = "Data: %{x}<br>PnL: %{z:,.2f}"
-    # -- Acertos/erros (HEATMAP_TYPE = 'win') --
-    elif heatmap_type == 'win' and not df_trades.empty and 'pnl' in df_trades.columns:
-        df_trades['is_win'] = df_trades['pnl'] > 0
-        grp = df_trades.groupby('date')['is_win'].mean()
-        heatmap_df = grp.reset_index()
-        heatmap_title = "Taxa de acerto diário (1=win, 0=loss)"
-        hovertemplate = "Data: %{x}<br>Win-rate: %{z:.2%}"
-    # -- Drawdown por data (HEATMAP_TYPE = 'drawdown') --
-    elif heatmap_type == 'drawdown' and 'drawdown_curve' in results:
-        # Para cada dia/índice, mostra drawdown
-        dd_curve = results['drawdown_curve']
-        dates = None
-        if 'price' in results and hasattr(results['price'], 'index'):
-            dates = results['price'].index
-        else:
-            dates = list(range(len(dd_curve)))
-        heatmap_df = pd.DataFrame({'date': dates, 'drawdown': dd_curve})
-        heatmap_title = "Drawdown diário"
-        hovertemplate = "Data: %{x}<br>Drawdown: %{z:.2%}"
-    # -- Melhores/piores dias (HEATMAP_TYPE = 'bestworst') --
-    elif heatmap_type == 'bestworst' and not df_trades.empty and 'pnl' in df_trades.columns:
-        grp = df_trades.groupby('date').agg({'pnl': 'sum'})
-        # Colore forte os top 10 e bottom 10
-        heatmap_df = grp.reset_index()
-        heatmap_df['is_best'] = heatmap_df['pnl'].rank(ascending=False) <= 10
-        heatmap_df['is_worst'] = heatmap_df['pnl'].rank(ascending=True) <= 10
-        heatmap_title = "Top 10 melhores/piores dias (PnL)"
-        hovertemplate = "Data: %{x}<br>PnL: %{z:,.2f}"
-
-    # --- Heatmap rendering ---
     if heatmap_df is not None and not heatmap_df.empty:
         # Heatmap 1D: datas x valor
         fig.add_trace(go.Heatmap(
-            x=heatmap_df[heatmap_df.columns[0]],
+            x=heatmap_df['date'],
             y=[""] * heatmap_df.shape[0],
-            z=heatmap_df[heatmap_df.columns[-2]] if heatmap_type in ['pnl', 'drawdown', 'win'] else heatmap_df['pnl'],
+            z=heatmap_df['value'].to_numpy(),
             colorscale="YlGnBu" if heatmap_type != 'bestworst' else [[0, "crimson"], [0.5, "white"], [1, "darkgreen"]],
             colorbar=dict(title=heatmap_title),
             showscale=True,
@@ -147,7 +146,7 @@ def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
         if heatmap_type == 'bestworst':
             fig.add_trace(go.Scatter(
                 x=heatmap_df.loc[heatmap_df['is_best'], 'date'],
-                y=[""] * heatmap_df['is_best'].sum(),
+                y=[""] * int(heatmap_df['is_best'].sum()),
                 mode='markers',
                 marker=dict(size=14, color='green', symbol='star', line=dict(width=2, color='black')),
                 name='TOP 10',
@@ -156,7 +155,7 @@ def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
             ), row=2, col=1)
             fig.add_trace(go.Scatter(
                 x=heatmap_df.loc[heatmap_df['is_worst'], 'date'],
-                y=[""] * heatmap_df['is_worst'].sum(),
+                y=[""] * int(heatmap_df['is_worst'].sum()),
                 mode='markers',
                 marker=dict(size=14, color='red', symbol='star', line=dict(width=2, color='black')),
                 name='WORST 10',
@@ -173,7 +172,7 @@ def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
     # --- Layout e interação ---
     fig.update_layout(
         height=750,
-        title="Resultados do Backtest — Interativo",
+        title=title or "Resultados do Backtest — Interativo",
         legend_title_text="Séries",
         hovermode='x unified',
         updatemenus=[
@@ -187,7 +186,7 @@ def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
                 y=1.15,
                 yanchor="top",
                 buttons=list([
-                    {"label": "Heatmap: PnL", "method": "update", "args": [{"visible": [True, True, True, True, True]}, {"annotations": [{"text": "PnL diário"}]}], "args2": []},
+                    {"label": f"Heatmap: {heatmap_type}", "method": "update", "args": [{"visible": [True] * len(fig.data)}, {"annotations": [{"text": heatmap_title}]}], "args2": []},
                 ])
             ),
             dict(
@@ -203,7 +202,7 @@ def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
                         method='update'
                     ),
                     dict(
-                        args=[{'visible': [True, True, True, False, False, False]}],
+                        args=[{'visible': [True] * n_lines + [False] * (len(fig.data) - n_lines)}],
                         label='Apenas Equity/Preço/MAs',
                         method='update'
                     ),
@@ -211,7 +210,24 @@ def plot_results_plotly(results, trades=None, heatmap_type='pnl'):
             )
         ]
     )
-    
-    # Salvar como HTML interativo e mostrar
-    fig.write_html('data/backtest_interactive.html')
-    fig.show()
+    return fig
+
+def plot_results_plotly(results, trades=None, heatmap_type='pnl', output_path='data/backtest_interactive.html', show=True):
+    """
+    Plota resultados do backtest de forma interativa usando Plotly,
+    com linha do equity curve, médias, retorno acumulado e um heatmap customizável.
+
+    Args:
+        results (dict): Resultado do backtest.
+        trades (list[dict]): Lista de trades (result['trades']). Opcional (pega do results).
+        heatmap_type (str): Tipo de heatmap: 'pnl', 'win', 'drawdown', 'bestworst'.
+        output_path (str): HTML de saída (None = não grava).
+        show (bool): Abre a figura no navegador. Para muitos relatórios sem interface,
+            use backend.report_batch.generate_reports.
+    """
+    fig = build_results_figure(results, trades, heatmap_type)
+    if output_path:
+        fig.write_html(output_path)
+    if show:
+        fig.show()
+    return fig
@@ -4,10 +4,11 @@ import os
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QStackedWidget,
     QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, 
-    QLineEdit, QMessageBox, QFrame, QDateEdit, QSizePolicy, QScrollArea
+    QLineEdit, QMessageBox, QFrame, QDateEdit, QSizePolicy, QScrollArea,
+    QTableWidget, QTableWidgetItem, QAbstractItemView, QHeaderView, QSpinBox, QGridLayout
 )
-from PySide6.QtCore import Qt, Signal, Slot, QDate
-from PySide6.QtGui import QIcon, QFont
+from PySide6.QtCore import Qt, Signal, Slot, QDate, QThread
+from PySide6.QtGui import QIcon, QFont, QColor
 
 # Gráficos
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
@@ -16,8 +17,37 @@ import matplotlib.pyplot as plt
 # --- Configuração de caminhos para importação do backend ---
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.backtest_service import run_backtest, get_available_strategies, get_available_intervals
+from backend.backtest_service import (
+    run_backtest, get_available_strategies, get_available_intervals, get_available_data, get_data_range
+)
 from backend.data_handlers.binance_data import BinanceDataHandler
+from backend.run_archive import save_run, load_run, list_runs, delete_run
+from backend.optimizer import iter_grid_sweep
+
+# Símbolos oferecidos para download além dos que já têm dados locais
+DEFAULT_SYMBOLS = [
+    "BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "ADAUSDT",
+    "MATICUSDT", "XRPUSDT", "DOTUSDT", "DOGEUSDT", "LTCUSDT"
+]
+
+def _catalog_symbols():
+    """Símbolos com dados locais (catálogo) primeiro, depois os demais para download."""
+    stored = list(get_available_data())
+    return stored + [s for s in DEFAULT_SYMBOLS if s not in stored]
+
+def _apply_data_range(date_edit, symbol, interval):
+    """
+    Limita o seletor de data ao período disponível no catálogo para o símbolo/intervalo.
+    Retorna False (e remove os limites) se não houver dados locais.
+    """
+    data_range = get_data_range(symbol, interval)
+    if data_range is None:
+        date_edit.clearMinimumDate()
+        date_edit.clearMaximumDate()
+        return False
+    first, last = data_range
+    date_edit.setDateRange(QDate(first.year, first.month, first.day), QDate(last.year, last.month, last.day))
+    return True
 
 class SidebarButton(QPushButton):
     """Botão personalizado para a barra lateral"""
@@ -74,11 +104,19 @@ class Sidebar(QWidget):
         self.resultsBtn = SidebarButton("Resultados")
         self.resultsBtn.clicked.connect(lambda: self.changePage(1))
         
+        self.historyBtn = SidebarButton("Histórico")
+        self.historyBtn.clicked.connect(lambda: self.changePage(2))
+        
+        self.optimizationBtn = SidebarButton("Otimização")
+        self.optimizationBtn.clicked.connect(lambda: self.changePage(3))
+        
         self.settingsBtn = SidebarButton("Configurações")
-        self.settingsBtn.clicked.connect(lambda: self.changePage(2))
+        self.settingsBtn.clicked.connect(lambda: self.changePage(4))
         
         layout.addWidget(self.homeBtn)
         layout.addWidget(self.resultsBtn)
+        layout.addWidget(self.historyBtn)
+        layout.addWidget(self.optimizationBtn)
         layout.addWidget(self.settingsBtn)
         layout.addStretch()
         
@@ -86,7 +124,7 @@ class Sidebar(QWidget):
         self.helpBtn.clicked.connect(self.showHelp)
         layout.addWidget(self.helpBtn)
         self.setLayout(layout)
-        self.buttons = [self.homeBtn, self.resultsBtn, self.settingsBtn]
+        self.buttons = [self.homeBtn, self.resultsBtn, self.historyBtn, self.optimizationBtn, self.settingsBtn]
     
     def changePage(self, index):
         for i, btn in enumerate(self.buttons):
@@ -130,13 +168,11 @@ class HomeWidget(QWidget):
         self.intervals = get_available_intervals()
         self.interval_cb = QComboBox()
         self.interval_cb.addItems(self.intervals)
+        self.interval_cb.currentTextChanged.connect(self.update_date_range)
         layout.addWidget(QLabel("Intervalo:"))
         layout.addWidget(self.interval_cb)
         
-        self.symbols = [
-            "BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "ADAUSDT",
-            "MATICUSDT", "XRPUSDT", "DOTUSDT", "DOGEUSDT", "LTCUSDT"
-        ]
+        self.symbols = _catalog_symbols()
         self.symbol_cb = QComboBox()
         self.symbol_cb.addItems(self.symbols)
         self.symbol_cb.currentTextChanged.connect(self.check_symbol_data)
@@ -146,6 +182,7 @@ class HomeWidget(QWidget):
         self.start_date_edit = QDateEdit()
         self.start_date_edit.setCalendarPopup(True)
         self.start_date_edit.setDate(QDate(2020, 1, 1))
+        self.update_date_range()
         layout.addWidget(QLabel("Data inicial:"))
         layout.addWidget(self.start_date_edit)
         
@@ -214,9 +251,16 @@ class HomeWidget(QWidget):
         else:
             self.params_frame.setVisible(False)
             
+    def update_date_range(self, *_):
+        """Ajusta o seletor de data ao período dos dados locais do símbolo/intervalo atual."""
+        return _apply_data_range(self.start_date_edit, self.symbol_cb.currentText(), self.interval_cb.currentText())
+
     def check_symbol_data(self, symbol):
         if not symbol:
             return
+        # O catálogo responde sem abrir os CSVs; só pergunta se não houver dados locais
+        if self.update_date_range():
+            return
         interval = self.interval_cb.currentText()
         qdate = self.start_date_edit.date()
         months = [
@@ -224,23 +268,23 @@ class HomeWidget(QWidget):
             "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
         ]
         start_date = f"{qdate.day()} {months[qdate.month()-1]} {qdate.year()}"
-        if symbol == "SOLUSDT":
-            resp = QMessageBox.question(
-                self,
-                "Dados não encontrados",
-                f"Não há dados históricos para {symbol} no intervalo {interval}.\nDeseja baixar agora?",
-                QMessageBox.Yes | QMessageBox.No
-            )
-            if resp == QMessageBox.Yes:
-                self.result_label.setText("<span style='color:blue;'>Baixando dados históricos. Aguarde alguns instantes...</span>")
-                self.repaint()
-                try:
-                    handler = BinanceDataHandler()
-                    handler.download_all_intervals(symbol=symbol, intervals=[interval], start_date=start_date)
-                    self.result_label.setText("<span style='color:green;'>Download concluído! Você já pode executar o backtest.</span>")
-                except Exception as e:
-                    QMessageBox.critical(self, "Erro", f"Erro ao baixar os dados: {str(e)}")
-                    self.result_label.setText("")
+        resp = QMessageBox.question(
+            self,
+            "Dados não encontrados",
+            f"Não há dados históricos para {symbol} no intervalo {interval}.\nDeseja baixar agora?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if resp == QMessageBox.Yes:
+            self.result_label.setText("<span style='color:blue;'>Baixando dados históricos. Aguarde alguns instantes...</span>")
+            self.repaint()
+            try:
+                handler = BinanceDataHandler()
+                handler.download_all_intervals(symbol=symbol, intervals=[interval], start_date=start_date)
+                self.update_date_range()
+                self.result_label.setText("<span style='color:green;'>Download concluído! Você já pode executar o backtest.</span>")
+            except Exception as e:
+                QMessageBox.critical(self, "Erro", f"Erro ao baixar os dados: {str(e)}")
+                self.result_label.setText("")
 
     def run_backtest(self):
         strategy = self.strategy_cb.currentText()
@@ -295,6 +339,7 @@ class HomeWidget(QWidget):
                     try:
                         handler = BinanceDataHandler()
                         handler.download_all_intervals(symbol=symbol, intervals=[interval], start_date=start_date)
+                        self.update_date_range()
                         self.result_label.setText("<span style='color:green;'>Download concluído! Executando o backtest...</span>")
                         self.repaint()
                         result = run_backtest(
@@ -327,6 +372,11 @@ class HomeWidget(QWidget):
                 <b>Sharpe Ratio:</b> {res['sharpe_ratio']}<br>
                 '''
                 self.result_label.setText(html)
+                # Salva a execução no histórico (página Histórico)
+                try:
+                    res["run_id"] = save_run(res)
+                except Exception as e:
+                    print(f"Erro ao salvar execução no histórico: {str(e)}")
                 # Integração com ResultsWidget e navegação
                 if self.parentWindow:
                     self.parentWindow.latest_result = res
@@ -394,8 +444,14 @@ class ResultsWidget(QWidget):
             <li><b>Profit Factor:</b> {result['profit_factor']}</li>
             <li><b>Tempo médio em posição:</b> {result['mean_trade_duration']:.2f} períodos</li>
             <li><b>Volatilidade anualizada:</b> {result['volatility_pct']}%</li>
+            <li><b>Sortino Ratio:</b> {result['sortino_ratio']}</li>
+            <li><b>Calmar Ratio:</b> {result['calmar_ratio']}</li>
+            <li><b>Ulcer Index:</b> {result['ulcer_index']}</li>
+            <li><b>Tempo em exposição:</b> {result['exposure_time_pct']}%</li>
         </ul>
         <h3>🏁 Benchmark Buy&Hold: {result['benchmark']['total_return']:.2f} ({result['benchmark']['total_return_pct']:.2f}%)</h3>
+        <p><b>Auditoria:</b> {result['trade_audit']['audit_message']}
+        {result['trade_audit'].get('lookahead', {}).get('message', '')}</p>
         """
         self.metrics_label.setText(metrics)
         # Gráfico 1: Equity Curve + Benchmark
@@ -442,6 +498,407 @@ class ResultsWidget(QWidget):
         canvas.updateGeometry()
         self.graphs_area.addWidget(canvas)
 
+class HistoryWidget(QWidget):
+    """Página de histórico: execuções salvas, abertas sem refazer o backtest"""
+    COLUMNS = [
+        ("created", "Data"), ("strategy", "Estratégia"), ("symbol", "Símbolo"), ("interval", "Intervalo"),
+        ("strategy_params", "Parâmetros"), ("total_return_pct", "Retorno (%)"), ("sharpe_ratio", "Sharpe"),
+        ("max_drawdown_pct", "Max DD (%)"), ("n_trades", "Trades"),
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parentWindow = parent
+        self.runs = []
+        layout = QVBoxLayout()
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        title = QLabel("Histórico de Execuções")
+        title.setStyleSheet("font-size: 24px; font-weight: bold;")
+        layout.addWidget(title)
+        layout.addWidget(QLabel("Selecione uma execução para abrir, ou várias para comparar."))
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels([label for _, label in self.COLUMNS])
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.doubleClicked.connect(self.open_selected)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        for text, slot in [("Atualizar", self.refresh), ("Abrir", self.open_selected),
+                           ("Comparar", self.compare_selected), ("Excluir", self.delete_selected)]:
+            btn = QPushButton(text)
+            btn.clicked.connect(slot)
+            buttons.addWidget(btn)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+
+        self.compare_area = QVBoxLayout()
+        layout.addLayout(self.compare_area)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        self.runs = list_runs()
+        self.table.setRowCount(len(self.runs))
+        for row, run in enumerate(self.runs):
+            for col, (key, _) in enumerate(self.COLUMNS):
+                value = run.get(key)
+                if isinstance(value, dict):
+                    value = ", ".join(f"{k}={v}" for k, v in value.items())
+                self.table.setItem(row, col, QTableWidgetItem("" if value is None else str(value)))
+
+    def selected_run_ids(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()})
+        return [self.runs[row]["run_id"] for row in rows]
+
+    def open_selected(self):
+        run_ids = self.selected_run_ids()
+        if not run_ids:
+            return
+        result = load_run(run_ids[0])
+        if "error" in result:
+            QMessageBox.warning(self, "Erro", result["error"])
+            return
+        if self.parentWindow:
+            self.parentWindow.latest_result = result
+            self.parentWindow.results_page.set_results(result)
+            self.parentWindow.change_page(1)
+
+    def compare_selected(self):
+        run_ids = self.selected_run_ids()
+        if len(run_ids) < 2:
+            QMessageBox.information(self, "Comparar", "Selecione pelo menos duas execuções.")
+            return
+        while self.compare_area.count():
+            widget = self.compare_area.takeAt(0).widget()
+            if widget:
+                widget.setParent(None)
+                widget.deleteLater()
+        fig, ax = plt.subplots(figsize=(7, 3))
+        rows = []
+        for run_id in run_ids:
+            result = load_run(run_id)
+            if "error" in result:
+                continue
+            params = ", ".join(f"{k}={v}" for k, v in result.get("strategy_params", {}).items())
+            label = f"{result['strategy']} {result['symbol']} {result['interval']} {params}".strip()
+            ax.plot(result["equity_curve"], label=label)
+            rows.append(
+                f"<tr><td>{label}</td><td>{result['total_return_pct']:.2f}%</td>"
+                f"<td>{result['sharpe_ratio']}</td><td>{result['max_drawdown_pct']:.2f}%</td><td>{result['n_trades']}</td></tr>"
+            )
+        ax.set_title("Comparação de Equity Curves")
+        ax.set_xlabel("Período")
+        ax.set_ylabel("Saldo")
+        ax.legend(fontsize=7)
+        canvas = FigureCanvas(fig)
+        canvas.setMinimumHeight(300)
+        self.compare_area.addWidget(canvas)
+        summary = QLabel(
+            "<table cellpadding='4'><tr><th>Execução</th><th>Retorno</th><th>Sharpe</th><th>Max DD</th><th>Trades</th></tr>"
+            + "".join(rows) + "</table>"
+        )
+        summary.setTextFormat(Qt.RichText)
+        self.compare_area.addWidget(summary)
+
+    def delete_selected(self):
+        run_ids = self.selected_run_ids()
+        if not run_ids:
+            return
+        resp = QMessageBox.question(
+            self, "Excluir", f"Excluir {len(run_ids)} execução(ões) do histórico?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if resp == QMessageBox.Yes:
+            for run_id in run_ids:
+                delete_run(run_id)
+            self.refresh()
+
+class SweepWorker(QThread):
+    """Roda a varredura de parâmetros em segundo plano e emite cada resultado ao terminar"""
+    resultReady = Signal(object, object)
+    failed = Signal(str)
+
+    def __init__(self, sweep_args, parent=None):
+        super().__init__(parent)
+        self.sweep_args = sweep_args
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            # O flag é consultado também enquanto a varredura espera resultados
+            sweep = iter_grid_sweep(**self.sweep_args, cancelled=lambda: self._cancelled)
+            for params, metrics in sweep:
+                if self._cancelled:
+                    sweep.close()
+                    break
+                self.resultReady.emit(params, metrics)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class BacktestWorker(QThread):
+    """Roda um backtest completo (run_backtest) em segundo plano e emite o resultado"""
+    resultReady = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, backtest_args, parent=None):
+        super().__init__(parent)
+        self.backtest_args = backtest_args
+
+    def run(self):
+        try:
+            self.resultReady.emit(run_backtest(**self.backtest_args))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+class OptimizationWidget(QWidget):
+    """Página de otimização: varredura curta x longa com heatmap atualizado ao vivo"""
+    # Métrica -> (rótulo, faixa fixa da escala de cor, maior é melhor)
+    METRICS = {
+        "sharpe_ratio": ("Sharpe", (-1.0, 2.0), True),
+        "total_return_pct": ("Retorno (%)", (-100.0, 1000.0), True),
+        "max_drawdown_pct": ("Max DD (%)", (0.0, 80.0), False),
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.parentWindow = parent
+        self.worker = None
+        self.cell_worker = None
+        self.sweep_args = None
+        self.n_expected = 0
+        self.results = {}
+        self.short_values = []
+        self.long_values = []
+        layout = QVBoxLayout()
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        title = QLabel("Otimização de Parâmetros")
+        title.setStyleSheet("font-size: 24px; font-weight: bold;")
+        layout.addWidget(title)
+        layout.addWidget(QLabel("Varre janela curta x janela longa da média móvel. Clique numa célula para abrir a execução."))
+
+        form = QGridLayout()
+        self.strategy_cb = QComboBox()
+        self.strategy_cb.addItems([s for s in get_available_strategies() if "MovingAverage" in s])
+        self.interval_cb = QComboBox()
+        self.interval_cb.addItems(get_available_intervals())
+        self.interval_cb.setCurrentText("4h")
+        self.symbol_cb = QComboBox()
+        self.symbol_cb.setEditable(True)
+        self.symbol_cb.addItems(_catalog_symbols())
+        self.symbol_cb.setCurrentText("BTCUSDT")
+        self.start_date_edit = QDateEdit()
+        self.start_date_edit.setCalendarPopup(True)
+        self.start_date_edit.setDate(QDate(2020, 1, 1))
+        self.update_date_range()
+        self.interval_cb.currentTextChanged.connect(self.update_date_range)
+        self.symbol_cb.currentTextChanged.connect(self.update_date_range)
+        self.fee_line = QLineEdit("0.1")
+        self.metric_cb = QComboBox()
+        for key, (label, _, _) in self.METRICS.items():
+            self.metric_cb.addItem(label, key)
+        self.metric_cb.currentIndexChanged.connect(self.redraw_all)
+        form.addWidget(QLabel("Estratégia:"), 0, 0)
+        form.addWidget(self.strategy_cb, 0, 1)
+        form.addWidget(QLabel("Intervalo:"), 0, 2)
+        form.addWidget(self.interval_cb, 0, 3)
+        form.addWidget(QLabel("Símbolo:"), 1, 0)
+        form.addWidget(self.symbol_cb, 1, 1)
+        form.addWidget(QLabel("Data inicial:"), 1, 2)
+        form.addWidget(self.start_date_edit, 1, 3)
+        form.addWidget(QLabel("Taxa (%):"), 2, 0)
+        form.addWidget(self.fee_line, 2, 1)
+        form.addWidget(QLabel("Cor por:"), 2, 2)
+        form.addWidget(self.metric_cb, 2, 3)
+
+        self.range_boxes = {}
+        for row, (name, label, defaults) in enumerate([
+            ("short", "Janela curta (mín, máx, passo):", (5, 50, 5)),
+            ("long", "Janela longa (mín, máx, passo):", (20, 200, 20)),
+        ], start=3):
+            form.addWidget(QLabel(label), row, 0)
+            boxes = []
+            for col, value in enumerate(defaults, start=1):
+                box = QSpinBox()
+                box.setRange(1, 1000)
+                box.setValue(value)
+                form.addWidget(box, row, col)
+                boxes.append(box)
+            self.range_boxes[name] = boxes
+        layout.addLayout(form)
+
+        buttons = QHBoxLayout()
+        self.start_btn = QPushButton("Iniciar varredura")
+        self.start_btn.clicked.connect(self.start_sweep)
+        self.cancel_btn = QPushButton("Cancelar")
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_sweep)
+        buttons.addWidget(self.start_btn)
+        buttons.addWidget(self.cancel_btn)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.table = QTableWidget(0, 0)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.cellClicked.connect(self.open_cell)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+    def update_date_range(self, *_):
+        _apply_data_range(self.start_date_edit, self.symbol_cb.currentText().strip().upper(), self.interval_cb.currentText())
+
+    def _range_values(self, name):
+        low, high, step = (box.value() for box in self.range_boxes[name])
+        return list(range(low, high + 1, max(1, step)))
+
+    def _start_date(self):
+        qdate = self.start_date_edit.date()
+        months = [
+            "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+            "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
+        ]
+        return f"{qdate.day()} {months[qdate.month()-1]} {qdate.year()}"
+
+    def _fee_pct(self):
+        return float(self.fee_line.text().replace(",", ".") or "0.1") / 100
+
+    def start_sweep(self):
+        if self.worker is not None and self.worker.isRunning():
+            return
+        try:
+            fee_pct = self._fee_pct()
+        except ValueError:
+            QMessageBox.warning(self, "Erro", "A taxa (fee) deve ser um número válido.")
+            return
+        self.short_values = self._range_values("short")
+        self.long_values = self._range_values("long")
+        self.results = {}
+        # Grade vazia; cada célula é preenchida quando o backtest correspondente termina
+        self.table.clear()
+        self.table.setRowCount(len(self.short_values))
+        self.table.setColumnCount(len(self.long_values))
+        self.table.setVerticalHeaderLabels([f"curta {v}" for v in self.short_values])
+        self.table.setHorizontalHeaderLabels([f"longa {v}" for v in self.long_values])
+        self.n_expected = sum(1 for s in self.short_values for l in self.long_values if s < l)
+        self.status_label.setText(f"Rodando 0/{self.n_expected} backtests...")
+
+        self.sweep_args = {
+            "strategy_name": self.strategy_cb.currentText(),
+            "interval": self.interval_cb.currentText(),
+            "param_grid": {"short_window": self.short_values, "long_window": self.long_values},
+            "symbol": self.symbol_cb.currentText().strip().upper() or "BTCUSDT",
+            "start_date": self._start_date(),
+            "fee_pct": fee_pct,
+            "constraint": _short_below_long,
+        }
+        self.worker = SweepWorker(self.sweep_args, self)
+        self.worker.resultReady.connect(self.add_result)
+        self.worker.failed.connect(lambda msg: QMessageBox.critical(self, "Erro", f"Erro na varredura: {msg}"))
+        self.worker.finished.connect(self.sweep_finished)
+        self.start_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+        self.worker.start()
+
+    def cancel_sweep(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.status_label.setText("Cancelando...")
+
+    def sweep_finished(self):
+        self.start_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+        self.status_label.setText(f"Concluído: {len(self.results)}/{self.n_expected} backtests.")
+
+    @Slot(object, object)
+    def add_result(self, params, metrics):
+        row = self.short_values.index(params["short_window"])
+        col = self.long_values.index(params["long_window"])
+        self.results[(row, col)] = (params, metrics)
+        self._draw_cell(row, col)
+        self.status_label.setText(f"Rodando {len(self.results)}/{self.n_expected} backtests...")
+
+    def redraw_all(self):
+        for row, col in self.results:
+            self._draw_cell(row, col)
+
+    def _draw_cell(self, row, col):
+        """Atualiza só a célula (texto + cor) do resultado recebido."""
+        params, metrics = self.results[(row, col)]
+        key = self.metric_cb.currentData()
+        value = metrics.get(key) if "error" not in metrics else None
+        item = self.table.item(row, col)
+        if item is None:
+            item = QTableWidgetItem()
+            item.setTextAlignment(Qt.AlignCenter)
+            self.table.setItem(row, col, item)
+        if not isinstance(value, (int, float)):
+            item.setText("erro" if "error" in metrics else "N/D")
+            item.setBackground(QColor("#DDDDDD"))
+            return
+        _, (low, high), higher_is_better = self.METRICS[key]
+        frac = min(1.0, max(0.0, (value - low) / (high - low)))
+        if not higher_is_better:
+            frac = 1.0 - frac
+        # Vermelho (pior) -> amarelo -> verde (melhor)
+        item.setBackground(QColor.fromHsvF(frac / 3, 0.6, 0.95))
+        item.setText(f"{value:.2f}")
+        item.setToolTip(f"Sharpe {metrics.get('sharpe_ratio')} | Retorno {metrics.get('total_return_pct')}% | "
+                        f"Max DD {metrics.get('max_drawdown_pct')}% | Trades {metrics.get('n_trades')}")
+
+    def open_cell(self, row, col):
+        """Refaz o backtest da célula clicada (resultado completo) em segundo plano e abre em Resultados."""
+        if (row, col) not in self.results:
+            return
+        if self.cell_worker is not None and self.cell_worker.isRunning():
+            return
+        params, _ = self.results[(row, col)]
+        args = self.sweep_args
+        self.cell_worker = BacktestWorker({
+            "strategy_name": args["strategy_name"],
+            "interval": args["interval"],
+            "symbol": args["symbol"],
+            "start_date": args["start_date"],
+            "strategy_params": params,
+            "fee_pct": args["fee_pct"],
+        }, self)
+        self.cell_worker.resultReady.connect(self.show_cell_result)
+        self.cell_worker.failed.connect(lambda msg: QMessageBox.critical(self, "Erro", f"Erro no backtest: {msg}"))
+        self.cell_worker.finished.connect(self.cell_finished)
+        self.status_label.setText(f"Abrindo execução {params}...")
+        self.cell_worker.start()
+
+    def cell_finished(self):
+        # Com a varredura rodando, o status volta a ser atualizado por add_result
+        if self.worker is None or not self.worker.isRunning():
+            self.status_label.setText(f"Concluído: {len(self.results)}/{self.n_expected} backtests.")
+
+    @Slot(object)
+    def show_cell_result(self, result):
+        if "error" in result:
+            QMessageBox.warning(self, "Erro", result["error"])
+            return
+        if self.parentWindow:
+            self.parentWindow.latest_result = result
+            self.parentWindow.results_page.set_results(result)
+            self.parentWindow.change_page(1)
+
+def _short_below_long(params):
+    return params["short_window"] < params["long_window"]
+
 class SettingsWidget(QWidget):
     """Página de configurações"""
     def __init__(self, parent=None):
@@ -471,9 +928,13 @@ class MainWindow(QMainWindow):
         self.page_stack = QStackedWidget()
         self.results_page = ResultsWidget()
         self.home_page = HomeWidget(self)
+        self.history_page = HistoryWidget(self)
+        self.optimization_page = OptimizationWidget(self)
         self.settings_page = SettingsWidget()
         self.page_stack.addWidget(self.home_page)
         self.page_stack.addWidget(self.results_page)
+        self.page_stack.addWidget(self.history_page)
+        self.page_stack.addWidget(self.optimization_page)
         self.page_stack.addWidget(self.settings_page)
         main_layout.addWidget(self.sidebar)
         main_layout.addWidget(self.page_stack)
@@ -505,6 +966,8 @@ class MainWindow(QMainWindow):
         self.page_stack.setCurrentIndex(index)
         if index == 1 and self.latest_result is not None:
             self.results_page.set_results(self.latest_result)
+        elif index == 2:
+            self.history_page.refresh()
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
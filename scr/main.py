@@ -2,6 +2,7 @@
 # /src/main.py
 import sys
 import os
+import argparse
 
 # Adiciona o diretório backend ao PATH para imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -10,7 +11,10 @@ from backend.backtest_service import (
     run_backtest,
     get_available_strategies,
     get_available_intervals,
+    get_available_data,
 )
+from backend.batch_runner import load_job_file, run_jobs
+from backend.run_archive import list_runs
 
 def main():
     print("=== Sistema de Backtesting FLEXÍVEL ===\n")
@@ -25,6 +29,11 @@ def main():
     print("\nIntervalos disponíveis:")
     for idx, i in enumerate(intervals, 1):
         print(f"{idx} - {i}")
+    available = get_available_data()
+    if available:
+        print("\nDados locais (catálogo):")
+        for sym, sym_intervals in available.items():
+            print(f"{sym}: {', '.join(sym_intervals)}")
 
     # 2. Parâmetros de seleção
     try:
@@ -92,7 +101,102 @@ def main():
     print(f"📦 Número de operações: {result['n_trades']}")
     print(f"⚖️ Sharpe Ratio: {result['sharpe_ratio']}")
     print(f"🪙 Volatilidade anualizada: {result['volatility_pct']}%")
+    print(f"📐 Sortino Ratio: {result['sortino_ratio']}  |  Calmar Ratio: {result['calmar_ratio']}")
+    print(f"🌊 Ulcer Index: {result['ulcer_index']}  |  Tempo em exposição: {result['exposure_time_pct']}%")
+    print(f"🔎 Auditoria: {result['trade_audit']['audit_message']}")
+    if "lookahead" in result["trade_audit"]:
+        print(f"🔮 Lookahead: {result['trade_audit']['lookahead']['message']}")
     print("==================================\n")
 
+def batch_main(job_file, output, workers=None, lean=False):
+    """Modo não interativo: executa todos os jobs do arquivo e grava as métricas em JSONL."""
+    jobs = load_job_file(job_file)
+    print(f"=== Modo batch: {len(jobs)} jobs de {job_file} -> {output} ===")
+    n_errors = run_jobs(jobs, output, workers=workers, lean=lean)
+    print(f"Concluído: {len(jobs) - n_errors} ok, {n_errors} com erro.")
+    return 1 if n_errors else 0
+
+def reports_main(output_dir, workers=None):
+    """Gera relatórios HTML (sem interface) de todas as execuções salvas no arquivo."""
+    # Importado aqui: só este modo precisa do Plotly
+    from backend.report_batch import generate_reports
+    run_ids = [run["run_id"] for run in list_runs()]
+    if not run_ids:
+        print("Nenhuma execução salva para gerar relatórios.")
+        return 1
+    print(f"=== Gerando {len(run_ids)} relatórios em {output_dir} ===")
+    print(f"Índice: {generate_reports(run_ids, output_dir, workers=workers)}")
+    return 0
+
+def paper_main(args):
+    """Paper trading contra o servidor de replay local, com resumo de latência."""
+    from backend.paper_trading import run_paper_trading
+    print(f"=== Paper trading: {args.paper} {args.symbol} {args.interval} desde {args.start} ===")
+    result = run_paper_trading(
+        args.paper, args.interval, symbol=args.symbol, start_date=args.start,
+        ticks_per_bar=args.ticks_per_bar, bar_delay=args.bar_delay
+    )
+    if "error" in result:
+        print(f"Erro: {result['error']}")
+        return 1
+    print(f"\n💰 Lucro Total: {result['total_return']:.2f}  ({result['total_return_pct']:.2f}%)")
+    print(f"📉 Máximo Drawdown: {result['max_drawdown_value']:.2f} ({result['max_drawdown_pct']:.2f}%)")
+    print(f"📦 Número de operações: {result['n_trades']}  |  ⚖️ Sharpe Ratio: {result['sharpe_ratio']}")
+    print(f"Barras: {result['paper']['bars']} | Ticks: {result['paper']['ticks']}")
+    for name, stats in result["paper"]["latency"].items():
+        print(f"⏱️ {name}: p50 {stats['p50_us']}us | p90 {stats['p90_us']}us | p99 {stats['p99_us']}us | máx {stats['max_us']}us")
+    return 0
+
+def scan_main(strategy, workers=None, min_bars=None):
+    """Roda a estratégia em todos os símbolos/intervalos salvos e mostra o ranking."""
+    from backend.universe import scan_universe, MIN_HISTORY_BARS
+    print(f"=== Varredura do universo: {strategy} ===")
+    ranking, _ = scan_universe(strategy, workers=workers, min_bars=min_bars or MIN_HISTORY_BARS)
+    if ranking.empty:
+        print("Nenhum resultado para ranquear.")
+        return 1
+    columns = ["symbol", "interval", "bars", "sharpe_ratio", "cagr_pct", "max_drawdown_pct", "n_trades", "score"]
+    print("\n" + ranking[columns].to_string(index=False))
+    return 0
+
+def catalog_main():
+    """Lista o catálogo dos dados locais (símbolos, intervalos, períodos, lacunas)."""
+    from backend.data_handlers.catalog import load_catalog, format_catalog
+    datasets = load_catalog()
+    if not datasets:
+        print("Nenhum dado local.")
+        return 1
+    print(format_catalog(datasets))
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sistema de Backtesting FLEXÍVEL")
+    parser.add_argument("--batch", metavar="JOBS", help="arquivo de jobs (.json/.yaml) para execução não interativa")
+    parser.add_argument("--output", default="batch_results.jsonl", help="arquivo JSONL de saída do modo batch")
+    parser.add_argument("--workers", type=int, default=None, help="número de processos (padrão: nº de CPUs)")
+    parser.add_argument("--reports", metavar="DIR", help="gera relatórios HTML de todas as execuções salvas em DIR")
+    parser.add_argument("--paper", metavar="STRATEGY", help="paper trading da estratégia sobre o replay dos CSVs salvos")
+    parser.add_argument("--symbol", default="BTCUSDT", help="símbolo do paper trading")
+    parser.add_argument("--interval", default="4h", help="intervalo do paper trading")
+    parser.add_argument("--start", default="1 Jan 2024", help="início do replay do paper trading")
+    parser.add_argument("--ticks-per-bar", type=int, default=1, help="atualizações por barra no replay")
+    parser.add_argument("--bar-delay", type=float, default=0.0, help="pausa (s) entre barras no replay")
+    parser.add_argument("--scan", metavar="STRATEGY", help="ranqueia a estratégia em todos os símbolos/intervalos salvos")
+    parser.add_argument("--min-bars", type=int, default=None, help="histórico mínimo (barras) para entrar na varredura")
+    parser.add_argument("--catalog", action="store_true", help="lista os dados locais disponíveis (catálogo)")
+    parser.add_argument("--lean", action="store_true", help="carrega os dados em float32 quando não há perda de precisão")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.batch:
+        sys.exit(batch_main(args.batch, args.output, args.workers, args.lean))
+    if args.reports:
+        sys.exit(reports_main(args.reports, args.workers))
+    if args.paper:
+        sys.exit(paper_main(args))
+    if args.catalog:
+        sys.exit(catalog_main())
+    if args.scan:
+        sys.exit(scan_main(args.scan, args.workers, args.min_bars))
     main()